@@ -1,22 +1,23 @@
 # agents/character_agents.py
 from crewai import Agent
-from core.resources import llm
+from core import resources
 # Note: This agent might use a visual tool in the future
 # from core.resources import image_generation_tool
 
-character_creator_agent = Agent(
-    role='Expert Character Designer for Anime',
-    goal='Create a new, unique, and compelling character for an ongoing anime series, including their personality, backstory, motivations, and a detailed visual description.',
-    backstory=(
-        'You are a world-renowned character designer, famous for creating iconic and memorable anime characters. '
-        'You have a deep understanding of archetypes, character arcs, and visual storytelling. '
-        'Your descriptions are so vivid that a scriptwriter can immediately understand how the character speaks and acts, '
-        'and an artist knows exactly how to draw them.'
-    ),
-    llm=llm,
-    verbose=True,
-    allow_delegation=False
-)
+def build_character_creator_agent():
+    return Agent(
+        role='Expert Character Designer for Anime',
+        goal='Create a new, unique, and compelling character for an ongoing anime series, including their personality, backstory, motivations, and a detailed visual description.',
+        backstory=(
+            'You are a world-renowned character designer, famous for creating iconic and memorable anime characters. '
+            'You have a deep understanding of archetypes, character arcs, and visual storytelling. '
+            'Your descriptions are so vivid that a scriptwriter can immediately understand how the character speaks and acts, '
+            'and an artist knows exactly how to draw them.'
+        ),
+        llm=resources.get("llm"),
+        verbose=True,
+        allow_delegation=False
+    )
 
 # In the future, you could add a dedicated visual agent
 # character_visuals_agent = Agent(
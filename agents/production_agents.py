@@ -1,23 +1,25 @@
 # agents/production_agents.py
 from crewai import Agent
 # from core.resources import llm, video_tool, voice_tool, sound_tool # Old import for general production_agent
-from core.resources import llm, voice_tool, sfx_tool, music_tool, video_tool # Use the newly defined video_tool
+from core import resources
 
-production_agent = Agent(
-    role='Multimedia Production Specialist',
-    goal='Create all the visual and audio assets for the episode based on the script. This includes generating video scenes, character voiceovers, background music, and sound effects.',
-    backstory=(
-        'You are a one-person production house, a master of AI-powered generation tools. '
-        'You take a script and meticulously create every asset required to build the episode, '
-        'ensuring each element matches the script\'s tone and description.'
-    ),
-    # Now, `video_tool` will be your Hugging Face video generator
-    # You'll use `voice_tool` for dialogue, `sfx_tool` for sound effects, `music_tool` for background music
-    tools=[video_tool, voice_tool, sfx_tool, music_tool], 
-    llm=llm,
-    verbose=True,
-    allow_delegation=False,
-)
+def build_production_agent():
+    return Agent(
+        role='Multimedia Production Specialist',
+        goal='Create all the visual and audio assets for the episode based on the script. This includes generating video scenes, character voiceovers, background music, and sound effects.',
+        backstory=(
+            'You are a one-person production house, a master of AI-powered generation tools. '
+            'You take a script and meticulously create every asset required to build the episode, '
+            'ensuring each element matches the script\'s tone and description.'
+        ),
+        # `hf_video_tool` is your Hugging Face video generator
+        # You'll use `voice_tool` for dialogue, `sfx_tool` for sound effects, `hf_music_tool` for background music
+        tools=[resources.get("hf_video_tool"), resources.get("voice_tool"), resources.get("sfx_tool"),
+               resources.get("hf_music_tool")],
+        llm=resources.get("llm"),
+        verbose=True,
+        allow_delegation=False,
+    )
 
 # Might still use the scene_compositor_agent if it's more about combining pre-generated elements.
 # If the HuggingFaceVideoGeneratorTool produces full scenes, then the scene_compositor_agent might become redundant
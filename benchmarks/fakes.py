@@ -0,0 +1,434 @@
+# benchmarks/fakes.py
+# Local stand-ins for every remote provider, so the full episode pipeline runs offline.
+#
+# Each fake plugs into the same seam the real client does (the tools accept an injected client), sleeps
+# for a configurable latency and returns real, decodable media of a configurable size, so everything
+# downstream (asset cache, checkpoints, ffmpeg compile) does its real work.
+import hashlib
+import json
+import os
+import re
+import socket
+import struct
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from utils.ffmpeg_utils import run_ffmpeg
+
+
+class FakeProfile:
+    """Latencies (seconds) and payload sizes shared by all fakes."""
+
+    def __init__(self, llm_latency=0.2, llm_tokens_per_second=0.0, image_latency=0.5, video_latency=2.0,
+                 music_latency=1.0, tts_latency=0.3, sfx_latency=0.5, gradio_latency=0.5,
+                 upload_mbps=50.0, width=1024, height=576, clip_seconds=4.0, clip_fps=24,
+                 music_seconds=20.0, sfx_seconds=2.0, clips=6, dialogue_lines=6, sfx_items=2, repeat_shots=0,
+                 upload_fail_every=0):
+        self.llm_latency = llm_latency
+        self.llm_tokens_per_second = llm_tokens_per_second
+        self.image_latency = image_latency
+        self.video_latency = video_latency
+        self.music_latency = music_latency
+        self.tts_latency = tts_latency
+        self.sfx_latency = sfx_latency
+        self.gradio_latency = gradio_latency
+        self.upload_mbps = upload_mbps
+        self.width = width
+        self.height = height
+        self.clip_seconds = clip_seconds
+        self.clip_fps = clip_fps
+        self.music_seconds = music_seconds
+        self.sfx_seconds = sfx_seconds
+        self.clips = clips
+        self.dialogue_lines = dialogue_lines
+        self.sfx_items = sfx_items
+        # How many of the clips revisit the setting of an earlier clip (near-duplicate image prompts).
+        self.repeat_shots = repeat_shots
+        # Every n-th upload chunk fails (a 503, then a dropped connection, alternately); 0 = never.
+        self.upload_fail_every = upload_fail_every
+
+
+# --- Media payloads (generated once per shape, then reused) ---
+@lru_cache(maxsize=None)
+def png_bytes(width: int, height: int, variant: int = 0) -> bytes:
+    # Different variants are different frames of the test pattern, so content-keyed caches see distinct images.
+    return run_ffmpeg(["-f", "lavfi", "-ss", f"{variant / 10:.1f}", "-i", f"testsrc2=size={width}x{height}",
+                       "-frames:v", "1", "-f", "image2pipe", "-vcodec", "png", "pipe:1"]).stdout
+
+
+def _variant(text: str, variants: int = 64) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) % variants
+
+
+@lru_cache(maxsize=None)
+def mp4_bytes(width: int, height: int, seconds: float, fps: int) -> bytes:
+    # Silent H.264, like the image-to-video endpoint returns.
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "clip.mp4")
+        run_ffmpeg(["-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}", "-t", seconds,
+                    "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path])
+        with open(path, "rb") as f:
+            return f.read()
+
+
+@lru_cache(maxsize=None)
+def audio_bytes(seconds: float, fmt: str = "mp3", frequency: int = 440) -> bytes:
+    return run_ffmpeg(["-f", "lavfi", "-i", f"sine=frequency={frequency}:duration={seconds}", "-f", fmt, "pipe:1"]).stdout
+
+
+# --- Vertex AI (chat model) ---
+_TASK_RE = re.compile(r"Current Task: (.*?)\n\nThis is the expected criteria", re.S)
+# Agents without tools close the task prompt with "Provide your complete response:" instead of "Begin!".
+_CONTEXT_RE = re.compile(r"This is the context you're working with:\n(.*?)\n\n(?:Begin!|Provide your complete response:)", re.S)
+
+
+_SETTINGS = [
+    "Mtuthuko faces the storm above Neo-Kyoto", "Thokozile repairs shrine lanterns at dawn",
+    "an old rival waits inside a flooded subway", "friends argue in a cramped ramen shop",
+    "lightning splits harbor cranes at midnight", "spirits circle a broadcast tower",
+    "rain drums on rooftop gardens", "a lone train crosses snowy mountains",
+]
+
+
+class FakeChatModel(BaseChatModel):
+    """Scripted stand-in for the Gemini chat model.
+
+    Recognizes each episode task from its description and answers in crewai's text protocol: tool-using
+    stages first emit one Action per tool call the real agent would make, then a Final Answer.
+    """
+
+    profile: Any = None
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _generate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = "\n".join(m.content if isinstance(m.content, str) else json.dumps(m.content) for m in messages)
+        task = _TASK_RE.findall(prompt)
+        context = _CONTEXT_RE.findall(prompt)
+        task, context = (task[-1] if task else ""), (context[-1] if context else "")
+        # Tool calls already made for this task show up as assistant turns ending in an Observation.
+        done = sum(1 for m in messages if m.type == "ai" and "Observation:" in str(m.content))
+        actions = self._actions(task, context)
+        if kwargs.get("response_mime_type") == "application/json":
+            # Schema-constrained output: the model answers with the bare JSON object.
+            text = self._final_answer(task, context)
+        elif done < len(actions):
+            name, args = actions[done]
+            text = f"Thought: I need to use {name}.\nAction: {name}\nAction Input: {json.dumps(args)}"
+        else:
+            text = f"Thought: I now know the final answer\nFinal Answer: {self._final_answer(task, context)}"
+        self.calls += 1
+        delay = self.profile.llm_latency
+        if self.profile.llm_tokens_per_second:
+            delay += (len(text) / 4) / self.profile.llm_tokens_per_second
+        time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    @staticmethod
+    def _episode(text: str) -> int:
+        match = re.search(r"Episode (\d+)", text)
+        return int(match.group(1)) if match else 0
+
+    def _plan(self, episode: int) -> dict:
+        p = self.profile
+        unique = max(1, p.clips - p.repeat_shots)
+        video_plan = [{"clip_id": f"clip_{i:02d}",
+                       "image_prompt": f"Episode {episode} scene {i}: {_SETTINGS[((i - 1) % unique) % len(_SETTINGS)]}",
+                       "image_path": f"temp_assets/frame_{i:02d}.png",
+                       "video_path": f"temp_assets/scene_{i:02d}.mp4"} for i in range(1, p.clips + 1)]
+        audio_plan = [{"audio_id": f"dialogue_{i:02d}", "type": "dialogue",
+                       "text_or_prompt": f"Episode {episode}, line {i}: we hold the line until dawn.",
+                       "output_path": f"temp_assets/dialogue_{i:02d}.mp3"} for i in range(1, p.dialogue_lines + 1)]
+        audio_plan += [{"audio_id": f"sfx_{i:02d}", "type": "sfx", "text_or_prompt": f"thunder crack {i}",
+                        "output_path": f"temp_assets/sfx_{i:02d}.mp3"} for i in range(1, p.sfx_items + 1)]
+        audio_plan.append({"audio_id": "music_01", "type": "music",
+                           "text_or_prompt": f"tense orchestral theme, episode {episode}",
+                           "output_path": "temp_assets/music_01.flac"})
+        return {"video_plan": video_plan, "audio_plan": audio_plan}
+
+    def _actions(self, task: str, context: str) -> list:
+        if task.startswith("Develop a plot"):
+            return [("Series Memory Reader", {"query": "What happened in the previous episodes?"})]
+        if "Execute the 'video_plan'" in task:
+            actions = []
+            for clip in self._plan(self._episode(context))["video_plan"]:
+                actions.append(("Image Generator", {"prompt": clip["image_prompt"], "output_path": clip["image_path"]}))
+                actions.append(("Video Generator (from Image)",
+                                {"source_image_path": clip["image_path"], "output_path": clip["video_path"]}))
+            return actions
+        if "Execute the 'audio_plan'" in task:
+            tools = {"dialogue": ("Voice Generator", "dialogue"), "sfx": ("SFX Generator", "prompt"),
+                     "music": ("Music Generator", "prompt")}
+            return [(tools[item["type"]][0], {tools[item["type"]][1]: item["text_or_prompt"], "file_path": item["output_path"]})
+                    for item in self._plan(self._episode(context))["audio_plan"]]
+        if task.startswith("Assemble the final episode"):
+            output = re.search(r"The final output path is '(.+?)'", task).group(1)
+            timeline = re.search(r"The episode timeline .*? is at '(.+?)'", task).group(1)
+            return [("Video Compiler Tool", {"timeline_path": timeline, "output_path": output})]
+        if task.startswith("The final episode has been created"):
+            episode = self._episode(task)
+            video = re.search(r"(\S+\.mp4)", context)
+            title = re.search(r"Title it '(.+?)'", task)
+            return [("YouTube Uploader Tool", {"file_path": video.group(1) if video else "",
+                                               "title": title.group(1) if title else f"Episode {episode}",
+                                               "description": f"Episode {episode} of the series."}),
+                    ("Series Memory Writer", {"episode_id": episode,
+                                              "summary": "Kaito holds the line above Neo-Kyoto."})]
+        return []
+
+    def _final_answer(self, task: str, context: str) -> str:
+        if task.startswith("Develop a plot"):
+            episode = self._episode(task)
+            return (f"Episode {episode}: Kaito and Aiko defend Neo-Kyoto from the storm spirits. "
+                    "An old rival returns, and the team learns the storm was summoned from within the city.")
+        if task.startswith("Write a script"):
+            return f"{context}\n\nKAITO: We hold the line until dawn.\nAIKO: Then we hold it together."
+        if task.startswith("Read the script"):
+            return json.dumps(self._plan(self._episode(context)))
+        if task.startswith("Assemble the final episode"):
+            return re.search(r"The final output path is '(.+?)'", task).group(1)
+        return "Done."
+
+
+# --- Hugging Face Inference API ---
+class FakeInferenceClient:
+    """Same interface as utils.http_client.InferenceClient; returns media chosen by the model id."""
+
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _kind(self, model_id: str) -> str:
+        if "video" in model_id:
+            return "video"
+        if "musicgen" in model_id:
+            return "music"
+        return "image"
+
+    def post(self, model_id: str, json: dict = None, content: bytes = None, headers: dict = None) -> bytes:
+        with self._lock:
+            self.requests += 1
+        p = self.profile
+        kind = self._kind(model_id)
+        if kind == "video":
+            time.sleep(p.video_latency)
+            return mp4_bytes(p.width, p.height, p.clip_seconds, p.clip_fps)
+        if kind == "music":
+            time.sleep(p.music_latency)
+            return audio_bytes(p.music_seconds, "flac", 220)
+        time.sleep(p.image_latency)
+        return png_bytes(p.width, p.height, _variant(repr(json)))
+
+    def post_many(self, requests: list) -> list:
+        results = []
+        for model_id, kwargs in requests:
+            try:
+                results.append(self.post(model_id, **kwargs))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def close(self):
+        pass
+
+
+# --- Google Cloud Text-to-Speech ---
+class FakeTTSClient:
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+
+    def synthesize_speech(self, input=None, voice=None, audio_config=None, **kwargs):
+        time.sleep(self.profile.tts_latency)
+        words = len(getattr(input, "text", "").split())
+        # Roughly conversational pace, rounded so repeated lengths share one generated payload.
+        seconds = max(1.0, round(words / 2.5 * 2) / 2)
+        return SimpleNamespace(audio_content=audio_bytes(seconds, "mp3", 330))
+
+
+# --- ElevenLabs ---
+class FakeElevenLabs:
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+        self.sound_effects = self
+
+    def create(self, text: str = "", **kwargs):
+        time.sleep(self.profile.sfx_latency)
+        payload = audio_bytes(self.profile.sfx_seconds, "mp3", 880)
+        # The real SDK streams the response in chunks.
+        return (payload[i:i + 65536] for i in range(0, len(payload), 65536))
+
+
+# --- Gradio (Hugging Face Spaces) ---
+class FakeGradioClient:
+    def __init__(self, profile: FakeProfile, workdir: str):
+        self.profile = profile
+        self.workdir = workdir
+
+    def predict(self, *args, **kwargs) -> str:
+        time.sleep(self.profile.gradio_latency)
+        key = hashlib.sha256(repr((args, sorted(kwargs.items()))).encode("utf-8")).hexdigest()[:16]
+        path = os.path.join(self.workdir, f"gradio_{key}.png")
+        with open(path, "wb") as f:
+            f.write(png_bytes(kwargs.get("width", self.profile.width), kwargs.get("height", self.profile.height),
+                              _variant(key)))
+        return path
+
+
+# --- YouTube Data API ---
+class _ResumableUploadHandler(BaseHTTPRequestHandler):
+    """The parts of Google's resumable upload protocol that googleapiclient uses.
+
+    POST ...?uploadType=resumable opens a session (200 + Location). PUT with "Content-Range: bytes a-b/total"
+    appends a chunk, and "bytes */total" asks for the progress. Both answer 308 with a Range header until the
+    last byte arrives, then 200 with the video resource.
+    """
+    protocol_version = "HTTP/1.1"
+    timeout = 10
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: dict = None, headers: dict = None):
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _progress(self, session: dict):
+        if session["received"] >= session["size"]:
+            return self._reply(200, session["video"])
+        headers = {"Range": f"bytes=0-{session['received'] - 1}"} if session["received"] else {}
+        self._reply(308, headers=headers)
+
+    def do_POST(self):
+        server = self.server.fake
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        session_id = server.open_session(int(self.headers["X-Upload-Content-Length"]), body)
+        host, port = self.server.server_address
+        self._reply(200, headers={"Location": f"http://{host}:{port}/upload/session/{session_id}"})
+
+    def do_PUT(self):
+        server = self.server.fake
+        session = server.sessions.get(self.path.rsplit("/", 1)[-1])
+        length = int(self.headers.get("Content-Length") or 0)
+        if session is None:
+            self.rfile.read(length)
+            return self._reply(404, {"error": {"code": 404, "message": "Upload session not found."}})
+        match = re.match(r"bytes (\d+)-(\d+)/(\d+)", self.headers.get("Content-Range", ""))
+        if match is None:  # "bytes */total": status query
+            return self._progress(session)
+        failure = server.next_failure()
+        if failure == "drop":
+            # Take half the chunk, then reset the connection without answering. (A clean close would make
+            # httplib2 resend the request with the chunk's stream already consumed.)
+            server.receive(session, int(match.group(1)), self.rfile.read(length // 2))
+            self.close_connection = True
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            self.connection.close()
+            return
+        data = self.rfile.read(length)
+        if failure == "error":
+            return self._reply(503, {"error": {"code": 503, "message": "Backend Error"}})
+        server.receive(session, int(match.group(1)), data)
+        self._progress(session)
+
+
+class FakeYouTubeService:
+    """YouTube Data API client backed by a local resumable-upload server.
+
+    `videos()` is a real googleapiclient client pointed at the server, so uploads go through the same
+    chunking, status queries and session URIs as against YouTube. Uploads are received at the profile's
+    bandwidth. Every `upload_fail_every`-th chunk fails, alternating between a 503 and a dropped connection.
+    """
+
+    def __init__(self, profile: FakeProfile):
+        from googleapiclient.discovery import build_from_document
+        from googleapiclient.discovery_cache import get_static_doc
+        from googleapiclient.http import build_http
+
+        self.profile = profile
+        self.uploads = []
+        self.sessions = {}
+        self.chunks = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _ResumableUploadHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        threading.Thread(target=self._server.serve_forever, name="fake-youtube", daemon=True).start()
+        host, port = self._server.server_address
+        # The bundled discovery document, re-rooted at the server (api_endpoint would keep https for uploads).
+        discovery = json.loads(get_static_doc("youtube", "v3"))
+        discovery["rootUrl"] = discovery["mtlsRootUrl"] = f"http://{host}:{port}/"
+        self._client = build_from_document(discovery, http=build_http())
+
+    def videos(self):
+        return self._client.videos()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # --- Server state ---
+    def open_session(self, size: int, body: dict) -> str:
+        with self._lock:
+            session_id = f"session-{len(self.sessions) + 1:04d}"
+            self.sessions[session_id] = {"size": size, "received": 0, "body": body, "video": None}
+        return session_id
+
+    def next_failure(self):
+        every = self.profile.upload_fail_every
+        with self._lock:
+            self.chunks += 1
+            if not every or self.chunks % every:
+                return None
+            self.failures += 1
+            return "error" if self.failures % 2 else "drop"
+
+    def receive(self, session: dict, start: int, data: bytes):
+        time.sleep(len(data) * 8 / (self.profile.upload_mbps * 1e6))
+        with self._lock:
+            # A chunk may repeat bytes the server already has (a retried request); only the new tail counts.
+            if start > session["received"]:
+                return
+            session["received"] = max(session["received"], start + len(data))
+            if session["received"] >= session["size"] and session["video"] is None:
+                video_id = f"fake-{len(self.uploads) + 1:04d}"
+                title = session["body"].get("snippet", {}).get("title")
+                session["video"] = {"kind": "youtube#video", "id": video_id, "snippet": session["body"].get("snippet", {})}
+                self.uploads.append({"id": video_id, "bytes": session["size"], "title": title})
+
+
+# --- Embeddings (Chroma's default model would be downloaded on first use) ---
+class FakeEmbeddingFunction:
+    """Deterministic hashed bag-of-words vectors; similar texts still land near each other."""
+
+    def __init__(self, dimensions: int = 64):
+        self.dimensions = dimensions
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vector = [0.0] * self.dimensions
+            for word in re.findall(r"\w+", text.lower()):
+                vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dimensions] += 1.0
+            norm = sum(v * v for v in vector) ** 0.5 or 1.0
+            vectors.append([v / norm for v in vector])
+        return vectors
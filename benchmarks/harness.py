@@ -0,0 +1,287 @@
+# benchmarks/harness.py
+# Offline end-to-end benchmark of the episode pipeline.
+#
+# Runs create_crew_tasks exactly as main.py does, but against the local fakes in benchmarks/fakes.py,
+# inside a throwaway workspace, and reports per-stage wall time and peak RSS, overall throughput and the
+# shape of the compiled episode. Needs ffmpeg (or moviepy's bundled copy) but no network or GPU:
+#
+#   python -m benchmarks.harness --episodes 2 --clips 8 --json bench.json
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# Keep crewai from phoning home; the benchmark must run without network.
+for _var, _value in (("CREWAI_DISABLE_TELEMETRY", "true"), ("OTEL_SDK_DISABLED", "true"),
+                     ("CREWAI_TRACING_ENABLED", "false")):
+    os.environ.setdefault(_var, _value)
+
+
+def current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssSampler:
+    """Samples this process's RSS on a daemon thread; mark() returns the peak since the previous mark."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self._peak = current_rss_bytes()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="rss-sampler", daemon=True)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss_bytes()
+            with self._lock:
+                self._peak = max(self._peak, rss)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def mark(self) -> int:
+        rss = current_rss_bytes()
+        with self._lock:
+            peak, self._peak = max(self._peak, rss), rss
+        return peak
+
+    def stop(self):
+        self._stop.set()
+
+
+def install_fakes(profile, workdir: str, upload_chunk_mb: float = 1.0) -> dict:
+    """Registers fake-backed instances for every remote resource. Must run before any agent is built."""
+    from core import resources
+    from core.llm_cache import as_crew_llm
+    from benchmarks.fakes import (FakeChatModel, FakeInferenceClient, FakeTTSClient, FakeElevenLabs,
+                                  FakeGradioClient, FakeYouTubeService, FakeEmbeddingFunction)
+    from utils.memory_manager import MemoryManager
+    from tools.memory_tool import MemoryReaderTool, MemoryWriterTool
+    from tools.huggingface_tools import HuggingFaceImageGeneratorTool, HuggingFaceVideoGeneratorTool
+    from tools.audio_tools import VoiceGeneratorTool, SfxGeneratorTool, HuggingFaceMusicGeneratorTool
+    from tools.youtube_tool import YouTubeUploaderTool
+
+    fakes = {
+        "llm": FakeChatModel(profile=profile),
+        "inference": FakeInferenceClient(profile),
+        "youtube": FakeYouTubeService(profile),
+        "gradio": FakeGradioClient(profile, workdir),
+    }
+    memory = MemoryManager(collection_name="benchmark_memory", persist_dir=os.path.join(workdir, "series_memory"),
+                           embedding_function=FakeEmbeddingFunction())
+    resources.override("llm", as_crew_llm(fakes["llm"]))
+    resources.override("memory_manager", memory)
+    resources.override("memory_reader_tool", MemoryReaderTool(memory_manager=memory))
+    resources.override("memory_writer_tool", MemoryWriterTool(memory_manager=memory))
+    resources.override("hf_image_tool", HuggingFaceImageGeneratorTool(inference_client=fakes["inference"]))
+    resources.override("hf_video_tool", HuggingFaceVideoGeneratorTool(inference_client=fakes["inference"]))
+    resources.override("hf_music_tool", HuggingFaceMusicGeneratorTool(inference_client=fakes["inference"]))
+    resources.override("voice_tool", VoiceGeneratorTool(tts_client=FakeTTSClient(profile)))
+    resources.override("sfx_tool", SfxGeneratorTool(eleven_client=FakeElevenLabs(profile)))
+    resources.override("youtube_tool", YouTubeUploaderTool(youtube_service=fakes["youtube"],
+                                                              chunk_mb=upload_chunk_mb))
+    return fakes
+
+
+def run_episode(episode_id: int, youtube_agent, direct_dispatch: bool, sampler: RssSampler, stages: dict):
+    from crewai import Crew, Process
+    from core import tracing
+    from config import DISTRIBUTION_OUTBOX
+    from tasks.episode_tasks import create_crew_tasks, create_checkpointer, final_video_path, enqueue_episode
+    from utils.file_handler import setup_episode_directory
+
+    episode_path = setup_episode_directory(episode_id)
+    # Every episode writes its assets under the same temp_assets names, so a clip that fails to generate would
+    # otherwise leave the previous episode's file in the timeline. Each episode starts from an empty directory.
+    shutil.rmtree("temp_assets", ignore_errors=True)
+    os.makedirs("temp_assets")
+
+    tasks = create_crew_tasks(episode_id, episode_path, youtube_agent, direct_dispatch=direct_dispatch)
+    checkpointer = create_checkpointer(episode_id, episode_path, direct_dispatch=direct_dispatch)
+    checkpointer.attach(tasks)
+
+    # Tasks run sequentially, so each stage spans from the previous task's callback to its own.
+    clock = {"last": 0.0}
+    for task in tasks:
+        original = task.callback
+
+        def _timed(output, task=task, original=original):
+            result = original(output) if original else None
+            now = time.perf_counter()
+            stage = stages.setdefault(task.name, {"seconds": [], "peak_rss": 0})
+            stage["seconds"].append(now - clock["last"])
+            stage["peak_rss"] = max(stage["peak_rss"], sampler.mark())
+            clock["last"] = now
+            return result
+
+        task.callback = _timed
+
+    crew = Crew(agents=list({id(t.agent): t.agent for t in tasks}.values()), tasks=tasks,
+                process=Process.sequential, verbose=False)
+    sampler.mark()
+    clock["last"] = time.perf_counter()
+    with tracing.episode_trace(episode_id, episode_path) as tracer:
+        crew.kickoff()
+        if DISTRIBUTION_OUTBOX:
+            enqueue_episode(episode_id, episode_path, tasks)
+    return final_video_path(episode_id, episode_path), tasks, tracer
+
+
+def run_fallback_visuals(tasks: list, fakes: dict, sampler: RssSampler, stages: dict) -> int:
+    """Still image (Gradio) + Ken Burns render for every clip of the plan: the cheap visual fallback path."""
+    from tools.video_tool import StillImageGeneratorTool, KenBurnsVideoTool
+    from utils.plan_executor import parse_production_plan
+
+    plan_task = next(t for t in tasks if t.name == "production_plan")
+    plan = parse_production_plan(plan_task.output.raw)
+    dialogue = [item["output_path"] for item in plan["audio_plan"] if item["type"] == "dialogue"]
+    still_tool, ken_burns = StillImageGeneratorTool(gradio_client=fakes["gradio"]), KenBurnsVideoTool()
+    sampler.mark()
+    started = time.perf_counter()
+    for i, clip in enumerate(plan["video_plan"]):
+        still = clip["image_path"].replace(".png", "_still.png")
+        still_tool._run(prompt=clip["image_prompt"], file_path=still)
+        audio = dialogue[i] if i < len(dialogue) else ""
+        ken_burns._run(image_path=still, audio_path=audio, output_path=clip["video_path"].replace(".mp4", "_kb.mp4"))
+    stage = stages.setdefault("ken_burns_fallback", {"seconds": [], "peak_rss": 0})
+    stage["seconds"].append(time.perf_counter() - started)
+    stage["peak_rss"] = max(stage["peak_rss"], sampler.mark())
+    return len(plan["video_plan"])
+
+
+def print_report(report: dict):
+    mb = 1024 * 1024
+    print("\n📊 Benchmark results")
+    print(f"{'stage':<22}{'mean s':>10}{'total s':>10}{'peak RSS MB':>14}")
+    for name, stage in report["stages"].items():
+        print(f"{name:<22}{stage['mean_seconds']:>10.2f}{stage['total_seconds']:>10.2f}{stage['peak_rss'] / mb:>14.0f}")
+    t = report["totals"]
+    print(f"\nEpisodes: {t['episodes']}   wall: {t['wall_seconds']:.1f}s   "
+          f"throughput: {t['episodes_per_hour']:.1f} episodes/h, {t['clips_per_minute']:.1f} clips/min")
+    print(f"LLM calls: {t['llm_calls']}   inference requests: {t['inference_requests']}   uploads: {t['uploads']} "
+          f"({t['upload_chunks']} chunks, {t['upload_failures']} injected failures)")
+    print(f"Peak RSS: {t['peak_rss'] / mb:.0f} MB (largest child process: {t['peak_child_rss'] / mb:.0f} MB)")
+    for episode in report["episodes"]:
+        print(f"Episode {episode['id']}: {episode['video_seconds']:.1f}s of video, {episode['video_bytes'] / mb:.1f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the episode pipeline offline against local provider fakes.")
+    parser.add_argument("--episodes", type=int, default=1)
+    parser.add_argument("--clips", type=int, default=6, help="Clips per episode in the fake production plan.")
+    parser.add_argument("--dialogue-lines", type=int, default=6)
+    parser.add_argument("--sfx", type=int, default=2)
+    parser.add_argument("--repeat-shots", type=int, default=0,
+                        help="Clips that revisit an earlier clip's setting (exercises shot reuse).")
+    parser.add_argument("--resolution", default="1024x576", help="WxH of fake images and clips.")
+    parser.add_argument("--clip-seconds", type=float, default=4.0)
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplies every fake provider latency.")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--upload-mbps", type=float, default=50.0)
+    parser.add_argument("--upload-chunk-mb", type=float, default=1.0)
+    parser.add_argument("--upload-fail-every", type=int, default=0,
+                        help="Fail every n-th upload chunk (exercises resumable upload retries).")
+    parser.add_argument("--crew-dispatch", action="store_true",
+                        help="Have agents call the generation tools instead of direct plan dispatch.")
+    parser.add_argument("--fallback-visuals", action="store_true",
+                        help="Also time the Gradio still + Ken Burns fallback for every clip.")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark workspace for inspection.")
+    parser.add_argument("--json", help="Also write the report to this JSON file.")
+    args = parser.parse_args(argv)
+
+    from benchmarks.fakes import FakeProfile
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    s = args.latency_scale
+    profile = FakeProfile(llm_latency=args.llm_latency * s, image_latency=0.5 * s, video_latency=2.0 * s,
+                          music_latency=1.0 * s, tts_latency=0.3 * s, sfx_latency=0.5 * s, gradio_latency=0.5 * s,
+                          upload_mbps=args.upload_mbps, width=width, height=height, clip_seconds=args.clip_seconds,
+                          clips=args.clips, dialogue_lines=args.dialogue_lines, sfx_items=args.sfx,
+                          repeat_shots=args.repeat_shots, upload_fail_every=args.upload_fail_every)
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    workdir = tempfile.mkdtemp(prefix="anime_benchmark_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    sampler = RssSampler().start()
+    try:
+        fakes = install_fakes(profile, workdir, args.upload_chunk_mb)
+        from main import build_youtube_agent, start_uploader
+        from utils.ffmpeg_utils import probe
+        youtube_agent = build_youtube_agent()
+        # Uploads drain from the outbox in the background while the next episode renders.
+        uploader = start_uploader()
+
+        stages, episodes, clips = {}, [], 0
+        started = time.perf_counter()
+        for episode_id in range(1, args.episodes + 1):
+            video_path, tasks, tracer = run_episode(episode_id, youtube_agent, not args.crew_dispatch, sampler, stages)
+            clips += args.clips
+            info = probe(video_path) if os.path.exists(video_path) else {"duration": 0.0}
+            episodes.append({"id": episode_id, "video_seconds": info["duration"],
+                             "video_bytes": os.path.getsize(video_path) if os.path.exists(video_path) else 0,
+                             "trace_summary": tracer.summary() if tracer else []})
+            if args.fallback_visuals:
+                run_fallback_visuals(tasks, fakes, sampler, stages)
+        if uploader is not None:
+            # Only the uploading still left once the last episode is rendered adds to the wall time.
+            drain_started = time.perf_counter()
+            uploader.drain()
+            uploader.stop()
+            stage = stages.setdefault("upload_drain", {"seconds": [], "peak_rss": 0})
+            stage["seconds"].append(time.perf_counter() - drain_started)
+            stage["peak_rss"] = max(stage["peak_rss"], sampler.mark())
+        wall = time.perf_counter() - started
+    finally:
+        sampler.stop()
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "config": vars(args),
+        "stages": {name: {"mean_seconds": sum(st["seconds"]) / len(st["seconds"]), "total_seconds": sum(st["seconds"]),
+                          "runs": len(st["seconds"]), "peak_rss": st["peak_rss"]} for name, st in stages.items()},
+        "totals": {
+            "episodes": args.episodes,
+            "wall_seconds": wall,
+            "episodes_per_hour": args.episodes / wall * 3600 if wall else 0.0,
+            "clips_per_minute": clips / wall * 60 if wall else 0.0,
+            "llm_calls": fakes["llm"].calls,
+            "inference_requests": fakes["inference"].requests,
+            "uploads": len(fakes["youtube"].uploads),
+            "upload_chunks": fakes["youtube"].chunks,
+            "upload_failures": fakes["youtube"].failures,
+            "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            "peak_child_rss": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024,
+        },
+        "episodes": episodes,
+    }
+    print_report(report)
+    if args.keep:
+        print(f"Workspace kept at {workdir}")
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
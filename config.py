@@ -1,4 +1,5 @@
 # config.py
+import os
 
 SERIES_TITLE = "The Resilience of Mtuthuko"
 YOUTUBE_CHANNEL_ID = "YOUR_YOUTUBE_CHANNEL_ID" # Optional, for some API calls
@@ -26,4 +27,180 @@ CHARACTERS = {
     "Henry and Ernest": "The antagonists. The mother's uncles. Greedy and cold-hearted.",
     "Fifi": "A kind and empathetic university friend who helps Mtuthuko with food.",
     "Fuzo": "A generous university friend who offers Mtuthuko a place to sleep and becomes a close confidant.",
-}
\ No newline at end of file
+}
+
+# --- Asset Cache ---
+# Generated frames, clips, voice lines, SFX and music are stored here keyed by a hash of their inputs,
+# so reruns of an episode reuse assets instead of paying for the remote calls again.
+ASSET_CACHE_DIR = os.getenv("ASSET_CACHE_DIR", ".asset_cache")
+ASSET_CACHE_MAX_BYTES = int(os.getenv("ASSET_CACHE_MAX_BYTES", str(20 * 1024 ** 3)))  # 20 GB
+
+# --- Production Plan Execution ---
+# When enabled, the JSON production plan is executed directly by a thread pool instead of by LLM agents.
+DIRECT_PLAN_DISPATCH = os.getenv("DIRECT_PLAN_DISPATCH", "1") == "1"
+PLAN_EXECUTOR_MAX_WORKERS = int(os.getenv("PLAN_EXECUTOR_MAX_WORKERS", "8"))
+# Maximum number of in-flight calls per remote provider.
+PROVIDER_CONCURRENCY = {
+    "huggingface": 4,
+    "google_tts": 4,
+    "elevenlabs": 2,
+}
+
+# --- Shot Reuse ---
+# Clips whose image prompts embed close to an earlier shot (this episode or the series' shot library) reuse
+# it instead of being generated: at SHOT_REUSE_SIMILARITY the clip is copied, at SHOT_VARY_SIMILARITY its
+# frame is re-animated locally with a different Ken Burns move. Cosine similarity of the prompt embeddings.
+SHOT_REUSE_ENABLED = os.getenv("SHOT_REUSE_ENABLED", "1") == "1"
+SHOT_REUSE_SIMILARITY = float(os.getenv("SHOT_REUSE_SIMILARITY", "0.95"))
+SHOT_VARY_SIMILARITY = float(os.getenv("SHOT_VARY_SIMILARITY", "0.88"))
+# Prompts sharing a long setting description embed close together even when the action differs, so the words
+# that differ between two matched prompts must also embed this close to each other (e.g. "dusk" ~ "sunset").
+SHOT_CHANGED_WORDS_SIMILARITY = float(os.getenv("SHOT_CHANGED_WORDS_SIMILARITY", "0.8"))
+SHOT_LIBRARY_DIR = os.getenv("SHOT_LIBRARY_DIR", "shot_library")
+
+# --- Character References ---
+# Each CHARACTERS entry gets one canonical reference portrait, generated once and reused for every shot.
+# Shot prompts name the characters; frames are conditioned on the portraits (IP-Adapter in the local image
+# pipeline) or, for remote tools, get a short fixed tag per character appended instead. Portraits are only
+# generated for image tools that can take them.
+CHARACTER_REFERENCES_ENABLED = os.getenv("CHARACTER_REFERENCES_ENABLED", "1") == "1"
+CHARACTER_STORE_DIR = os.getenv("CHARACTER_STORE_DIR", "characters")
+# Prompts that name no character match the closest character description at or above this cosine similarity.
+CHARACTER_MATCH_SIMILARITY = float(os.getenv("CHARACTER_MATCH_SIMILARITY", "0.6"))
+
+# --- Remote Model HTTP Client ---
+HF_INFERENCE_URL = os.getenv("HF_INFERENCE_URL", "https://api-inference.huggingface.co/models")
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "300"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "32"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "5"))
+HTTP_BACKOFF_BASE_SECONDS = float(os.getenv("HTTP_BACKOFF_BASE_SECONDS", "1.0"))
+HTTP_MAX_BACKOFF_SECONDS = float(os.getenv("HTTP_MAX_BACKOFF_SECONDS", "60"))
+# Total time to wait for a cold model to load (HF 503 + estimated_time) before giving up.
+HF_MAX_LOADING_WAIT_SECONDS = float(os.getenv("HF_MAX_LOADING_WAIT_SECONDS", "600"))
+
+# --- YouTube Upload ---
+# Episodes are uploaded in chunks over a resumable session (rounded down to a multiple of 256 KiB). The
+# session URI is saved next to the video, so an upload interrupted by a crash resumes where it stopped.
+YOUTUBE_UPLOAD_CHUNK_MB = float(os.getenv("YOUTUBE_UPLOAD_CHUNK_MB", "8"))
+# Consecutive failed chunks (5xx or connection errors) before giving up; backoff as for HTTP_* above.
+YOUTUBE_UPLOAD_MAX_RETRIES = int(os.getenv("YOUTUBE_UPLOAD_MAX_RETRIES", "8"))
+
+# --- Distribution Outbox ---
+# Compiled episodes are queued in a SQLite outbox and uploaded by a background worker, so production never
+# waits on the upload. Set DISTRIBUTION_OUTBOX=0 to upload from the crew's last task instead.
+DISTRIBUTION_OUTBOX = os.getenv("DISTRIBUTION_OUTBOX", "1") == "1"
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "distribution_outbox.sqlite3")
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "1"))
+# Whole-upload attempts per episode; failed attempts are retried with exponential backoff.
+UPLOAD_MAX_ATTEMPTS = int(os.getenv("UPLOAD_MAX_ATTEMPTS", "5"))
+UPLOAD_RETRY_BASE_SECONDS = float(os.getenv("UPLOAD_RETRY_BASE_SECONDS", "60"))
+UPLOAD_RETRY_MAX_SECONDS = float(os.getenv("UPLOAD_RETRY_MAX_SECONDS", "3600"))
+# A claimed upload returns to the queue after this long if its worker died without reporting back. The
+# worker renews the lease every third of this while the upload runs, so it bounds recovery, not upload time.
+UPLOAD_LEASE_SECONDS = float(os.getenv("UPLOAD_LEASE_SECONDS", "600"))
+UPLOAD_POLL_SECONDS = float(os.getenv("UPLOAD_POLL_SECONDS", "5"))
+
+# --- Video Compilation ---
+# 'stream' concatenates clips with ffmpeg stream copy; 'moviepy' re-encodes the whole episode in Python.
+COMPILER_MODE = os.getenv("COMPILER_MODE", "stream")
+# Leave unset to use ffmpeg/ffprobe from PATH (or the ffmpeg bundled with moviepy's imageio-ffmpeg).
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY")
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY")
+
+# --- Audio Mixing ---
+# The compiler mixes the clips' own audio, dialogue, SFX and music into one track (see utils/audio_mixer.py).
+AUDIO_MIX_SAMPLE_RATE = 48000
+AUDIO_MIX_BLOCK_SECONDS = 10.0
+# Integrated loudness target (YouTube normalizes playback to about -14 LUFS) and sample-peak ceiling.
+AUDIO_MIX_TARGET_LUFS = float(os.getenv("AUDIO_MIX_TARGET_LUFS", "-14"))
+AUDIO_MIX_PEAK_DBFS = -1.0
+AUDIO_MIX_MUSIC_DB = -14.0
+AUDIO_MIX_SFX_DB = -4.0
+# Music is pulled down by this much while dialogue is audible, with these attack/release times (seconds).
+AUDIO_MIX_DUCK_DB = -12.0
+AUDIO_MIX_DUCK_ATTACK = 0.08
+AUDIO_MIX_DUCK_RELEASE = 0.6
+AUDIO_MIX_DUCK_THRESHOLD_DB = -40.0
+# Dialogue starts this long after its clip begins.
+AUDIO_MIX_DIALOGUE_LEAD = 0.25
+
+# --- Ken Burns Renderer ---
+# Default camera move (see utils/ken_burns.PRESETS) and encoder settings for still-image clips.
+KEN_BURNS_PRESET = os.getenv("KEN_BURNS_PRESET", "zoom_in")
+KEN_BURNS_FPS = 24
+KEN_BURNS_X264_PRESET = "veryfast"
+KEN_BURNS_CRF = 20
+
+# --- Face Animation ---
+FACE_ANIMATION_FPS = 24
+# Mouth opens when a frame's loudness reaches this fraction of the line's speaking level...
+FACE_ANIMATION_OPEN_THRESHOLD = 0.35
+# ...and stays closed below this absolute level (dBFS), so pauses and breaths read as silence.
+FACE_ANIMATION_SILENCE_DB = -40.0
+FACE_ANIMATION_MAX_WORKERS = 4
+
+# --- Local Model Pool ---
+# RAM budget for resident local pipelines (SVD, Stable Diffusion). 0 = MODEL_POOL_RAM_FRACTION of physical RAM.
+MODEL_POOL_BUDGET_GB = float(os.getenv("MODEL_POOL_BUDGET_GB", "0"))
+MODEL_POOL_RAM_FRACTION = 0.6
+
+# --- Local Video Model (Stable Video Diffusion) ---
+SVD_MODEL_ID = "stabilityai/stable-video-diffusion-img2vid"
+# 'auto' = fp16 on GPUs; bfloat16 on CPUs with native bf16 support, float32 on other CPUs.
+SVD_DTYPE = os.getenv("SVD_DTYPE", "auto")
+SVD_CPU_THREADS = int(os.getenv("SVD_CPU_THREADS", "0"))  # 0 = all available cores
+# Resolution must be a multiple of 64. Unset = 'full' on a GPU, 'balanced' on CPU.
+SVD_PRESETS = {
+    "full": {"width": 1024, "height": 576, "num_frames": 14, "num_inference_steps": 25, "fps": 10},
+    "balanced": {"width": 768, "height": 448, "num_frames": 14, "num_inference_steps": 16, "fps": 10},
+    "draft": {"width": 512, "height": 320, "num_frames": 8, "num_inference_steps": 10, "fps": 8},
+}
+SVD_PRESET = os.getenv("SVD_PRESET")
+# VAE decode chunks are sized to use at most this fraction of available RAM on CPU.
+SVD_DECODE_RAM_FRACTION = 0.5
+# Rough peak decode memory per output pixel per frame at float32 (halved for 16-bit dtypes).
+SVD_DECODE_BYTES_PER_PIXEL = 2048
+
+# --- Local Image Model (Stable Diffusion) ---
+LOCAL_IMAGE_MODEL_ID = "digiplay/AbsoluteReality_v1.8.1"
+LOCAL_IMAGE_DTYPE = os.getenv("LOCAL_IMAGE_DTYPE", "auto")  # same choices as SVD_DTYPE
+# 'default' (model's own scheduler, 20 steps), 'dpm' (DPM-Solver++, 12 steps) or 'lcm' (LCM-LoRA, 4 steps).
+LOCAL_IMAGE_SPEED = os.getenv("LOCAL_IMAGE_SPEED", "dpm")
+LOCAL_IMAGE_LCM_LORA_ID = "latent-consistency/lcm-lora-sdv1-5"
+LOCAL_IMAGE_MAX_BATCH = 8
+# Rough peak memory per image in a batch at 512x512 float32 (with guidance); halved for 16-bit dtypes.
+LOCAL_IMAGE_BYTES_PER_IMAGE = int(1.5 * 1024**3)
+LOCAL_IMAGE_RAM_FRACTION = 0.5
+# IP-Adapter conditioning on character reference portraits. Scale 0 ignores the reference; 1 copies it closely.
+LOCAL_IMAGE_IP_ADAPTER_ID = "h94/IP-Adapter"
+LOCAL_IMAGE_IP_ADAPTER_WEIGHTS = "ip-adapter_sd15.bin"
+LOCAL_IMAGE_IP_ADAPTER_SCALE = float(os.getenv("LOCAL_IMAGE_IP_ADAPTER_SCALE", "0.6"))
+
+# --- Series Memory ---
+# Directory of the persistent Chroma store (and its embedding cache). Set to "" for an in-memory store.
+MEMORY_PERSIST_DIR = os.getenv("MEMORY_PERSIST_DIR", "series_memory")
+MEMORY_BATCH_SIZE = int(os.getenv("MEMORY_BATCH_SIZE", "64"))
+# Episodes are rolled up into arc summaries, and arcs into season summaries, to keep prompts bounded.
+MEMORY_ARC_LENGTH = int(os.getenv("MEMORY_ARC_LENGTH", "10"))
+MEMORY_SEASON_LENGTH = int(os.getenv("MEMORY_SEASON_LENGTH", "50"))
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1500"))
+MEMORY_ROLLUP_MAX_CHARS = int(os.getenv("MEMORY_ROLLUP_MAX_CHARS", "1200"))
+
+# --- LLM ---
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-2.0-flash-001")
+LLM_PROJECT = os.getenv("LLM_PROJECT", "multi-agentic-animme")
+# Extra sampling parameters passed to the model (e.g. {"temperature": 0.7}); part of the LLM cache key.
+LLM_SAMPLING = {}
+# 'off', 'record', 'replay' (offline, cache only) or 'read_through'.
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "off")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache/responses.sqlite")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "0")) or None  # 0 = never expire
+# Request schema-constrained JSON for structured task outputs (the production plan). Set to 0 for models
+# without a JSON mode; answers are then still validated and repaired locally.
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "1") == "1"
+
+# --- Tracing ---
+# Writes a Chrome trace (chrome://tracing or ui.perfetto.dev) of every task, tool and LLM call per episode.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+TRACE_FILE_NAME = "trace.json"
@@ -0,0 +1,151 @@
+# core/distribution.py
+# Background uploader draining the distribution outbox (utils/outbox.py).
+#
+# The crew enqueues each compiled episode and moves on. This worker uploads the episodes on its own
+# threads. An attempt that fails as a whole (the uploader's chunk-level retries exhausted, expired
+# credentials, quota) goes back into the outbox with exponential backoff. After UPLOAD_MAX_ATTEMPTS the
+# entry is parked as failed. Because the queue is on disk, a restarted process picks up where the last one
+# stopped. The uploader keeps its own resumable session per file, so an interrupted upload continues
+# rather than starting over. While an upload runs, its lease is renewed in the background, so a long upload
+# is never taken over by another worker.
+import random
+import re
+import threading
+import time
+
+from config import (UPLOAD_WORKERS, UPLOAD_MAX_ATTEMPTS, UPLOAD_RETRY_BASE_SECONDS, UPLOAD_RETRY_MAX_SECONDS,
+                    UPLOAD_LEASE_SECONDS, UPLOAD_POLL_SECONDS)
+from core import resources
+from utils.outbox import DistributionOutbox, OutboxEntry, process_owner
+
+_VIDEO_ID_RE = re.compile(r"Video ID: (\S+)")
+
+
+class UploadWorker:
+    def __init__(self, outbox: DistributionOutbox, upload_tool=None, concurrency: int = UPLOAD_WORKERS,
+                 max_attempts: int = UPLOAD_MAX_ATTEMPTS, retry_base: float = UPLOAD_RETRY_BASE_SECONDS,
+                 retry_max: float = UPLOAD_RETRY_MAX_SECONDS, lease_seconds: float = UPLOAD_LEASE_SECONDS,
+                 poll_seconds: float = UPLOAD_POLL_SECONDS):
+        self.outbox = outbox
+        # Resolved on first upload, so enqueueing never pays for the YouTube client.
+        self._upload_tool = upload_tool
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.owner = process_owner()
+        self.uploaded = 0
+        self.failed = 0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    @property
+    def upload_tool(self):
+        if self._upload_tool is None:
+            self._upload_tool = resources.get("youtube_tool")
+        return self._upload_tool
+
+    # --- Lifecycle ---
+    def start(self) -> "UploadWorker":
+        released = self.outbox.release_orphans()
+        if released:
+            print(f"📮 Re-queued {released} upload(s) left unfinished by a stopped worker.")
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._loop, name=f"uploader-{i}", daemon=True)
+                         for i in range(self.concurrency)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def notify(self):
+        """Wakes idle workers, e.g. right after an episode was enqueued."""
+        self._wake.set()
+
+    def stop(self, timeout: float = None):
+        """Stops after the uploads in flight finish; queued entries stay in the outbox for the next run."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def drain(self, timeout: float = None) -> bool:
+        """Blocks until the outbox has nothing left to attempt (including scheduled retries), or `timeout`.
+        Returns True if it drained. Also gives up (False) once no worker thread is left to drain it."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.notify()
+        while self.outbox.outstanding():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if not any(thread.is_alive() for thread in self._threads):
+                print("⚠️ [uploader] No upload worker is running; the queued uploads stay in the outbox.")
+                return False
+            time.sleep(min(self.poll_seconds, 0.5))
+        return True
+
+    # --- Workers ---
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                entry = self.outbox.claim(self.lease_seconds, self.owner)
+                if entry is None:
+                    self._wake.wait(self.poll_seconds)
+                    self._wake.clear()
+                    continue
+                self._upload(entry)
+            except Exception as e:
+                # E.g. the outbox database is locked or unreadable. The claimed entry (if any) is released when
+                # its lease runs out, so the worker only has to stay alive.
+                print(f"⚠️ [uploader] {type(e).__name__}: {e}")
+                self._stop.wait(self.poll_seconds)
+
+    def _heartbeat(self, entry: OutboxEntry, done: threading.Event):
+        """Renews the lease on `entry` until `done` is set, so a long upload keeps it."""
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                if not self.outbox.renew(entry.episode_id, self.owner, self.lease_seconds):
+                    print(f"⚠️ [uploader] Lost the lease on Episode {entry.episode_id}; another worker may retry it.")
+                    return
+            except Exception as e:
+                print(f"⚠️ [uploader] Could not renew the lease on Episode {entry.episode_id}: {e}")
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.retry_max, self.retry_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def _upload(self, entry: OutboxEntry):
+        print(f"📤 [uploader] Episode {entry.episode_id} (attempt {entry.attempts + 1}/{self.max_attempts})")
+        started = time.perf_counter()
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(entry, done),
+                                     name=f"{threading.current_thread().name}-lease", daemon=True)
+        heartbeat.start()
+        try:
+            result = self.upload_tool.run(file_path=entry.video_path, title=entry.title, description=entry.description)
+        except Exception as e:
+            result = f"Error: {type(e).__name__}: {e}"
+        finally:
+            done.set()
+            heartbeat.join()
+        match = _VIDEO_ID_RE.search(result) if isinstance(result, str) else None
+        if match and not result.startswith("Error"):
+            self.outbox.complete(entry.episode_id, match.group(1))
+            with self._lock:
+                self.uploaded += 1
+            print(f"✅ [uploader] Episode {entry.episode_id} uploaded in {time.perf_counter() - started:.0f}s "
+                  f"(video {match.group(1)}).")
+            return
+        attempt = entry.attempts + 1
+        if attempt >= self.max_attempts:
+            self.outbox.fail(entry.episode_id, str(result))
+            with self._lock:
+                self.failed += 1
+            print(f"❌ [uploader] Episode {entry.episode_id} failed {attempt} times and is parked in the outbox: {result}")
+            return
+        delay = self._backoff(attempt - 1)
+        self.outbox.fail(entry.episode_id, str(result), retry_in=delay)
+        print(f"🔁 [uploader] Episode {entry.episode_id} upload failed, retrying in {delay:.0f}s: {result}")
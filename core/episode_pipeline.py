@@ -0,0 +1,222 @@
+# core/episode_pipeline.py
+# Pipelined multi-episode production.
+#
+# Each episode flows through three stage groups, each served by its own worker thread:
+#
+#   writing       storyline -> script -> production plan      (LLM)
+#   production    asset generation -> final edit              (remote generation + ffmpeg)
+#   distribution  upload                                      (network)
+#
+# So while episode N is rendering or uploading, episode N+1 is already being written. Every stage group
+# handles one episode at a time, in episode order, so no agent is ever shared by two running crews.
+# Continuity is kept by committing each plot to series memory as soon as it is written, before the next
+# episode's storyline starts; the series state only advances once an episode is fully distributed.
+# With DISTRIBUTION_OUTBOX (the default), "distributed" means queued in the outbox: the upload itself runs
+# on the UploadWorker (core/distribution.py), so a slow uplink never holds back production.
+# Each episode keeps one tracer that every stage worker binds while handling it, so its trace.json
+# covers all three stages even though they run on different threads.
+import queue
+import threading
+import time
+
+from crewai import Crew, Process
+
+from core import resources, tracing
+from tasks.episode_tasks import create_crew_tasks, create_checkpointer, execute_production_plan, enqueue_episode
+from utils.file_handler import setup_episode_directory
+from config import TRACING_ENABLED, DISTRIBUTION_OUTBOX
+
+# How often a worker blocked on a full queue checks whether the pipeline was stopped.
+_QUEUE_POLL_SECONDS = 0.5
+
+STAGE_GROUPS = (
+    ("writing", ("storyline", "script", "production_plan")),
+    ("production", ("generate_videos", "generate_audio", "final_edit")),
+    ("distribution", ("upload",)),
+)
+
+
+class EpisodeJob:
+    """One episode moving through the pipeline."""
+
+    def __init__(self, episode_id: int, episode_path: str, tasks: list, checkpointer, pending: list):
+        self.episode_id = episode_id
+        self.episode_path = episode_path
+        self.tasks = tasks
+        self.checkpointer = checkpointer
+        self.pending_names = {t.name for t in pending}
+        self.stage_times = {}
+        self.tracer = tracing.Tracer(f"Episode {episode_id}", {"episode_id": episode_id})
+
+    def task(self, name):
+        return next((t for t in self.tasks if t.name == name), None)
+
+    def stage_tasks(self, stage: str) -> list:
+        names = dict(STAGE_GROUPS)[stage]
+        return [t for t in self.tasks if t.name in names and t.name in self.pending_names]
+
+
+class EpisodePipeline:
+    def __init__(self, first_episode_id: int, count: int, youtube_agent_factory, on_episode_done=None,
+                 resume: bool = False):
+        self.first_episode_id = first_episode_id
+        self.count = count
+        self.youtube_agent_factory = youtube_agent_factory
+        self.on_episode_done = on_episode_done
+        self.resume = resume
+        self._stop = threading.Event()
+        self._errors = []
+        # maxsize=1 keeps writing at most one episode ahead of production, and production one ahead of upload.
+        self._to_production = queue.Queue(maxsize=1)
+        self._to_distribution = queue.Queue(maxsize=1)
+        self._youtube_agent = None
+
+    # --- Helpers ---
+    def _prepare(self, episode_id: int) -> EpisodeJob:
+        episode_path = setup_episode_directory(episode_id, reuse_existing=self.resume)
+        tasks = create_crew_tasks(episode_id, episode_path, self._youtube_agent, defer_dispatch=True)
+        # Asset generation belongs to the production stage, so the checkpointer must not regenerate here.
+        checkpointer = create_checkpointer(episode_id, episode_path, repair_assets=False)
+        checkpointer.attach(tasks)
+        pending = checkpointer.pending(tasks) if self.resume else tasks
+        return EpisodeJob(episode_id, episode_path, tasks, checkpointer, pending)
+
+    @staticmethod
+    def _run_crew(job: EpisodeJob, stage: str):
+        stage_tasks = job.stage_tasks(stage)
+        if not stage_tasks:
+            return None
+        agents = list({id(t.agent): t.agent for t in stage_tasks}.values())
+        crew = Crew(agents=agents, tasks=stage_tasks, process=Process.sequential, verbose=True)
+        with tracing.use_tracer(job.tracer), tracing.span(stage, "stage"):
+            return crew.kickoff()
+
+    def _fail(self, job, stage, error):
+        print(f"❌ Episode {job.episode_id if job else '?'} failed in {stage}: {error}")
+        self._errors.append((job.episode_id if job else None, stage, error))
+        self._stop.set()
+        if job is not None:
+            self._export_trace(job)
+
+    def _put(self, outbox: queue.Queue, job: EpisodeJob) -> bool:
+        """Hands `job` to the next stage. Gives up (returns False) once the pipeline is stopped, so a worker never
+        blocks for good on a stage that no longer reads."""
+        while not self._stop.is_set():
+            try:
+                outbox.put(job, timeout=_QUEUE_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _jobs(self, inbox: queue.Queue):
+        """Yields the jobs from `inbox` until the end-of-stream sentinel (None). After a stop the remaining jobs
+        are read and dropped rather than left in the queue, so the upstream worker can always finish."""
+        while True:
+            job = inbox.get()
+            if job is None:
+                return
+            if not self._stop.is_set():
+                yield job
+
+    @staticmethod
+    def _export_trace(job: EpisodeJob):
+        if not TRACING_ENABLED:
+            return
+        try:
+            job.tracer.export(job.episode_path)
+        except OSError as e:
+            print(f"⚠️ Could not write the trace for Episode {job.episode_id}: {e}")
+
+    # --- Stage workers ---
+    def _writing_worker(self):
+        try:
+            for episode_id in range(self.first_episode_id, self.first_episode_id + self.count):
+                if self._stop.is_set():
+                    break
+                job = None
+                try:
+                    job = self._prepare(episode_id)
+                    started = time.perf_counter()
+                    print(f"✍️ [writing] Episode {episode_id}")
+                    self._run_crew(job, "writing")
+                    # Commit the plot before the next storyline starts, so episode N+1 builds on episode N.
+                    resources.get("memory_manager").add_episode_summary(episode_id, job.task("storyline").output.raw)
+                    job.stage_times["writing"] = time.perf_counter() - started
+                except Exception as e:
+                    self._fail(job, "writing", e)
+                    break
+                if not self._put(self._to_production, job):
+                    break
+        finally:
+            # Never blocks for good: the production worker reads its queue until this sentinel, even after a stop.
+            self._to_production.put(None)
+
+    def _production_worker(self):
+        jobs = self._jobs(self._to_production)
+        try:
+            for job in jobs:
+                try:
+                    started = time.perf_counter()
+                    print(f"🎬 [production] Episode {job.episode_id}")
+                    plan_task = job.task("production_plan")
+                    if plan_task.callback is not None and job.checkpointer.missing_assets(plan_task, job.tasks):
+                        with tracing.use_tracer(job.tracer):
+                            execute_production_plan(plan_task.output, episode_path=job.episode_path,
+                                                    episode_id=job.episode_id)
+                        job.checkpointer.save(plan_task, job.tasks)
+                    self._run_crew(job, "production")
+                    job.stage_times["production"] = time.perf_counter() - started
+                except Exception as e:
+                    self._fail(job, "production", e)
+                    continue
+                self._put(self._to_distribution, job)
+        except BaseException:
+            # Per-episode errors are handled above; anything else stops the pipeline.
+            self._stop.set()
+            raise
+        finally:
+            for _ in jobs:  # Reads the rest of the input up to the sentinel (nothing is yielded after a stop).
+                pass
+            self._to_distribution.put(None)
+
+    def _distribution_worker(self):
+        jobs = self._jobs(self._to_distribution)
+        try:
+            for job in jobs:
+                try:
+                    started = time.perf_counter()
+                    print(f"📤 [distribution] Episode {job.episode_id}")
+                    self._run_crew(job, "distribution")
+                    if DISTRIBUTION_OUTBOX:
+                        with tracing.use_tracer(job.tracer):
+                            enqueue_episode(job.episode_id, job.episode_path, job.tasks)
+                    job.stage_times["distribution"] = time.perf_counter() - started
+                    timings = ", ".join(f"{k} {v:.0f}s" for k, v in job.stage_times.items())
+                    print(f"✅ Episode {job.episode_id} complete ({timings}).")
+                    self._export_trace(job)
+                    if self.on_episode_done:
+                        self.on_episode_done(job.episode_id)
+                except Exception as e:
+                    self._fail(job, "distribution", e)
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            for _ in jobs:
+                pass
+
+    def run(self) -> list:
+        """Produces the episodes and returns a list of (episode_id, stage, error) for any failure."""
+        self._youtube_agent = self.youtube_agent_factory()
+        workers = [threading.Thread(target=fn, name=f"pipeline-{name}")
+                   for name, fn in (("writing", self._writing_worker),
+                                    ("production", self._production_worker),
+                                    ("distribution", self._distribution_worker))]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        print(f"🏁 Pipeline finished in {time.perf_counter() - started:.0f}s with {len(self._errors)} failure(s).")
+        return self._errors
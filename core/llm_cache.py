@@ -0,0 +1,209 @@
+# core/llm_cache.py
+# Record/replay cache around the shared chat model.
+#
+#   record        always call the model and store the answer (refreshes the cache)
+#   replay        answer only from the cache; a miss raises LLMCacheMiss (no credentials or network needed)
+#   read_through  answer from the cache when possible, otherwise call the model and store the answer
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from core import tracing
+from utils.production_plan import repair_json
+
+CACHE_MODES = ("record", "replay", "read_through")
+
+
+class LLMCacheMiss(Exception):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+
+class LLMResponseStore:
+    """SQLite-backed store of LLM responses keyed by a hash of (model, sampling params, normalized prompt)."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, prompt TEXT NOT NULL, "
+            "response TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, key: str, ttl_seconds: float = None) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        response, created_at = row
+        if ttl_seconds and time.time() - created_at > ttl_seconds:
+            return None
+        return json.loads(response)
+
+    def put(self, key: str, model: str, prompt: str, response: dict):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, prompt, response, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model, prompt, json.dumps(response, default=str), time.time())
+            )
+            self._db.commit()
+
+    def invalidate(self, model: str = None, older_than_seconds: float = None, prompt_contains: str = None) -> int:
+        """Deletes matching entries (all entries when called without filters). Returns the number removed."""
+        clauses, params = [], []
+        if model:
+            clauses.append("model = ?")
+            params.append(model)
+        if older_than_seconds is not None:
+            clauses.append("created_at < ?")
+            params.append(time.time() - older_than_seconds)
+        if prompt_contains:
+            clauses.append("prompt LIKE ?")
+            params.append(f"%{prompt_contains}%")
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            removed = self._db.execute(f"DELETE FROM responses{where}", params).rowcount
+            self._db.commit()
+        return removed
+
+    def clear(self) -> int:
+        return self.invalidate()
+
+
+def normalize_prompt(messages: List[BaseMessage]) -> str:
+    """Role-tagged message contents with whitespace collapsed, so formatting noise doesn't defeat the cache."""
+    parts = []
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content, sort_keys=True)
+        collapsed = re.sub(r"\s+", " ", content).strip()
+        parts.append(f"{message.type}: {collapsed}")
+    return "\n".join(parts)
+
+
+class CachedChatModel(BaseChatModel):
+    """Chat model wrapper that records and replays responses of `inner` through an LLMResponseStore."""
+
+    inner: Optional[BaseChatModel] = None
+    store: Any = None
+    mode: str = "read_through"
+    model_name: str = ""
+    sampling: dict = {}
+    ttl_seconds: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "cached-chat-model"
+
+    def _cache_key(self, prompt: str, stop, kwargs: dict) -> str:
+        payload = json.dumps({"model": self.model_name, "sampling": self.sampling, "stop": stop,
+                              "kwargs": kwargs, "prompt": prompt}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = normalize_prompt(messages)
+        key = self._cache_key(prompt, stop, kwargs)
+
+        if self.mode in ("replay", "read_through"):
+            cached = self.store.get(key, ttl_seconds=self.ttl_seconds)
+            if cached is not None:
+                tracing.annotate(cache_hit=True)
+                message = AIMessage(content=cached["content"], additional_kwargs=cached.get("additional_kwargs", {}))
+                return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"cache_hit": True})
+            if self.mode == "replay":
+                raise LLMCacheMiss(f"No recorded response for prompt (key {key[:12]}...): {prompt[:200]}")
+
+        if self.inner is None:
+            raise RuntimeError(f"LLM cache mode '{self.mode}' needs a live model, but none is configured.")
+        tracing.annotate(cache_hit=False, provider=self.inner._llm_type)
+        response = self.inner.invoke(messages, stop=stop, **kwargs)
+        self.store.put(key, self.model_name, prompt,
+                       {"content": response.content, "additional_kwargs": response.additional_kwargs})
+        return ChatResult(generations=[ChatGeneration(message=response)], llm_output={"cache_hit": False})
+
+
+def inline_json_schema(model) -> dict:
+    """The model's JSON schema with every $ref resolved, as schema-constrained decoding APIs expect."""
+    schema = model.model_json_schema()
+    definitions = schema.pop("$defs", {})
+
+    def _resolve(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return _resolve(definitions[node["$ref"].rsplit("/", 1)[-1]])
+            return {k: _resolve(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [_resolve(v) for v in node]
+        return node
+    return _resolve(schema)
+
+
+try:
+    from crewai.llms.base_llm import BaseLLM as _CrewBaseLLM
+except ImportError:  # older crewai releases take LangChain models directly
+    _CrewBaseLLM = None
+
+if _CrewBaseLLM is not None:
+    _ROLE_MESSAGES = {"system": SystemMessage, "assistant": AIMessage}
+
+    class CrewLLMAdapter(_CrewBaseLLM):
+        """crewai LLM that forwards calls to a LangChain chat model.
+
+        When crewai asks for a `response_model` (a task with `output_pydantic`), the model is asked for
+        schema-constrained JSON and the answer is validated and repaired locally, so neither a ReAct re-prompt
+        nor crewai's LLM-based converter is needed.
+        """
+
+        chat_model: Any = None
+        llm_type: str = "langchain"
+        structured_output: bool = True
+
+        def call(self, messages, tools=None, callbacks=None, available_functions=None,
+                 from_task=None, from_agent=None, response_model=None):
+            if isinstance(messages, str):
+                messages = [{"role": "user", "content": messages}]
+            converted = [_ROLE_MESSAGES.get(m["role"], HumanMessage)(content=m["content"]) for m in messages]
+            kwargs = {}
+            if response_model is not None and self.structured_output:
+                kwargs = {"response_mime_type": "application/json", "response_schema": inline_json_schema(response_model)}
+            # Named after the calling task, so the summary shows which stage the LLM time goes to.
+            with tracing.span(getattr(from_task, "name", None) or self.model, "llm",
+                              provider=self.chat_model._llm_type, model=self.model) as span_args:
+                span_args["bytes_in"] = sum(len(str(m["content"]).encode("utf-8")) for m in messages)
+                content = self.chat_model.invoke(converted, stop=self.stop or None, **kwargs).content
+                span_args["bytes_out"] = len(str(content).encode("utf-8"))
+                if response_model is None:
+                    return content
+                try:
+                    return response_model.model_validate_json(repair_json(content))
+                except ValueError as e:
+                    # Falls back to crewai's text protocol (and its converter) for this answer.
+                    span_args["structured_output_error"] = str(e)[:200]
+                    return content
+
+        def supports_function_calling(self) -> bool:
+            # Tools are driven through crewai's text (ReAct) protocol, which works for any chat model.
+            return False
+
+
+def as_crew_llm(chat_model: BaseChatModel, structured_output: bool = True):
+    """Makes a LangChain chat model usable as a crewai agent LLM.
+
+    Recent crewai releases rebuild any LLM object that isn't their own from its model name, which would
+    silently bypass wrappers such as CachedChatModel, so the model is wrapped in CrewLLMAdapter there.
+    """
+    if _CrewBaseLLM is None:
+        return chat_model
+    return CrewLLMAdapter(model=getattr(chat_model, "model_name", "") or chat_model._llm_type, chat_model=chat_model,
+                          structured_output=structured_output)
@@ -1,39 +1,189 @@
 # core/resources.py
-import os
-from langchain_google_vertexai import ChatVertexAI
+# Lazy registry of the shared LLM, memory and tool instances.
+#
+# Nothing is built at import time. `get("llm")` constructs the resource on first use and keeps it for the
+# life of the process, so a utility that only needs the LLM never pays for TTS/ElevenLabs/YouTube clients,
+# and a broken credential for one provider only fails the code paths that actually use it. Call `get` when a
+# job runs (agents are built by factory functions for this reason): a module-level
+# `from core.resources import llm` builds the resource as soon as that module is imported.
+import threading
+import time
 
-# --- IMPORTS FOR THE KEN BURNS ARCHITECTURE ---
-# core/resources.py
-from tools.memory_tool import MemoryReaderTool, MemoryWriterTool
-# CORRECTED IMPORTS: We are importing the two separate tools, not the LTX tool.
-from tools.huggingface_tools import HuggingFaceImageGeneratorTool, HuggingFaceVideoGeneratorTool
-# CORRECTED IMPORTS: We are importing the new HF music tool.
-from tools.audio_tools import VoiceGeneratorTool, SfxGeneratorTool, HuggingFaceMusicGeneratorTool
-from tools.compiler_tool import VideoCompilerTool
-from tools.youtube_tool import YouTubeUploaderTool
-from utils.memory_manager import MemoryManager
+from core import tracing
+
+_FACTORIES = {}
+_PROVIDERS = {}
+_INSTANCES = {}
+_LOCKS = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def resource(name, provider: str = None):
+    """Registers a zero-argument factory under `name`. `provider` labels the tool's spans in traces."""
+    def decorator(factory):
+        _FACTORIES[name] = factory
+        _PROVIDERS[name] = provider
+        _LOCKS[name] = threading.Lock()
+        return factory
+    return decorator
+
+
+def get(name):
+    """Returns the named resource, building it on first use. Failed builds are not cached and can be retried."""
+    if name in _INSTANCES:
+        return _INSTANCES[name]
+    if name not in _FACTORIES:
+        raise KeyError(f"Unknown resource '{name}'. Available: {sorted(_FACTORIES)}")
+    with _LOCKS[name]:
+        if name not in _INSTANCES:
+            started = time.perf_counter()
+            instance = tracing.instrument_tool(_FACTORIES[name](), _PROVIDERS[name])
+            with _REGISTRY_LOCK:
+                _INSTANCES[name] = instance
+            print(f"🔧 Initialized {name} in {time.perf_counter() - started:.2f}s")
+    return _INSTANCES[name]
+
+
+def override(name, instance):
+    """Replaces a resource with a prebuilt instance (e.g. a local stand-in for a remote provider)."""
+    if name not in _FACTORIES:
+        raise KeyError(f"Unknown resource '{name}'.")
+    with _REGISTRY_LOCK:
+        _INSTANCES[name] = tracing.instrument_tool(instance, _PROVIDERS[name])
+
+
+def is_initialized(name) -> bool:
+    return name in _INSTANCES
+
+
+def prewarm(names=None, background=True):
+    """Builds the given resources (default: all) ahead of use, optionally on a daemon thread.
+
+    Failures are reported but never raised, so one misconfigured provider doesn't stop the others.
+    """
+    names = list(names or _FACTORIES)
+
+    def _warm():
+        for name in names:
+            try:
+                get(name)
+            except Exception as e:
+                print(f"⚠️ Could not pre-warm {name}: {e}")
+
+    if not background:
+        _warm()
+        return None
+    thread = threading.Thread(target=_warm, name="resource-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def __getattr__(name):
+    # PEP 562: keeps `from core.resources import llm, voice_tool` working while staying lazy.
+    if name in _FACTORIES:
+        return get(name)
+    raise AttributeError(f"module 'core.resources' has no attribute '{name}'")
 
 
 # --- Initialize the LLM ---
-llm = ChatVertexAI(
-    model_name="gemini-2.0-flash-001", # Vertex AI uses slightly different model names
-    project="multi-agentic-animme" # You need to specify your project ID
-)
-
-# --- Initialize ALL Tools ---
-# Note: LocalImageGeneratorTool will download models on first run.
-print("Initializing tools...")
-memory_manager = MemoryManager(collection_name="mtuthuko_series_memory")
-memory_reader_tool = MemoryReaderTool(memory_manager=memory_manager)
-memory_writer_tool = MemoryWriterTool(memory_manager=memory_manager)
-
-# CORRECTED INSTANTIATION
-hf_image_tool = HuggingFaceImageGeneratorTool()
-hf_video_tool = HuggingFaceVideoGeneratorTool()
-voice_tool = VoiceGeneratorTool()
-sfx_tool = SfxGeneratorTool()
-hf_music_tool = HuggingFaceMusicGeneratorTool() # Using the new HF music tool
-compiler_tool = VideoCompilerTool()
-youtube_tool = YouTubeUploaderTool()
-print("All tools initialized.")
+@resource("llm")
+def _build_llm():
+    from config import (LLM_MODEL_NAME, LLM_PROJECT, LLM_SAMPLING, LLM_CACHE_MODE, LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS,
+                        LLM_STRUCTURED_OUTPUT)
+    inner = None
+    if LLM_CACHE_MODE != "replay":
+        # Replay mode runs fully offline, so Vertex is never contacted (or even imported).
+        from langchain_google_vertexai import ChatVertexAI
+        inner = ChatVertexAI(
+            model_name=LLM_MODEL_NAME, # Vertex AI uses slightly different model names
+            project=LLM_PROJECT, # You need to specify your project ID
+            **LLM_SAMPLING
+        )
+    from core.llm_cache import CachedChatModel, LLMResponseStore, CACHE_MODES, as_crew_llm
+    if LLM_CACHE_MODE == "off":
+        return as_crew_llm(inner, LLM_STRUCTURED_OUTPUT)
+
+    if LLM_CACHE_MODE not in CACHE_MODES:
+        raise ValueError(f"LLM_CACHE_MODE must be 'off' or one of {CACHE_MODES}, got '{LLM_CACHE_MODE}'.")
+    print(f"🧠 LLM cache enabled in '{LLM_CACHE_MODE}' mode ({LLM_CACHE_PATH})")
+    return as_crew_llm(CachedChatModel(inner=inner, store=LLMResponseStore(LLM_CACHE_PATH), mode=LLM_CACHE_MODE,
+                                       model_name=LLM_MODEL_NAME, sampling=LLM_SAMPLING, ttl_seconds=LLM_CACHE_TTL_SECONDS),
+                       LLM_STRUCTURED_OUTPUT)
+
+
+# --- Memory ---
+@resource("memory_manager")
+def _build_memory_manager():
+    from utils.memory_manager import MemoryManager
+    return MemoryManager(collection_name="mtuthuko_series_memory")
+
+@resource("memory_reader_tool", provider="chroma")
+def _build_memory_reader_tool():
+    from tools.memory_tool import MemoryReaderTool
+    return MemoryReaderTool(memory_manager=get("memory_manager"))
+
+@resource("memory_writer_tool", provider="chroma")
+def _build_memory_writer_tool():
+    from tools.memory_tool import MemoryWriterTool
+    return MemoryWriterTool(memory_manager=get("memory_manager"))
+
+@resource("shot_index")
+def _build_shot_index():
+    from config import SHOT_LIBRARY_DIR
+    from utils.shot_index import ShotIndex
+    memory = get("memory_manager")
+    # Shares the memory's Chroma client and cached embedding function.
+    return ShotIndex(memory.client, memory.embedding_function, SHOT_LIBRARY_DIR)
+
+@resource("character_store")
+def _build_character_store():
+    from config import CHARACTER_STORE_DIR
+    from utils.character_store import CharacterStore
+    # Portraits are made with the same image tool as the frames; descriptions embed with the memory's function.
+    # The remote image tool takes no reference image, so with it the store only supplies character tags.
+    return CharacterStore(CHARACTER_STORE_DIR, get("hf_image_tool"), get("memory_manager").embedding_function)
+
+
+# --- Generation Tools ---
+@resource("hf_image_tool", provider="huggingface")
+def _build_hf_image_tool():
+    from tools.huggingface_tools import HuggingFaceImageGeneratorTool
+    return HuggingFaceImageGeneratorTool()
+
+@resource("hf_video_tool", provider="huggingface")
+def _build_hf_video_tool():
+    from tools.huggingface_tools import HuggingFaceVideoGeneratorTool
+    return HuggingFaceVideoGeneratorTool()
+
+@resource("voice_tool", provider="google_tts")
+def _build_voice_tool():
+    from tools.audio_tools import VoiceGeneratorTool
+    return VoiceGeneratorTool()
+
+@resource("sfx_tool", provider="elevenlabs")
+def _build_sfx_tool():
+    from tools.audio_tools import SfxGeneratorTool
+    return SfxGeneratorTool()
+
+@resource("hf_music_tool", provider="huggingface")
+def _build_hf_music_tool():
+    from tools.audio_tools import HuggingFaceMusicGeneratorTool
+    return HuggingFaceMusicGeneratorTool() # Using the new HF music tool
+
+
+# --- Post-Production & Distribution ---
+@resource("compiler_tool", provider="ffmpeg")
+def _build_compiler_tool():
+    from tools.compiler_tool import VideoCompilerTool
+    return VideoCompilerTool()
+
+@resource("youtube_tool", provider="youtube")
+def _build_youtube_tool():
+    from tools.youtube_tool import YouTubeUploaderTool
+    return YouTubeUploaderTool()
 
+@resource("outbox")
+def _build_outbox():
+    from config import OUTBOX_PATH
+    from utils.outbox import DistributionOutbox
+    return DistributionOutbox(OUTBOX_PATH)
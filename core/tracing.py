@@ -0,0 +1,224 @@
+# core/tracing.py
+# Span tracing for tasks, tools and LLM calls, exported per episode as a Chrome trace.
+#
+# A Tracer collects spans for one episode. It is bound to the running code through a context variable,
+# so spans from concurrent episodes (see core/episode_pipeline.py) never mix; work handed to a thread
+# pool carries the binding along when submitted through `in_context`. Without a bound tracer every
+# helper here is a cheap no-op.
+#
+# Each span records its start/end and free-form args; the instrumentation fills in bytes_in/bytes_out,
+# retries, cache_hit, provider and error. `Tracer.export` writes the spans as Chrome trace events (open
+# the file in chrome://tracing or ui.perfetto.dev) with a per-(category, name) summary under "otherData".
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import TRACING_ENABLED, TRACE_FILE_NAME
+
+_current_tracer = contextvars.ContextVar("current_tracer", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    def __init__(self, name: str, metadata: dict = None):
+        self.name = name
+        self.metadata = metadata or {}
+        self.spans = []
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._epoch = time.perf_counter()
+        self.started_at = time.time()
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._epoch) * 1e6
+
+    @contextmanager
+    def span(self, name: str, category: str, **args):
+        """Records a span around the block. Yields its args dict, which the block may add to."""
+        thread = threading.current_thread()
+        record = {"name": name, "cat": category, "ts": self._now_us(), "tid": thread.ident, "args": dict(args)}
+        token = _current_span.set(record["args"])
+        try:
+            yield record["args"]
+        except BaseException as e:
+            record["args"]["error"] = f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            _current_span.reset(token)
+            record["dur"] = self._now_us() - record["ts"]
+            with self._lock:
+                self.spans.append(record)
+                self._threads.setdefault(thread.ident, thread.name)
+
+    # --- Export ---
+    def summary(self) -> list:
+        """One row per (category, name): calls, total/mean/max seconds, bytes, cache hits, retries, errors."""
+        rows = {}
+        for s in self.spans:
+            row = rows.setdefault((s["cat"], s["name"]), {
+                "category": s["cat"], "name": s["name"], "calls": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+                "bytes_in": 0, "bytes_out": 0, "cache_hits": 0, "retries": 0, "errors": 0})
+            seconds = s["dur"] / 1e6
+            args = s["args"]
+            row["calls"] += 1
+            row["total_seconds"] += seconds
+            row["max_seconds"] = max(row["max_seconds"], seconds)
+            row["bytes_in"] += args.get("bytes_in", 0)
+            row["bytes_out"] += args.get("bytes_out", 0)
+            row["cache_hits"] += 1 if args.get("cache_hit") else 0
+            row["retries"] += args.get("retries", 0)
+            row["errors"] += 1 if args.get("error") else 0
+        for row in rows.values():
+            row["mean_seconds"] = row["total_seconds"] / row["calls"]
+        return sorted(rows.values(), key=lambda r: r["total_seconds"], reverse=True)
+
+    def chrome_trace(self) -> dict:
+        pid = os.getpid()
+        with self._lock:
+            spans, threads = list(self.spans), dict(self._threads)
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in threads.items()]
+        events += [{"name": s["name"], "cat": s["cat"], "ph": "X", "ts": round(s["ts"], 1),
+                    "dur": round(s["dur"], 1), "pid": pid, "tid": s["tid"], "args": s["args"]}
+                   for s in sorted(spans, key=lambda s: s["ts"])]
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": dict(self.metadata, name=self.name, started_at=self.started_at, summary=self.summary())}
+
+    def export(self, directory: str, print_summary: bool = True) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, TRACE_FILE_NAME)
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f, default=str)
+        if print_summary:
+            print(format_summary(self.summary(), title=f"⏱️ Trace summary for {self.name} ({path})"))
+        return path
+
+
+def format_summary(rows: list, title: str = "⏱️ Trace summary", limit: int = 25) -> str:
+    lines = [title, f"{'category':<10}{'name':<34}{'calls':>6}{'total s':>10}{'mean s':>9}{'max s':>9}"
+                    f"{'MB in':>8}{'MB out':>8}{'cached':>7}{'retry':>6}{'err':>5}"]
+    for r in rows[:limit]:
+        lines.append(f"{r['category']:<10}{r['name'][:33]:<34}{r['calls']:>6}{r['total_seconds']:>10.2f}"
+                     f"{r['mean_seconds']:>9.2f}{r['max_seconds']:>9.2f}{r['bytes_in'] / 1e6:>8.1f}"
+                     f"{r['bytes_out'] / 1e6:>8.1f}{r['cache_hits']:>7}{r['retries']:>6}{r['errors']:>5}")
+    return "\n".join(lines)
+
+
+# --- Binding ---
+def current_tracer():
+    return _current_tracer.get()
+
+
+@contextmanager
+def use_tracer(tracer):
+    """Binds `tracer` to the current context (thread) for the duration of the block."""
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
+
+
+@contextmanager
+def episode_trace(episode_id: int, episode_path: str):
+    """Traces everything run inside the block and exports it to the episode directory afterwards."""
+    if not TRACING_ENABLED:
+        yield None
+        return
+    tracer = Tracer(f"Episode {episode_id}", {"episode_id": episode_id})
+    try:
+        with use_tracer(tracer):
+            yield tracer
+    finally:
+        tracer.export(episode_path)
+
+
+def in_context(fn):
+    """Wraps `fn` to run in a copy of the caller's context, so pool threads report to the caller's tracer."""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+@contextmanager
+def span(name: str, category: str, **args):
+    """A span on the bound tracer, or a throwaway args dict when nothing is being traced."""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield dict(args)
+        return
+    with tracer.span(name, category, **args) as span_args:
+        yield span_args
+
+
+def annotate(**args):
+    """Adds to the innermost open span (counters such as `retries` accumulate)."""
+    current = _current_span.get()
+    if current is None:
+        return
+    for key, value in args.items():
+        if key in ("retries", "bytes_in", "bytes_out") and key in current:
+            current[key] += value
+        else:
+            current[key] = value
+
+
+# --- Instrumentation ---
+def _file_state(kwargs: dict) -> dict:
+    state = {}
+    for key, value in kwargs.items():
+        if isinstance(value, str) and key.endswith("path") and os.path.isfile(value):
+            st = os.stat(value)
+            state[value] = (st.st_size, st.st_mtime_ns)
+    return state
+
+
+def instrument_tool(tool, provider: str = None):
+    """Wraps the tool instance's `_run` in a span. Files passed as *path arguments count as bytes in/out."""
+    if not TRACING_ENABLED or getattr(tool, "_traced", False) or not callable(getattr(tool, "_run", None)):
+        return tool
+    run = tool._run
+    name = getattr(tool, "name", type(tool).__name__)
+
+    @functools.wraps(run)
+    def _traced_run(*args, **kwargs):
+        if _current_tracer.get() is None:
+            return run(*args, **kwargs)
+        with span(name, "tool", provider=provider or "local") as span_args:
+            before = _file_state(kwargs)
+            result = run(*args, **kwargs)
+            after = _file_state(kwargs)
+            span_args["bytes_in"] = span_args.get("bytes_in", 0) + sum(size for size, _ in before.values())
+            span_args["bytes_out"] = span_args.get("bytes_out", 0) + sum(
+                size for path, (size, mtime) in after.items() if before.get(path) != (size, mtime))
+            if isinstance(result, str) and result.startswith("Error"):
+                span_args["error"] = result[:300]
+            return result
+
+    # Pydantic models reject unknown attributes, so the wrapper goes straight into the instance dict.
+    object.__setattr__(tool, "_run", _traced_run)
+    object.__setattr__(tool, "_traced", True)
+    return tool
+
+
+def instrument_tasks(tasks: list):
+    """Wraps each crew Task's execution in a span named after the task."""
+    if not TRACING_ENABLED:
+        return tasks
+    for task in tasks:
+        if getattr(task, "_traced", False):
+            continue
+        execute = task.execute_sync
+
+        def _traced_execute(*args, _execute=execute, _task=task, **kwargs):
+            agent = kwargs.get("agent") or _task.agent
+            with span(_task.name or "task", "task", agent=getattr(agent, "role", None)) as span_args:
+                output = _execute(*args, **kwargs)
+                span_args["bytes_out"] = len(getattr(output, "raw", "") or "")
+                return output
+
+        object.__setattr__(task, "execute_sync", _traced_execute)
+        object.__setattr__(task, "_traced", True)
+    return tasks
@@ -1,6 +1,6 @@
 # create_new_character.py
 from crewai import Task, Crew
-from agents.character_agents import character_creator_agent
+from agents.character_agents import build_character_creator_agent
 from dotenv import load_dotenv
 import textwrap
 
@@ -17,6 +17,8 @@ def run_character_creation():
         For example: 'A cynical but brilliant senior Data Scientist at FNB who becomes Mtuthuko's rival.'
         > """))
     
+    character_creator_agent = build_character_creator_agent()
+
     # Create the character creation task
     task_create_character = Task(
         description=(
@@ -58,7 +58,7 @@ def run_api_diagnostic():
 
 
 # Import agents from their respective files
-from agents.story_agents import storyline_agent, script_writer_agent
+from agents.story_agents import build_storyline_agent, build_script_writer_agent
 # ... (rest of your imports)
 
 # ... (rest of your existing code: get_current_episode_id, save_next_episode_id, etc.)
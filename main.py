@@ -1,4 +1,5 @@
 # main.py
+import argparse
 import os
 import schedule
 import time
@@ -8,13 +9,12 @@ from crewai import Agent, Crew, Process
 # Load environment variables first
 load_dotenv()
 
-from agents.story_agents import storyline_agent, script_writer_agent
-from agents.production_crew_agents import (
-    production_planner, video_director, audio_engineer, editor, video_director
-)
-from tasks.episode_tasks import create_crew_tasks
+from tasks.episode_tasks import create_crew_tasks, create_checkpointer, enqueue_episode
+from core.episode_pipeline import EpisodePipeline
+from core.distribution import UploadWorker
+from config import DISTRIBUTION_OUTBOX
 from utils.file_handler import setup_episode_directory
-from core.resources import youtube_tool, memory_writer_tool, memory_reader_tool, llm
+from core import resources, tracing
 
 # --- State Management ---
 STATE_FILE = "series_state.txt"
@@ -27,45 +27,61 @@ def get_current_episode_id():
 def save_next_episode_id(episode_id):
     with open(STATE_FILE, "w") as f: f.write(str(episode_id + 1))
 
-# --- Main Production Function ---
-def run_episode_creation_job():
-    print("🚀 Starting Local Visuals episode creation job...")
-    
-    episode_id = get_current_episode_id()
-    print(f"🎬 --- Creating Episode {episode_id} ---")
-    
-    episode_path = setup_episode_directory(episode_id)
-    os.makedirs("temp_assets", exist_ok=True)
-
+# --- Agents ---
+def build_youtube_agent():
     # Define YouTube Agent here for clarity
+    if DISTRIBUTION_OUTBOX:
+        # The background uploader publishes episodes; the crew never touches the YouTube client.
+        return None
     youtube_agent = Agent(
         role='Digital Distribution Manager',
         goal='Upload the final anime episode to YouTube and update the series memory.',
         backstory='You handle the final step of bringing the series to the world and ensuring the system remembers its creation.',
-        tools=[youtube_tool, memory_writer_tool],
-        llm=llm,
+        tools=[resources.get("youtube_tool"), resources.get("memory_writer_tool")],
+        llm=resources.get("llm"),
         verbose=True
     )
-    storyline_agent.tools = [memory_reader_tool]
+    return youtube_agent
 
-    tasks = create_crew_tasks(episode_id, episode_path, youtube_agent)
+# --- Main Production Function ---
+def run_episode_creation_job(resume: bool = False):
+    print("🚀 Starting Local Visuals episode creation job...")
+    # Build the remaining clients in the background while the story is being written.
+    resources.prewarm()
     
+    episode_id = get_current_episode_id()
+    print(f"🎬 --- Creating Episode {episode_id} ---")
+    
+    episode_path = setup_episode_directory(episode_id, reuse_existing=resume)
+    os.makedirs("temp_assets", exist_ok=True)
+
+    youtube_agent = build_youtube_agent()
+    tasks = create_crew_tasks(episode_id, episode_path, youtube_agent)
+    checkpointer = create_checkpointer(episode_id, episode_path)
+    checkpointer.attach(tasks)
+    # On resume, completed stages with unchanged inputs are restored from disk instead of re-run.
+    pending_tasks = checkpointer.pending(tasks) if resume else tasks
+
+    if not pending_tasks:
+        print(f"⏭️ All stages of Episode {episode_id} are already complete.")
+        if DISTRIBUTION_OUTBOX:
+            enqueue_episode(episode_id, episode_path, tasks)
+        save_next_episode_id(episode_id)
+        return
+
     anime_crew = Crew(
-        agents=[
-            storyline_agent, 
-            script_writer_agent,
-            production_planner,
-            video_director, # The only visual agent needed now
-            audio_engineer,
-            editor,
-            youtube_agent
-        ],
-        tasks=tasks,
+        agents=list({id(t.agent): t.agent for t in pending_tasks}.values()),
+        tasks=pending_tasks,
         process=Process.sequential,
         verbose=True
     )
     
-    result = anime_crew.kickoff()
+    # Every task, tool and LLM call is traced to <episode>/trace.json.
+    with tracing.episode_trace(episode_id, episode_path):
+        result = anime_crew.kickoff()
+        if DISTRIBUTION_OUTBOX:
+            # The upload runs on the background uploader; the plot is committed to memory right away.
+            enqueue_episode(episode_id, episode_path, tasks)
     
     print("\n\n✅ --- Episode Creation Job Finished ---")
     print(f"Episode {episode_id} final result: {result}")
@@ -73,7 +89,59 @@ def run_episode_creation_job():
     save_next_episode_id(episode_id)
     print(f"📈 System state updated. Ready for next episode: {episode_id + 1}")
 
+def run_pipelined_job(episode_count: int, resume: bool = False):
+    """Produces `episode_count` consecutive episodes, overlapping writing, production and upload."""
+    print(f"🚀 Starting pipelined production of {episode_count} episodes...")
+    resources.prewarm()
+    os.makedirs("temp_assets", exist_ok=True)
+
+    first_episode_id = get_current_episode_id()
+    pipeline = EpisodePipeline(first_episode_id, episode_count, build_youtube_agent,
+                               on_episode_done=save_next_episode_id, resume=resume)
+    failures = pipeline.run()
+    next_id = get_current_episode_id()
+    print(f"📈 System state updated. Ready for next episode: {next_id}")
+    return failures
+
+def start_uploader():
+    """Starts the background worker that uploads episodes from the distribution outbox (None if the crew uploads)."""
+    if not DISTRIBUTION_OUTBOX:
+        return None
+    return UploadWorker(resources.get("outbox")).start()
+
 if __name__ == "__main__":
     print("🌟 AI Anime Studio (Local Visuals) system is now RUNNING. 🌟")
     print("The first run will download several GB of models. Please be patient.")
-    run_episode_creation_job()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Produce the next episode of the series.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip stages already completed for the current episode (from its checkpoints).")
+    parser.add_argument("--episodes", type=int, default=1,
+                        help="Number of consecutive episodes to produce; more than one runs the stages as a pipeline.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Stay running and start a job every day at --at.")
+    parser.add_argument("--at", default="09:00", help="Daily start time (HH:MM) for --daemon.")
+    parser.add_argument("--upload-only", action="store_true",
+                        help="Only upload the episodes waiting in the distribution outbox, then exit.")
+    args = parser.parse_args()
+    # Queued episodes (including any left by an earlier run) upload in the background while new ones render.
+    uploader = start_uploader()
+
+    def job():
+        if args.episodes > 1:
+            run_pipelined_job(args.episodes, resume=args.resume)
+        else:
+            run_episode_creation_job(resume=args.resume)
+
+    if args.daemon:
+        schedule.every().day.at(args.at).do(job)
+        print(f"⏰ Next job scheduled for {args.at} daily.")
+        while True:
+            schedule.run_pending()
+            time.sleep(60)
+    elif not args.upload_only:
+        job()
+    if uploader is not None:
+        print(f"⏳ Waiting for {resources.get('outbox').outstanding()} queued upload(s)...")
+        if not uploader.drain():
+            print(f"⚠️ {resources.get('outbox').outstanding()} upload(s) left in the outbox for the next run.")
+        uploader.stop()
\ No newline at end of file
@@ -0,0 +1,192 @@
+# models/pool.py
+# Process-wide residency pool for the local diffusion pipelines.
+#
+# Pipelines are loaded on first use and kept while they fit the RAM budget. Loading one that doesn't fit
+# first evicts the least-recently-used idle pipelines, so alternating image and video phases reload
+# weights only when both can't stay resident together. A model in use is never evicted.
+#
+# Loads run outside the pool lock, so a slow load never blocks hits on other models or stats(). A load in
+# flight reserves its size hint against the budget, and other callers of the same model wait for it.
+import gc
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def estimate_footprint(model) -> int:
+    """Bytes held by the parameters and buffers of a torch module or of a diffusers pipeline's modules."""
+    import torch
+    if isinstance(model, torch.nn.Module):
+        modules = [model]
+    else:
+        modules = [c for c in getattr(model, "components", {}).values() if isinstance(c, torch.nn.Module)]
+    total = 0
+    for module in modules:
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def _release_accelerator_memory():
+    import sys
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+class _PendingLoad:
+    """A load in flight: callers that need the same model wait on `done` instead of loading it again."""
+
+    def __init__(self, reserved: int):
+        self.reserved = reserved
+        self.done = threading.Event()
+        self.error = None
+
+
+class ModelPool:
+    def __init__(self, budget_bytes: int, sizer=estimate_footprint):
+        self.budget_bytes = budget_bytes
+        self._sizer = sizer
+        self._loaders = {}
+        self._resident = OrderedDict()  # name -> {"model", "bytes", "in_use"}, least recently used first
+        self._loading = {}  # name -> _PendingLoad
+        self._stats = {}
+        # Guards the bookkeeping only; it is never held while a model loads.
+        self._lock = threading.RLock()
+
+    def register(self, name: str, loader, size_hint: int = 0):
+        """Declares how to load `name`. `size_hint` (bytes) is used to make room before the first load."""
+        with self._lock:
+            self._loaders[name] = (loader, size_hint)
+            self._stats.setdefault(name, {"hits": 0, "misses": 0, "loads": 0, "evictions": 0,
+                                          "load_seconds": 0.0, "bytes": size_hint})
+
+    def resident_bytes(self) -> int:
+        return sum(entry["bytes"] for entry in self._resident.values())
+
+    def _committed_bytes(self) -> int:
+        """Resident bytes plus the size hints reserved by loads in flight, so concurrent loads can't both fit."""
+        return self.resident_bytes() + sum(pending.reserved for pending in self._loading.values())
+
+    def _make_room(self, incoming: int, keep: str = None):
+        while self._resident and self._committed_bytes() + incoming > self.budget_bytes:
+            victim = next((name for name, entry in self._resident.items()
+                           if entry["in_use"] == 0 and name != keep), None)
+            if victim is None:
+                # Everything else is busy: run over budget rather than fail the job.
+                print(f"⚠️ Model pool over budget ({(self._committed_bytes() + incoming) / 1024**3:.1f} GB of "
+                      f"{self.budget_bytes / 1024**3:.1f} GB) with no idle model to evict.")
+                return
+            self.evict(victim)
+
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            entry = self._resident.get(name)
+            if entry is None or entry["in_use"]:
+                return False
+            del self._resident[name]
+            self._stats[name]["evictions"] += 1
+            del entry
+            gc.collect()
+            _release_accelerator_memory()
+            print(f"♻️ Model pool evicted '{name}' ({self.resident_bytes() / 1024**3:.1f} GB still resident).")
+            return True
+
+    def _load(self, name: str, pending: _PendingLoad) -> dict:
+        """Runs the loader without holding the lock and returns the new entry, already marked in use."""
+        loader, _ = self._loaders[name]
+        started = time.perf_counter()
+        try:
+            model = loader()
+            size = self._sizer(model)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[name]
+            pending.error = e
+            pending.done.set()
+            raise
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            stats = self._stats[name]
+            stats.update(loads=stats["loads"] + 1, load_seconds=stats["load_seconds"] + elapsed, bytes=size)
+            entry = {"model": model, "bytes": size, "in_use": 1}
+            self._resident[name] = entry
+            del self._loading[name]
+            print(f"📦 Model pool loaded '{name}' ({size / 1024**3:.1f} GB) in {elapsed:.1f}s.")
+            # The hint may have been low; trim other idle models if the real size doesn't fit.
+            self._make_room(0, keep=name)
+        pending.done.set()
+        return entry
+
+    def _acquire(self, name: str) -> dict:
+        """The resident entry for `name`, marked in use; loads it (or waits for the load in flight) if needed."""
+        while True:
+            with self._lock:
+                entry = self._resident.get(name)
+                if entry is not None:
+                    self._stats[name]["hits"] += 1
+                    self._resident.move_to_end(name)
+                    entry["in_use"] += 1
+                    return entry
+                if name not in self._loaders:
+                    raise KeyError(f"Model '{name}' is not registered with the pool.")
+                pending = self._loading.get(name)
+                if pending is None:
+                    self._stats[name]["misses"] += 1
+                    reserved = self._stats[name]["bytes"]
+                    self._make_room(reserved, keep=name)
+                    pending = self._loading[name] = _PendingLoad(reserved)
+                    load = True
+                else:
+                    load = False
+            if load:
+                return self._load(name, pending)
+            pending.done.wait()
+            if pending.error is not None:
+                raise RuntimeError(f"Loading model '{name}' failed: {pending.error}") from pending.error
+
+    @contextmanager
+    def use(self, name: str):
+        """Yields the named model, loading it if needed, and keeps it from being evicted until the block exits."""
+        entry = self._acquire(name)
+        try:
+            yield entry["model"]
+        finally:
+            with self._lock:
+                entry["in_use"] -= 1
+                # Settle any overshoot from loading while everything else was busy.
+                if self.resident_bytes() > self.budget_bytes:
+                    self._make_room(0)
+
+    def clear(self):
+        for name in list(self._resident):
+            self.evict(name)
+
+    def stats(self) -> dict:
+        """Per-model hits, misses, loads, evictions, total load time and size, plus pool totals."""
+        with self._lock:
+            return {
+                "models": {name: dict(s, resident=name in self._resident) for name, s in self._stats.items()},
+                "resident_bytes": self.resident_bytes(),
+                "budget_bytes": self.budget_bytes,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_model_pool() -> ModelPool:
+    """The process-wide pool, budgeted from MODEL_POOL_BUDGET_GB (or a fraction of physical RAM)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from config import MODEL_POOL_BUDGET_GB, MODEL_POOL_RAM_FRACTION
+            from models.runtime import total_memory_bytes
+            budget = int(MODEL_POOL_BUDGET_GB * 1024**3)
+            if not budget:
+                total = total_memory_bytes()
+                budget = int(total * MODEL_POOL_RAM_FRACTION) if total else 16 * 1024**3
+            _pool = ModelPool(budget)
+        return _pool
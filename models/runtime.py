@@ -0,0 +1,75 @@
+# models/runtime.py
+# Device, dtype and CPU-threading choices shared by the local diffusion models.
+import os
+
+import torch
+
+_DTYPES = {"float32": torch.float32, "bfloat16": torch.bfloat16, "float16": torch.float16}
+
+
+def pick_device() -> str:
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def cpu_supports_bf16() -> bool:
+    """True when the CPU has native bfloat16 matmul (AVX512-BF16 or AMX); elsewhere bf16 is emulated and slow."""
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def resolve_dtype(device: str, preference: str = "auto") -> torch.dtype:
+    """Maps a config string to a torch dtype. 'auto' is fp16 on GPUs, and bf16 or fp32 on CPU.
+
+    fp16 is never chosen for CPU: most CPU kernels don't implement it, and the ones that do are slow.
+    """
+    if preference != "auto":
+        if preference not in _DTYPES:
+            raise ValueError(f"Unknown dtype '{preference}'. Use 'auto' or one of {sorted(_DTYPES)}.")
+        return _DTYPES[preference]
+    if device in ("cuda", "mps"):
+        return torch.float16
+    return torch.bfloat16 if cpu_supports_bf16() else torch.float32
+
+
+def configure_cpu_threads(num_threads: int = 0) -> int:
+    """Sets torch's intra-op thread count (0 = every core this process may run on) and returns it."""
+    if not num_threads:
+        num_threads = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    torch.set_num_threads(num_threads)
+    try:
+        # One large op at a time is the fastest schedule for diffusion models; only settable before first use.
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    return num_threads
+
+
+def available_memory_bytes():
+    """Memory currently available to new allocations, or None when it can't be determined."""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def total_memory_bytes():
+    """Physical memory of the machine, or None when it can't be determined."""
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
@@ -5,74 +5,109 @@ from diffusers.utils import load_image, export_to_video
 from PIL import Image
 import gc
 
+from config import (SVD_MODEL_ID, SVD_DTYPE, SVD_CPU_THREADS, SVD_PRESETS, SVD_PRESET,
+                    SVD_DECODE_RAM_FRACTION, SVD_DECODE_BYTES_PER_PIXEL)
+from models.runtime import pick_device, resolve_dtype, configure_cpu_threads, available_memory_bytes
+from models.pool import get_model_pool
+
+# Approximate parameter count (UNet + VAE + image encoder), used to make room in the pool before the first load.
+_SVD_PARAMS = 2.1e9
+
 class SVDGenerator:
     _instance = None
-    pipe = None
     device = "cpu"
+    dtype = torch.float32
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = super(SVDGenerator, cls).__new__(cls)
-            
-            print(" SVD: Initializing LIGHTER Stable Video Diffusion Pipeline...")
-            # --- MODEL CHANGE IS HERE ---
-            # We are now using the smaller, less memory-intensive SVD model.
-            cls.pipe = StableVideoDiffusionPipeline.from_pretrained(
-                "stabilityai/stable-video-diffusion-img2vid", # The non-'xt' version
-                torch_dtype=torch.float16, 
-                variant="fp16"
-            )
-            
-            # Determine the device and configure it
-            if torch.cuda.is_available():
-                print(" SVD: CUDA (NVIDIA GPU) detected. Enabling offload.")
-                cls.device = "cuda"
-                # For CUDA, offloading is still the best strategy
-                cls.pipe.enable_model_cpu_offload()
-            elif torch.backends.mps.is_available():
-                print(" SVD: MPS (Apple Silicon GPU) detected. Moving pipe to MPS.")
-                cls.device = "mps"
-                # On Mac, we will try moving the whole pipe to the GPU.
-                # This lighter model should fit in memory.
-                cls.pipe.to(cls.device)
-            else:
-                print("⚠️ WARNING: No compatible GPU detected. SVD will run on CPU only.")
-                cls.device = "cpu"
-                cls.pipe.to(cls.device)
+            cls.device = pick_device()
+            cls.dtype = resolve_dtype(cls.device, SVD_DTYPE)
+            # The weights themselves are loaded lazily and kept resident by the shared model pool.
+            get_model_pool().register("svd", cls._load_pipeline,
+                                      size_hint=int(_SVD_PARAMS * torch.finfo(cls.dtype).bits // 8))
 
         return cls._instance
 
-    def generate(self, image_path: str, output_path: str):
-        # Ensure the pipe is on the correct device before running
-        self.pipe.to(self.device)
+    @classmethod
+    def _load_pipeline(cls):
+        print(f" SVD: Initializing LIGHTER Stable Video Diffusion Pipeline ({cls.device}, {cls.dtype})...")
+        # --- MODEL CHANGE IS HERE ---
+        # We are now using the smaller, less memory-intensive SVD model.
+        # The fp16 weights are downloaded either way and cast to the chosen dtype on load.
+        pipe = StableVideoDiffusionPipeline.from_pretrained(
+            SVD_MODEL_ID, # The non-'xt' version
+            torch_dtype=cls.dtype,
+            variant="fp16"
+        )
+
+        # The pipeline is placed once here; generate() never moves it again.
+        if cls.device == "cuda":
+            print(" SVD: CUDA (NVIDIA GPU) detected. Enabling offload.")
+            # For CUDA, offloading is still the best strategy
+            pipe.enable_model_cpu_offload()
+        elif cls.device == "mps":
+            print(" SVD: MPS (Apple Silicon GPU) detected. Moving pipe to MPS.")
+            # On Mac, we will try moving the whole pipe to the GPU.
+            # This lighter model should fit in memory.
+            pipe.to(cls.device)
+        else:
+            threads = configure_cpu_threads(SVD_CPU_THREADS)
+            print(f"⚠️ WARNING: No compatible GPU detected. SVD will run on CPU only ({threads} threads).")
+            # oneDNN convolutions are considerably faster on channels-last tensors.
+            pipe.unet.to(memory_format=torch.channels_last)
+        pipe.set_progress_bar_config(disable=True)
+        return pipe
+
+    def default_preset(self) -> str:
+        return SVD_PRESET or ("full" if self.device != "cpu" else "balanced")
+
+    def decode_chunk_size(self, width: int, height: int, num_frames: int) -> int:
+        """How many frames the VAE decodes at once: 8 on GPUs, as many as fit the RAM budget on CPU."""
+        if self.device != "cpu":
+            return 8
+        available = available_memory_bytes()
+        if available is None:
+            return 2
+        per_frame = width * height * SVD_DECODE_BYTES_PER_PIXEL * (0.5 if self.dtype != torch.float32 else 1.0)
+        return int(max(1, min(num_frames, available * SVD_DECODE_RAM_FRACTION // per_frame)))
+
+    def generate(self, image_path: str, output_path: str, preset: str = None,
+                 num_inference_steps: int = None, decode_chunk_size: int = None, seed: int = 42):
+        preset = preset or self.default_preset()
+        if preset not in SVD_PRESETS:
+            return f"Error: Unknown SVD preset '{preset}'. Use one of {sorted(SVD_PRESETS)}."
+        settings = SVD_PRESETS[preset]
+        width, height, num_frames = settings["width"], settings["height"], settings["num_frames"]
+        steps = num_inference_steps or settings["num_inference_steps"]
+        chunk = decode_chunk_size or self.decode_chunk_size(width, height, num_frames)
 
         try:
             print(f" SVD: Loading initial image from {image_path}")
             image = load_image(image_path)
             # This smaller model was trained on 256x256 images, but can be adapted.
             # We'll still use our target aspect ratio.
-            image = image.resize((1024, 576))
-
-            generator = torch.manual_seed(42)
-            
-            print(" SVD: Generating video frames with LIGHTER model...")
-            # This model generates fewer frames by default (14 instead of 25)
-            frames = self.pipe(image, decode_chunk_size=8, generator=generator).frames[0]
-            
+            image = image.resize((width, height))
+
+            generator = torch.Generator(device="cpu").manual_seed(seed)
+
+            print(f" SVD: Generating {num_frames} frames at {width}x{height}, {steps} steps, decode chunk {chunk} ('{preset}')...")
+            with get_model_pool().use("svd") as pipe, torch.inference_mode():
+                frames = pipe(
+                    image, height=height, width=width, num_frames=num_frames,
+                    num_inference_steps=steps, decode_chunk_size=chunk, generator=generator
+                ).frames[0]
+
             print(f" SVD: Exporting video to {output_path}")
-            # Generating at a slightly higher FPS as the clips are shorter
-            export_to_video(frames, output_path, fps=10)
-            
+            export_to_video(frames, output_path, fps=settings["fps"])
+
             return f"Successfully generated SVD video at {output_path}"
-        
+
         except Exception as e:
             return f"Error during SVD video generation on device '{self.device}': {e}"
-        
+
         finally:
-            print(" SVD: Cleaning up accelerator memory...")
-            # On CUDA, it's good practice to move back to CPU after offloading.
             if self.device == "cuda":
-                self.pipe.to("cpu")
                 torch.cuda.empty_cache()
             gc.collect()
 
@@ -86,4 +121,4 @@ if __name__ == '__main__':
     print("--- Running SVD Test with LIGHTER model ---")
     svd_gen = SVDGenerator()
     result = svd_gen.generate(dummy_image_path, "test_output.mp4")
-    print(f"--- Test Result: {result} ---")
\ No newline at end of file
+    print(f"--- Test Result: {result} ---")
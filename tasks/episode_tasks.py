@@ -1,41 +1,127 @@
 # tasks/episode_tasks.py
 import os
+from functools import partial
 from crewai import Task
 from textwrap import dedent
-from config import SERIES_TITLE, CHARACTERS
-from agents.story_agents import storyline_agent, script_writer_agent
-from agents.production_crew_agents import (production_planner, video_director, audio_engineer, editor)
+from config import (SERIES_TITLE, CHARACTERS, DIRECT_PLAN_DISPATCH, SHOT_REUSE_ENABLED, CHARACTER_REFERENCES_ENABLED,
+                    DISTRIBUTION_OUTBOX)
+from agents.story_agents import build_storyline_agent, build_script_writer_agent
+from agents.production_crew_agents import build_production_planner, build_video_director, build_audio_engineer, build_editor
+from core import resources, tracing
+from utils.checkpoints import EpisodeCheckpointer
+from utils.plan_executor import PlanExecutor, parse_production_plan
+from utils.production_plan import ProductionPlan, PLAN_ASSET_DIR
+from utils.timeline import build_timeline, timeline_path
 
-def create_crew_tasks(episode_id: int, episode_path: str, youtube_agent):
-    asset_dir = "temp_assets"
-    
-    task_storyline = Task(description=f"Develop a plot for Episode {episode_id}.", expected_output="A detailed plot summary.", agent=storyline_agent)
-    task_script = Task(description="Write a script based on the plot.", expected_output="A full script as a single block of text.", context=[task_storyline], agent=script_writer_agent)
+def plan_of(task_output):
+    """The validated plan a planner task produced (its raw JSON when restored from a checkpoint)."""
+    return task_output.pydantic if isinstance(task_output.pydantic, ProductionPlan) else task_output.raw
+
+def write_timeline(plan, episode_path: str, episode_id: int = None) -> str:
+    """Builds the episode's timeline from the production plan and saves it as the compiler's input."""
+    with tracing.span("build_timeline", "stage"):
+        timeline = build_timeline(parse_production_plan(plan), episode_id)
+        path = timeline.save(timeline_path(episode_path))
+    print(f"🎞️ Timeline: {len(timeline.clips)} clips, {len(timeline.events())} audio events, {timeline.duration:.1f}s -> {path}")
+    return path
+
+def execute_production_plan(task_output, episode_path: str = None, episode_id: int = None):
+    """Task callback: generates every asset in the production plan without routing tool calls through an LLM,
+    then writes the episode timeline when `episode_path` is given."""
+    executor = PlanExecutor(tools={
+        "image": resources.get("hf_image_tool"), "video": resources.get("hf_video_tool"),
+        "dialogue": resources.get("voice_tool"), "sfx": resources.get("sfx_tool"), "music": resources.get("hf_music_tool"),
+    }, shot_index=resources.get("shot_index") if SHOT_REUSE_ENABLED else None,
+       character_store=resources.get("character_store") if CHARACTER_REFERENCES_ENABLED else None)
+    with tracing.span("execute_production_plan", "stage"):
+        results = executor.run(plan_of(task_output), episode_id)
+    if episode_path:
+        write_timeline(plan_of(task_output), episode_path, episode_id)
+    return results
+
+def final_video_path(episode_id: int, episode_path: str) -> str:
+    return os.path.join(episode_path, f"episode_{episode_id}.mp4")
+
+# YouTube rejects descriptions over 5000 bytes or containing angle brackets.
+_MAX_DESCRIPTION_BYTES = 5000
+
+def episode_title(episode_id: int) -> str:
+    return f"{SERIES_TITLE} - Episode {episode_id}"
+
+def episode_description(episode_id: int, plot: str) -> str:
+    text = f"{episode_title(episode_id)}\n\n{plot.strip()}".replace("<", "(").replace(">", ")")
+    return text.encode("utf-8")[:_MAX_DESCRIPTION_BYTES].decode("utf-8", "ignore")
+
+def enqueue_episode(episode_id: int, episode_path: str, tasks: list) -> str:
+    """Commits the episode's plot to series memory, then queues the compiled episode in the distribution outbox.
+
+    The memory write doesn't wait for (or depend on) the upload, which the background UploadWorker does."""
+    plot = next(t for t in tasks if t.name == "storyline").output.raw
+    with tracing.span("commit_memory", "stage"):
+        resources.get("memory_manager").add_episode_summary(episode_id, plot)
+    video_path = os.path.abspath(final_video_path(episode_id, episode_path))
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"Episode {episode_id} has no compiled video at {video_path}")
+    queued = resources.get("outbox").enqueue(episode_id, video_path, episode_title(episode_id),
+                                             episode_description(episode_id, plot),
+                                             {"episode_path": os.path.abspath(episode_path)})
+    print(f"📮 Episode {episode_id} {'queued for upload' if queued else 'is already uploaded'}.")
+    return video_path
+
+def create_checkpointer(episode_id: int, episode_path: str, direct_dispatch: bool = DIRECT_PLAN_DISPATCH,
+                        repair_assets: bool = True) -> EpisodeCheckpointer:
+    """Builds the checkpointer that knows which stage owns which assets for this task layout."""
+    stage_assets = {"final_edit": ("episode",)}
+    repairers = {}
+    if direct_dispatch:
+        stage_assets["production_plan"] = ("video", "audio")
+        if repair_assets:
+            repairers["production_plan"] = partial(execute_production_plan, episode_path=episode_path,
+                                                   episode_id=episode_id)
+    else:
+        stage_assets.update(generate_videos=("video",), generate_audio=("audio",))
+    return EpisodeCheckpointer(episode_path, final_video_path(episode_id, episode_path), stage_assets, repairers)
+
+def create_crew_tasks(episode_id: int, episode_path: str, youtube_agent, direct_dispatch: bool = DIRECT_PLAN_DISPATCH,
+                      defer_dispatch: bool = False):
+    """Builds the episode's tasks and their agents. With `defer_dispatch`, a direct-dispatch plan is not executed
+    by the plan task's callback; the caller runs execute_production_plan itself (used by the pipelined mode)."""
+    asset_dir = PLAN_ASSET_DIR
+    storyline_agent, script_writer_agent = build_storyline_agent(), build_script_writer_agent()
+    production_planner, video_director = build_production_planner(), build_video_director()
+    audio_engineer, editor = build_audio_engineer(), build_editor()
+    if CHARACTER_REFERENCES_ENABLED and direct_dispatch and resources.get("character_store").generates_portraits:
+        # Executed plans condition every frame on the characters' reference portraits, so prompts only name them.
+        # Image tools that can't take a reference (the remote default) still need the descriptions.
+        character_rule = (f"name the characters in the shot ({', '.join(CHARACTERS)}) but do not describe their "
+                          "appearance; their look comes from fixed reference portraits")
+    else:
+        character_rule = f"include detailed character descriptions from this list: {CHARACTERS}"
+
+    task_storyline = Task(name="storyline", description=f"Develop a plot for Episode {episode_id}.", expected_output="A detailed plot summary.", agent=storyline_agent)
+    task_script = Task(name="script", description="Write a script based on the plot.", expected_output="A full script as a single block of text.", context=[task_storyline], agent=script_writer_agent)
 
     task_production_plan = Task(
+        name="production_plan",
         description=dedent(f"""\
-            Read the script and create a detailed JSON production plan.
-            This plan MUST ONLY use the asset types that the crew can create: visuals via image-then-video, and audio.
-            The JSON MUST have two keys: 'video_plan' and 'audio_plan'.
-
-            1. 'video_plan': A list of scene clips. Each clip object MUST have:
-               - 'clip_id': A unique ID (e.g., 'clip_01').
-               - 'image_prompt': A detailed text prompt for the 'Image Generator' tool. This prompt MUST be in a cinematic, anime style and include detailed character descriptions from this list: {CHARACTERS}.
-               - 'image_path': The file path for this initial frame (e.g., '{asset_dir}/frame_01.png').
-               - 'video_path': The file path for the final video clip (e.g., '{asset_dir}/clip_01.mp4').
-            
-            2. 'audio_plan': A list of all audio assets. Each asset object MUST have:
-               - 'audio_id': A unique ID (e.g., 'dialogue_01').
-               - 'type': 'dialogue', 'sfx', or 'music'.
-               - 'text_or_prompt': The dialogue text for 'dialogue' or a descriptive prompt for 'sfx' and 'music'.
-               - 'output_path': The file path (e.g., '{asset_dir}/dialogue_01.mp3').
+            Read the script and create the production plan.
+            The plan MUST ONLY use the asset types that the crew can create: visuals via image-then-video, and audio.
+            - 'video_plan': one entry per scene clip, in episode order. Each 'image_prompt' MUST be in a cinematic, anime style and {character_rule}.
+            - 'audio_plan': every dialogue line (in script order, one per clip where possible), sound effect and music track.
+            - All file paths go under '{asset_dir}/'.
             """),
-        expected_output="A single, valid JSON object with 'video_plan' and 'audio_plan'.",
+        expected_output="The production plan as a JSON object with 'video_plan' and 'audio_plan'.",
         context=[task_script],
-        agent=production_planner
+        agent=production_planner,
+        # The answer is requested as schema-constrained JSON and validated (and repaired) locally.
+        output_pydantic=ProductionPlan,
+        # In direct-dispatch mode the plan is executed as soon as it is written (see execute_production_plan).
+        callback=(partial(execute_production_plan, episode_path=episode_path, episode_id=episode_id)
+                  if direct_dispatch and not defer_dispatch else None)
     )
 
     task_generate_videos = Task(
+        name="generate_videos",
         description=dedent("""\
             Execute the 'video_plan' from the JSON production plan.
             For EACH item in the list, you must perform a two-step process:
@@ -48,29 +134,39 @@ def create_crew_tasks(episode_id: int, episode_path: str, youtube_agent):
     )
 
     task_generate_audio = Task(
+        name="generate_audio",
         description=f"Execute the 'audio_plan' from the JSON plan. Use 'Voice Generator' for dialogue, 'SFX Generator' for sfx, and 'Music Generator' for music.",
         expected_output="Confirmation that all audio assets have been generated successfully.",
         context=[task_production_plan],
-        agent=audio_engineer
+        agent=audio_engineer,
+        # Video and audio assets all exist once this task finishes, so the timeline can be measured.
+        callback=lambda _: write_timeline(plan_of(task_production_plan.output), episode_path, episode_id)
     )
 
     task_final_edit = Task(
+        name="final_edit",
         description=dedent(f"""\
             Assemble the final episode using the 'Video Compiler' tool.
-            - Get all 'video_path' values from the 'video_plan' for the 'video_paths' argument.
-            - Get all 'output_path' values from the 'audio_plan' for the 'audio_paths' argument.
-            - Find the music file for the 'music_path' argument.
-            - The final output path is '{os.path.join(episode_path, f"episode_{episode_id}.mp4")}'.
+            - The episode timeline (clip order, cuts and audio placement from the production plan) is at '{timeline_path(episode_path)}'; pass it as the 'timeline_path' argument.
+            - The final output path is '{final_video_path(episode_id, episode_path)}'.
             """),
         expected_output="The full path to the final compiled episode video.",
-        context=[task_generate_videos, task_generate_audio, task_production_plan],
+        context=[task_production_plan] if direct_dispatch else [task_generate_videos, task_generate_audio, task_production_plan],
         agent=editor
     )
 
+    if DISTRIBUTION_OUTBOX:
+        # Uploading happens off the crew: see enqueue_episode and core/distribution.py.
+        tasks = [task_storyline, task_script, task_production_plan]
+        if not direct_dispatch:
+            tasks += [task_generate_videos, task_generate_audio]
+        return tracing.instrument_tasks(tasks + [task_final_edit])
+
     task_upload = Task(
+        name="upload",
         description=dedent(f"""\
             The final episode has been created at the path from the previous task. Your job is twofold:
-            1. Upload the video file to YouTube. Title it '{SERIES_TITLE} - Episode {episode_id}'. Create a description based on the episode's plot summary.
+            1. Upload the video file to YouTube. Title it '{episode_title(episode_id)}'. Create a description based on the episode's plot summary.
             2. After uploading, use the 'Series Memory Writer' tool to save the plot summary for episode {episode_id}.
             """),
         expected_output="Confirmation of YouTube upload and memory update.",
@@ -78,8 +174,12 @@ def create_crew_tasks(episode_id: int, episode_path: str, youtube_agent):
         agent=youtube_agent
     )
 
-    return [
+    if direct_dispatch:
+        # All assets already exist once the plan task's callback returns.
+        return tracing.instrument_tasks([task_storyline, task_script, task_production_plan, task_final_edit, task_upload])
+
+    return tracing.instrument_tasks([
         task_storyline, task_script, task_production_plan,
         task_generate_videos, task_generate_audio,
         task_final_edit, task_upload
-    ]
\ No newline at end of file
+    ])
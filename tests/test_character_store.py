@@ -0,0 +1,58 @@
+# tests/test_character_store.py
+import os
+
+from config import CHARACTERS
+from utils.character_store import CharacterStore
+
+NAME, OTHER = list(CHARACTERS)[:2]
+
+
+class RemoteImageTool:
+    """An image tool without reference support, like the remote default."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def run(self, **kwargs):
+        self.calls += 1
+        return "Error: should not be called"
+
+
+class ReferenceImageTool:
+    """An image tool that takes references, like the local IP-Adapter pipeline."""
+
+    def __init__(self):
+        self.items = []
+
+    def generate_batch(self, items):
+        self.items += items
+        for _, path, *_ in items:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(b"png")
+        return [f"Image saved to {path}" for _, path, *_ in items]
+
+
+def test_prompts_are_left_alone_without_generating_portraits(tmp_path):
+    tool = RemoteImageTool()
+    store = CharacterStore(str(tmp_path), tool)
+    assert store.condition(f"{NAME} walks to the river") == (f"{NAME} walks to the river", None)
+    assert store.ensure() == {}
+    assert tool.calls == 0
+
+
+def test_portraits_are_generated_once_for_tools_that_take_references(tmp_path):
+    tool = ReferenceImageTool()
+    store = CharacterStore(str(tmp_path), tool)
+    prompt, reference = store.condition(f"{NAME} walks to the river")
+    assert prompt == f"{NAME} walks to the river"
+    assert os.path.exists(reference)
+    assert CharacterStore(str(tmp_path), tool).condition(f"{NAME} at dawn")[1] == reference
+    assert len(tool.items) == 1
+
+
+def test_characters_beside_the_reference_keep_their_descriptions(tmp_path):
+    store = CharacterStore(str(tmp_path), ReferenceImageTool())
+    prompt, reference = store.condition(f"{NAME} argues with {OTHER}")
+    assert reference == store.portrait(NAME).path
+    assert prompt == f"{NAME} argues with {OTHER}. Characters: {OTHER}: {CHARACTERS[OTHER].strip()}"
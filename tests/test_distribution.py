@@ -0,0 +1,67 @@
+# tests/test_distribution.py
+import threading
+
+from core.distribution import UploadWorker
+from utils.outbox import DONE, DistributionOutbox
+
+
+class SlowUploadTool:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started = threading.Event()
+
+    def run(self, **kwargs):
+        self.started.set()
+        threading.Event().wait(self.seconds)
+        return "Video uploaded. Video ID: abc123"
+
+
+def make_outbox(tmp_path) -> DistributionOutbox:
+    outbox = DistributionOutbox(str(tmp_path / "outbox.sqlite3"))
+    outbox.enqueue(1, "episode_1.mp4", "Episode 1", "The first episode.")
+    return outbox
+
+
+def test_a_long_upload_keeps_its_lease(tmp_path):
+    outbox = make_outbox(tmp_path)
+    tool = SlowUploadTool(seconds=1.0)
+    worker = UploadWorker(outbox, tool, lease_seconds=0.3, poll_seconds=0.05).start()
+    try:
+        assert tool.started.wait(5)
+        threading.Event().wait(0.6)  # Twice the lease: without renewal another worker could claim the entry now.
+        assert outbox.claim(0.3, owner="other-host:1") is None
+        assert worker.drain(timeout=5)
+    finally:
+        worker.stop(timeout=5)
+    assert [(e.status, e.video_id) for e in outbox.entries()] == [(DONE, "abc123")]
+
+
+def test_renew_only_extends_the_owners_lease(tmp_path):
+    outbox = make_outbox(tmp_path)
+    outbox.claim(60, owner="host:1")
+    assert outbox.renew(1, "host:1", 60)
+    assert not outbox.renew(1, "host:2", 60)
+
+
+def test_workers_survive_outbox_errors(tmp_path, monkeypatch):
+    outbox = make_outbox(tmp_path)
+    claim, calls = outbox.claim, []
+
+    def flaky_claim(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return claim(*args)
+
+    monkeypatch.setattr(outbox, "claim", flaky_claim)
+    worker = UploadWorker(outbox, SlowUploadTool(seconds=0), poll_seconds=0.05).start()
+    try:
+        assert worker.drain(timeout=5)
+    finally:
+        worker.stop(timeout=5)
+    assert worker.uploaded == 1
+
+
+def test_drain_gives_up_without_workers(tmp_path):
+    worker = UploadWorker(make_outbox(tmp_path), SlowUploadTool(seconds=0))
+    assert not worker.drain()
@@ -0,0 +1,65 @@
+# tests/test_episode_pipeline.py
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from core import episode_pipeline, resources
+from core.episode_pipeline import EpisodeJob, EpisodePipeline
+
+
+class StubPipeline(EpisodePipeline):
+    """Runs the pipeline's workers with every stage replaced by a stub that can be told to fail."""
+
+    def __init__(self, count: int, fail_at=None, **kwargs):
+        self.done = []
+        super().__init__(1, count, lambda: None, on_episode_done=self.done.append, **kwargs)
+        self.fail_at = fail_at or {}
+        self.ran = {"writing": [], "production": [], "distribution": []}
+
+    def _prepare(self, episode_id: int) -> EpisodeJob:
+        tasks = [SimpleNamespace(name="storyline", output=SimpleNamespace(raw=f"plot {episode_id}"), callback=None),
+                 SimpleNamespace(name="production_plan", callback=None)]
+        return EpisodeJob(episode_id, "", tasks, None, tasks)
+
+    def _run_crew(self, job: EpisodeJob, stage: str):
+        self.ran[stage].append(job.episode_id)
+        if self.fail_at.get(stage) == job.episode_id:
+            raise RuntimeError(f"{stage} failed")
+
+
+@pytest.fixture(autouse=True)
+def stub_environment(monkeypatch):
+    memory = SimpleNamespace(add_episode_summary=lambda episode_id, plot: None)
+    monkeypatch.setattr(resources, "get", lambda name: memory)
+    monkeypatch.setattr(episode_pipeline, "DISTRIBUTION_OUTBOX", False)
+    monkeypatch.setattr(episode_pipeline, "TRACING_ENABLED", False)
+
+
+def run_with_timeout(pipeline: EpisodePipeline, timeout: float = 20.0) -> list:
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("errors", pipeline.run()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "EpisodePipeline.run() did not return"
+    return result["errors"]
+
+
+def test_all_episodes_flow_through_every_stage_in_order():
+    pipeline = StubPipeline(4)
+    assert run_with_timeout(pipeline) == []
+    assert pipeline.done == [1, 2, 3, 4]
+    assert pipeline.ran == {stage: [1, 2, 3, 4] for stage in pipeline.ran}
+
+
+@pytest.mark.parametrize("stage", ["writing", "production", "distribution"])
+def test_a_failing_stage_stops_the_pipeline_without_hanging(stage):
+    pipeline = StubPipeline(5, fail_at={stage: 1})
+    errors = run_with_timeout(pipeline)
+    assert [(episode_id, failed_stage) for episode_id, failed_stage, _ in errors] == [(1, stage)]
+    assert pipeline.done == []
+    # Nothing downstream of the failure handles episode 1, and no later episode is processed after the stop.
+    later = ("writing", "production", "distribution")[("writing", "production", "distribution").index(stage) + 1:]
+    assert all(1 not in pipeline.ran[s] for s in later)
+    assert len(pipeline.ran["writing"]) < 5
+
@@ -0,0 +1,29 @@
+# tests/test_ffmpeg_utils.py
+import numpy as np
+import pytest
+
+from utils.ffmpeg_utils import encode_raw_frames, probe
+
+SIZE = (64, 48)
+
+
+def frames(count: int, fail_after: int = None):
+    frame = np.zeros((SIZE[1], SIZE[0], 3), dtype=np.uint8)
+    for i in range(count):
+        if i == fail_after:
+            raise ValueError("renderer crashed")
+        frame[:] = i * 8
+        yield frame
+
+
+def test_encode_raw_frames_writes_the_clip(tmp_path):
+    output = tmp_path / "clip.mp4"
+    assert encode_raw_frames(frames(24), SIZE, 24, str(output)) == 24
+    assert probe(str(output))["duration"] == pytest.approx(1.0, abs=0.1)
+    assert [p.name for p in tmp_path.iterdir()] == ["clip.mp4"]
+
+
+def test_a_failing_frame_source_leaves_no_file(tmp_path):
+    with pytest.raises(ValueError, match="renderer crashed"):
+        encode_raw_frames(frames(48, fail_after=24), SIZE, 24, str(tmp_path / "clip.mp4"))
+    assert list(tmp_path.iterdir()) == []
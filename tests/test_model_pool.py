@@ -0,0 +1,97 @@
+# tests/test_model_pool.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from models.pool import ModelPool
+
+GB = 1024**3
+
+
+def make_pool(budget_gb: float = 10) -> ModelPool:
+    return ModelPool(int(budget_gb * GB), sizer=lambda model: model["bytes"])
+
+
+def test_a_slow_load_does_not_block_other_models():
+    pool = make_pool()
+    release = threading.Event()
+    loading = threading.Event()
+
+    def slow_loader():
+        loading.set()
+        assert release.wait(5)
+        return {"bytes": GB}
+
+    pool.register("slow", slow_loader, size_hint=GB)
+    pool.register("fast", lambda: {"bytes": GB}, size_hint=GB)
+    with pool.use("fast"):
+        pass
+
+    def use_slow():
+        with pool.use("slow") as model:
+            return model
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(use_slow)
+        assert loading.wait(5)
+        with pool.use("fast") as model:  # A hit while "slow" is still loading.
+            assert model == {"bytes": GB}
+        assert pool.stats()["models"]["fast"]["hits"] == 1
+        release.set()
+        assert future.result(5) == {"bytes": GB}
+
+
+def test_concurrent_users_share_one_load():
+    pool = make_pool()
+    calls = []
+    gate = threading.Event()
+
+    def loader():
+        calls.append(1)
+        gate.wait(5)
+        return {"bytes": GB}
+
+    pool.register("model", loader, size_hint=GB)
+
+    def use():
+        with pool.use("model") as model:
+            return model
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(use) for _ in range(4)]
+        threading.Event().wait(0.2)
+        gate.set()
+        assert all(f.result(5) == {"bytes": GB} for f in futures)
+    assert len(calls) == 1
+    stats = pool.stats()["models"]["model"]
+    assert (stats["loads"], stats["misses"]) == (1, 1)
+
+
+def test_a_failed_load_can_be_retried():
+    pool = make_pool()
+    attempts = []
+
+    def loader():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("weights missing")
+        return {"bytes": GB}
+
+    pool.register("model", loader, size_hint=GB)
+    with pytest.raises(OSError):
+        with pool.use("model"):
+            pass
+    with pool.use("model") as model:
+        assert model == {"bytes": GB}
+
+
+def test_loading_evicts_the_least_recently_used_idle_model():
+    pool = make_pool(budget_gb=2.5)
+    for name in ("a", "b", "c"):
+        pool.register(name, lambda: {"bytes": GB}, size_hint=GB)
+    for name in ("a", "b", "a", "c"):
+        with pool.use(name):
+            pass
+    resident = {name for name, s in pool.stats()["models"].items() if s["resident"]}
+    assert resident == {"a", "c"}
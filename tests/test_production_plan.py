@@ -0,0 +1,79 @@
+# tests/test_production_plan.py
+import json
+
+import pytest
+
+from utils.production_plan import (PLAN_ASSET_DIR, AudioPlanItem, ClipPlan, ProductionPlan, load_production_plan,
+                                   repair_json)
+
+
+def test_repair_json_strips_prose_fences_and_trailing_commas():
+    answer = 'Here is the plan:\n```json\n{"video_plan": [{"clip_id": "clip_01",},], "audio_plan": [],}\n```\nDone.'
+    assert json.loads(repair_json(answer)) == {"video_plan": [{"clip_id": "clip_01"}], "audio_plan": []}
+
+
+def test_repair_json_keeps_brackets_inside_strings():
+    answer = '{"video_plan": [{"image_prompt": "a sign reading \\"{open}\\" [sic], lit"}]}'
+    assert json.loads(repair_json(answer))["video_plan"][0]["image_prompt"] == 'a sign reading "{open}" [sic], lit'
+
+
+def test_repair_json_cuts_a_truncated_answer_back_to_its_last_complete_element():
+    answer = '{"video_plan": [{"clip_id": "clip_01"}, {"clip_id": "clip_02"}, {"clip_id": "cl'
+    assert json.loads(repair_json(answer)) == {"video_plan": [{"clip_id": "clip_01"}, {"clip_id": "clip_02"}]}
+
+
+@pytest.mark.parametrize("answer", ["no json here", "{"])
+def test_repair_json_rejects_answers_without_an_object(answer):
+    with pytest.raises(ValueError):
+        repair_json(answer)
+
+
+def test_load_production_plan_repairs_types_ids_and_paths():
+    plan = load_production_plan({
+        "video_plan": [{"prompt": "Mtuthuko at the well"}, {"clip_id": "x"}],
+        "audio_plan": [{"type": "Voice", "text": "Sawubona!"}, {"type": "bgm", "prompt": "village drums"},
+                       {"type": "applause", "text": "clap"}],
+    })
+    assert [c.model_dump() for c in plan.video_plan] == [{
+        "clip_id": "clip_01", "image_prompt": "Mtuthuko at the well",
+        "image_path": f"{PLAN_ASSET_DIR}/frame_01.png", "video_path": f"{PLAN_ASSET_DIR}/clip_01.mp4"}]
+    assert [(a.audio_id, a.type, a.output_path) for a in plan.audio_plan] == [
+        ("dialogue_01", "dialogue", f"{PLAN_ASSET_DIR}/dialogue_01.mp3"),
+        ("music_01", "music", f"{PLAN_ASSET_DIR}/music_01.flac")]
+
+
+def test_load_production_plan_never_repeats_an_id_or_path():
+    plan = load_production_plan({
+        "video_plan": [{"clip_id": "clip_02", "image_prompt": "a", "video_path": f"{PLAN_ASSET_DIR}/clip_02.mp4"},
+                       {"image_prompt": "b"},
+                       {"clip_id": "clip_02", "image_prompt": "c", "image_path": f"{PLAN_ASSET_DIR}/frame_01.png"}],
+        "audio_plan": [{"audio_id": "dialogue_02", "type": "dialogue", "text_or_prompt": "one"},
+                       {"type": "dialogue", "text_or_prompt": "two"},
+                       {"audio_id": "dialogue_02", "type": "dialogue", "text_or_prompt": "three",
+                        "output_path": f"{PLAN_ASSET_DIR}/dialogue_02.mp3"}],
+    })
+    clip_ids = [c.clip_id for c in plan.video_plan]
+    paths = [p for c in plan.video_plan for p in (c.image_path, c.video_path)]
+    audio_ids = [a.audio_id for a in plan.audio_plan]
+    audio_paths = [a.output_path for a in plan.audio_plan]
+    for values in (clip_ids, paths, audio_ids, audio_paths):
+        assert len(set(values)) == len(values), values
+    assert clip_ids[:2] == ["clip_02", "clip_02_2"]
+
+
+def test_load_production_plan_parses_an_llm_answer():
+    answer = ('```json\n{"video_plan": [{"clip_id": "clip_01", "image_prompt": "dawn", '
+              '"image_path": "temp_assets/frame_01.png", "video_path": "temp_assets/clip_01.mp4"}], "audio_plan": [')
+    plan = load_production_plan(answer)
+    assert [c.clip_id for c in plan.video_plan] == ["clip_01"] and plan.audio_plan == []
+    assert load_production_plan(plan) is plan
+
+
+def test_production_plan_keeps_parsed_entries():
+    clip = ClipPlan(clip_id="clip_01", image_prompt="dawn", image_path=f"{PLAN_ASSET_DIR}/frame_01.png",
+                    video_path=f"{PLAN_ASSET_DIR}/clip_01.mp4")
+    line = AudioPlanItem(audio_id="dialogue_01", type="dialogue", text_or_prompt="Sawubona!",
+                         output_path=f"{PLAN_ASSET_DIR}/dialogue_01.mp3")
+    plan = ProductionPlan(video_plan=[clip], audio_plan=[line])
+    assert plan.video_plan == [clip] and plan.audio_plan == [line]
+    assert load_production_plan({"video_plan": [clip], "audio_plan": [line]}) == plan
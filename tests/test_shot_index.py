@@ -0,0 +1,97 @@
+# tests/test_shot_index.py
+import os
+
+import chromadb
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeEmbeddingFunction
+from utils.memory_manager import CachedEmbeddingFunction
+from utils.shot_index import ShotIndex, reuse_shot
+
+SETTING = ("cinematic anime style, wide shot of the village square at dusk, warm lantern light, dust in the air, "
+           "clay houses and a baobab tree in the background, Mtuthuko {}")
+
+
+def bag_of_words():
+    # Wrapped like the memory's embedding function, which the shot index shares in production.
+    return CachedEmbeddingFunction(FakeEmbeddingFunction(dimensions=4096))
+
+
+def make_index(tmp_path, embedding_function, name="shots"):
+    client = chromadb.EphemeralClient()
+    return ShotIndex(client, embedding_function, str(tmp_path / "library"), collection_name=f"{name}_{id(tmp_path)}")
+
+
+def make_clip(tmp_path, n: int, prompt: str) -> dict:
+    return {"clip_id": f"clip_{n:02d}", "image_prompt": prompt,
+            "image_path": str(tmp_path / f"frame_{n:02d}.png"), "video_path": str(tmp_path / f"clip_{n:02d}.mp4")}
+
+
+def cosine(embedding_function, a: str, b: str) -> float:
+    u, v = np.asarray(embedding_function([a, b]))
+    return float(u @ v / (np.linalg.norm(u) * np.linalg.norm(v)))
+
+
+def test_prompts_differing_only_in_action_are_generated(tmp_path):
+    embed = bag_of_words()
+    running, crying = SETTING.format("running"), SETTING.format("crying")
+    # The shared setting dominates the embedding, well past the default reuse threshold...
+    assert cosine(embed, running, crying) >= 0.95
+    index = make_index(tmp_path, embed)
+    # ...but the changed words don't mean the same, so neither the episode nor the library match is used.
+    assert index.plan([make_clip(tmp_path, 1, running), make_clip(tmp_path, 2, crying)]) == [None, None]
+
+
+def test_added_action_is_generated(tmp_path):
+    index = make_index(tmp_path, bag_of_words())
+    prompts = [SETTING.format("standing"), SETTING.format("standing, then drawing a sword")]
+    assert index.plan([make_clip(tmp_path, n, p) for n, p in enumerate(prompts, 1)]) == [None, None]
+
+
+def test_rewordings_and_scene_labels_are_reused(tmp_path):
+    index = make_index(tmp_path, bag_of_words())
+    prompts = [f"Scene 1: {SETTING.format('walking')}", f"Scene 4: {SETTING.format('walking')}.",
+               "Scene 7: " + SETTING.format("walking").replace("of the village", "in the village")]
+    matches = index.plan([make_clip(tmp_path, n, p) for n, p in enumerate(prompts, 1)])
+    assert matches[0] is None
+    assert [(m.source, m.action) for m in matches[1:]] == [("clip_01", "reuse"), ("clip_01", "reuse")]
+
+
+def test_library_keeps_its_own_copy_of_a_shot(tmp_path):
+    index = make_index(tmp_path, bag_of_words())
+    clip = make_clip(tmp_path, 1, SETTING.format("walking"))
+    for key, data in (("image_path", b"frame one"), ("video_path", b"clip one")):
+        with open(clip[key], "wb") as f:
+            f.write(data)
+    index.add(clip, episode_id=1)
+
+    # The next episode rewrites the same asset paths in place.
+    for key in ("image_path", "video_path"):
+        with open(clip[key], "wb") as f:
+            f.write(b"another episode")
+    match = index.plan([make_clip(tmp_path, 1, SETTING.format("walking"))])[0]
+    assert match.action == "reuse"
+    with open(match.frame_path, "rb") as f:
+        assert f.read() == b"frame one"
+
+    # Reusing copies the shot out; writing over the reused clip leaves the library intact.
+    target = make_clip(tmp_path, 2, SETTING.format("walking"))
+    reuse_shot(match.frame_path, match.clip_path, target, "reuse")
+    assert os.stat(target["video_path"]).st_ino != os.stat(match.clip_path).st_ino
+    with open(target["video_path"], "wb") as f:
+        f.write(b"rewritten")
+    with open(match.clip_path, "rb") as f:
+        assert f.read() == b"clip one"
+
+
+def test_default_embedding_model_tells_actions_apart(tmp_path):
+    from chromadb.utils import embedding_functions
+    try:
+        embed = CachedEmbeddingFunction(embedding_functions.DefaultEmbeddingFunction())
+        embed(["warm up"])
+    except Exception as e:
+        pytest.skip(f"The default embedding model is not available: {e}")
+    index = make_index(tmp_path, embed, name="minilm")
+    actions = ["running", "crying", "laughing", "fighting a stranger", "sitting quietly"]
+    assert index.plan([make_clip(tmp_path, n, SETTING.format(a)) for n, a in enumerate(actions, 1)]) == [None] * 5
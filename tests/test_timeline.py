@@ -0,0 +1,78 @@
+# tests/test_timeline.py
+import pytest
+
+from config import AUDIO_MIX_DIALOGUE_LEAD
+from utils import timeline
+from utils.timeline import Timeline, build_timeline
+
+CLIP_SECONDS, LINE_SECONDS = 4.0, 1.5
+
+
+@pytest.fixture
+def assets(monkeypatch):
+    """Fake probe: every path in `assets` exists; clips are silent 4 s videos, lines are 1.5 s of audio."""
+    existing = set()
+
+    def probe_existing(path, missing):
+        if path not in existing:
+            missing.append(path)
+            return None
+        if path.endswith(".mp4"):
+            return {"duration": CLIP_SECONDS, "video": {"codec": "h264"}, "audio": None}
+        return {"duration": LINE_SECONDS, "video": None, "audio": {"codec": "mp3"}}
+
+    monkeypatch.setattr(timeline, "_probe_existing", probe_existing)
+    return existing
+
+
+def make_plan(count: int) -> dict:
+    return {
+        "video_plan": [{"clip_id": f"clip_{i:02d}", "video_path": f"clip_{i:02d}.mp4"} for i in range(1, count + 1)],
+        "audio_plan": [{"audio_id": f"line_{i:02d}", "type": "dialogue", "output_path": f"line_{i:02d}.mp3"}
+                       for i in range(1, count + 1)],
+    }
+
+
+def dialogue_starts(t: Timeline) -> dict:
+    return {e.audio_id: e.start for e in t.events("dialogue")}
+
+
+def test_dialogue_lines_up_shot_by_shot(assets):
+    plan = make_plan(3)
+    assets.update(c["video_path"] for c in plan["video_plan"])
+    assets.update(a["output_path"] for a in plan["audio_plan"])
+    t = build_timeline(plan)
+    assert [c.plan_index for c in t.clips] == [0, 1, 2]
+    assert dialogue_starts(t) == {f"line_{i + 1:02d}": pytest.approx(i * CLIP_SECONDS + AUDIO_MIX_DIALOGUE_LEAD)
+                                  for i in range(3)}
+
+
+def test_a_missing_clip_does_not_shift_later_lines(assets):
+    plan = make_plan(4)
+    assets.update(c["video_path"] for c in plan["video_plan"] if c["clip_id"] != "clip_02")
+    assets.update(a["output_path"] for a in plan["audio_plan"])
+    t = build_timeline(plan)
+    starts = {c.clip_id: c.start for c in t.clips}
+    lines = dialogue_starts(t)
+    assert "clip_02.mp4" in t.missing
+    # Lines 3 and 4 stay on clips 3 and 4, wherever those now start.
+    assert lines["line_03"] == pytest.approx(starts["clip_03"] + AUDIO_MIX_DIALOGUE_LEAD)
+    assert lines["line_04"] == pytest.approx(starts["clip_04"] + AUDIO_MIX_DIALOGUE_LEAD)
+    # Line 2 has no shot of its own and follows line 1.
+    assert lines["line_01"] < lines["line_02"] < lines["line_03"]
+
+
+def test_a_missing_line_does_not_shift_later_lines(assets):
+    plan = make_plan(3)
+    assets.update(c["video_path"] for c in plan["video_plan"])
+    assets.update(a["output_path"] for a in plan["audio_plan"] if a["audio_id"] != "line_01")
+    lines = dialogue_starts(build_timeline(plan))
+    assert lines == {"line_02": pytest.approx(CLIP_SECONDS + AUDIO_MIX_DIALOGUE_LEAD),
+                     "line_03": pytest.approx(2 * CLIP_SECONDS + AUDIO_MIX_DIALOGUE_LEAD)}
+
+
+def test_plan_index_survives_a_save_and_load(assets, tmp_path):
+    plan = make_plan(2)
+    assets.add("clip_02.mp4")
+    t = Timeline.load(build_timeline(plan).save(str(tmp_path / "timeline.json")))
+    assert [(c.clip_id, c.plan_index) for c in t.clips] == [("clip_02", 1)]
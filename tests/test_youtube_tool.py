@@ -0,0 +1,74 @@
+# tests/test_youtube_tool.py
+# Drives the real uploader against the local resumable-upload server in benchmarks/fakes.py.
+import json
+import os
+
+import pytest
+
+from benchmarks.fakes import FakeProfile, FakeYouTubeService
+from tools.youtube_tool import YouTubeUploaderTool, upload_session_path
+
+CHUNK_MB = 0.25  # The smallest chunk the protocol allows (256 KiB).
+FILE_BYTES = 6 * 256 * 1024 + 1000
+
+
+@pytest.fixture
+def service():
+    service = FakeYouTubeService(FakeProfile(upload_mbps=10000))
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "episode_1.mp4"
+    path.write_bytes(os.urandom(FILE_BYTES))
+    return str(path)
+
+
+def make_tool(service, max_retries: int = 8) -> YouTubeUploaderTool:
+    tool = YouTubeUploaderTool(youtube_service=service, chunk_mb=CHUNK_MB, max_retries=max_retries)
+    tool._sleep = lambda seconds: None
+    return tool
+
+
+def upload(tool, video) -> str:
+    return tool.run(file_path=video, title="Episode 1", description="The first episode.")
+
+
+def test_chunked_upload_retries_503s_and_dropped_connections(service, video):
+    service.profile.upload_fail_every = 3
+    assert upload(make_tool(service), video) == "Successfully uploaded video. Video ID: fake-0001"
+    assert service.failures >= 2  # At least one 503 and one dropped connection.
+    assert service.uploads == [{"id": "fake-0001", "bytes": FILE_BYTES, "title": "Episode 1"}]
+    assert len(service.sessions) == 1
+    assert not os.path.exists(upload_session_path(video))
+
+
+def test_an_interrupted_upload_resumes_from_the_saved_session(service, video):
+    service.profile.upload_fail_every = 4
+    result = upload(make_tool(service, max_retries=0), video)
+    assert result.startswith("Error") and "session is saved" in result
+    received = service.sessions["session-0001"]["received"]
+    assert 0 < received < FILE_BYTES
+
+    service.profile.upload_fail_every = 0
+    assert upload(make_tool(service), video) == "Successfully uploaded video. Video ID: fake-0001"
+    assert len(service.sessions) == 1  # Resumed, not started over.
+    assert service.uploads[0]["bytes"] == FILE_BYTES
+
+
+def test_the_session_is_saved_before_the_first_chunk_completes(service, video):
+    service.profile.upload_fail_every = 1  # The first chunk already fails, and no retries are allowed.
+    assert upload(make_tool(service, max_retries=0), video).startswith("Error")
+    with open(upload_session_path(video)) as f:
+        assert json.load(f)["resumable_uri"].endswith("/upload/session/session-0001")
+
+
+def test_an_expired_session_starts_the_upload_over(service, video):
+    tool = make_tool(service)
+    host, port = service._server.server_address
+    tool._save_session(video, f"http://{host}:{port}/upload/session/session-9999")
+    assert upload(tool, video) == "Successfully uploaded video. Video ID: fake-0001"
+    assert service.uploads[0]["bytes"] == FILE_BYTES
+    assert not os.path.exists(upload_session_path(video))
@@ -1,12 +1,12 @@
 # tools/audio_tools.py
 import os
-import requests
 from elevenlabs.client import ElevenLabs
 from google.cloud import texttospeech
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field, PrivateAttr
 from typing import Any
-from huggingface_hub.inference_api import InferenceApi
+from utils.asset_cache import get_asset_cache, write_atomic
+from utils.http_client import get_inference_client
 
 
 class VoiceGeneratorToolSchema(BaseModel):
@@ -17,11 +17,15 @@ class VoiceGeneratorTool(BaseTool):
     description: str = "Generates a real audio file for dialogue using Google Cloud TTS."
     args_schema: type[BaseModel] = VoiceGeneratorToolSchema
     _tts_client: Any = PrivateAttr()
-    def __init__(self, **kwargs):
+    def __init__(self, tts_client=None, **kwargs):
         super().__init__(**kwargs)
         # This tool uses the Google client, NOT ElevenLabs
-        self._tts_client = texttospeech.TextToSpeechClient()
+        self._tts_client = tts_client or texttospeech.TextToSpeechClient()
     def _run(self, dialogue: str, file_path: str) -> str:
+        cache = get_asset_cache()
+        cache_key = cache.make_key(self.name, "google-tts", dialogue, {"language_code": "en-US", "voice": "en-US-Wavenet-D", "encoding": "MP3"})
+        if cache.fetch(cache_key, file_path):
+            return f"Successfully created voice file at {file_path} (reused cached asset)"
         print(f"🔊 Generating voice for: '{dialogue}'")
         try:
             synthesis_input = texttospeech.SynthesisInput(text=dialogue)
@@ -29,8 +33,8 @@ class VoiceGeneratorTool(BaseTool):
             audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
             # Use the CORRECT client
             response = self._tts_client.synthesize_speech(input=synthesis_input, voice=voice, audio_config=audio_config)
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            with open(file_path, "wb") as out: out.write(response.audio_content)
+            write_atomic(file_path, response.audio_content)
+            cache.store(cache_key, file_path)
             return f"Successfully created voice file at {file_path}"
         except Exception as e: return f"Error generating voice: {e}"
 
@@ -43,18 +47,20 @@ class SfxGeneratorTool(BaseTool):
     description: str = "Generates a sound effect from a text description via ElevenLabs."
     args_schema: type[BaseModel] = SfxGeneratorToolSchema
     _eleven_client: Any = PrivateAttr()
-    def __init__(self, **kwargs):
+    def __init__(self, eleven_client=None, **kwargs):
         super().__init__(**kwargs)
-        self._eleven_client = ElevenLabs(api_key=os.getenv("ELEVEN_LABS_API_KEY"))
+        self._eleven_client = eleven_client or ElevenLabs(api_key=os.getenv("ELEVEN_LABS_API_KEY"))
     def _run(self, prompt: str, file_path: str) -> str:
+        cache = get_asset_cache()
+        cache_key = cache.make_key(self.name, "elevenlabs-sound-effects", prompt)
+        if cache.fetch(cache_key, file_path):
+            return f"Successfully generated SFX to {file_path} (reused cached asset)"
         print(f"🔊 Generating SFX: '{prompt}'")
         try:
             # CORRECTED METHOD CALL
             audio_iterator = self._eleven_client.sound_effects.create(text=prompt)
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            with open(file_path, "wb") as f:
-                for chunk in audio_iterator:
-                    f.write(chunk)
+            write_atomic(file_path, b"".join(audio_iterator))
+            cache.store(cache_key, file_path)
             return f"Successfully generated SFX to {file_path}"
         except Exception as e: return f"Error generating SFX: {e}"
 
@@ -66,16 +72,21 @@ class HuggingFaceMusicGeneratorTool(BaseTool):
     name: str = "Music Generator"
     description: str = "Generates background music from a prompt via Hugging Face."
     args_schema: type[BaseModel] = HuggingFaceMusicGeneratorToolSchema
-    _inference_api: Any = PrivateAttr()
-    def __init__(self, **kwargs):
+    _inference_client: Any = PrivateAttr()
+    _model_id: str = PrivateAttr()
+    def __init__(self, inference_client=None, **kwargs):
         super().__init__(**kwargs)
-        model_id = "facebook/musicgen-small"
-        self._inference_api = InferenceApi(repo_id=model_id, token=os.getenv("HUGGING_FACE_API_TOKEN"))
+        self._model_id = "facebook/musicgen-small"
+        self._inference_client = inference_client or get_inference_client()
     def _run(self, prompt: str, file_path: str) -> str:
+        cache = get_asset_cache()
+        cache_key = cache.make_key(self.name, self._model_id, prompt)
+        if cache.fetch(cache_key, file_path):
+            return f"Successfully generated music to {file_path} (reused cached asset)"
         print(f"🎵 Generating Music via Hugging Face: '{prompt}'")
         try:
-            audio_bytes = self._inference_api.text_to_audio(prompt)
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            with open(file_path, 'wb') as f: f.write(audio_bytes)
+            audio_bytes = self._inference_client.post(self._model_id, json={"inputs": prompt})
+            write_atomic(file_path, audio_bytes)
+            cache.store(cache_key, file_path)
             return f"Successfully generated music to {file_path}"
         except Exception as e: return f"Error during music generation: {e}"
\ No newline at end of file
@@ -1,53 +1,205 @@
 # tools/compiler_tool.py
+from collections import Counter
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
-from moviepy.editor import (VideoFileClip, AudioFileClip, ImageClip, 
-                            CompositeVideoClip, concatenate_audioclips, ColorClip)
-from moviepy.audio.AudioClip import CompositeAudioClip
+from moviepy.editor import VideoFileClip, AudioFileClip, ColorClip, concatenate_videoclips
 import os
+import shutil
+import tempfile
+from config import (COMPILER_MODE, AUDIO_MIX_SAMPLE_RATE, AUDIO_MIX_TARGET_LUFS, AUDIO_MIX_PEAK_DBFS, AUDIO_MIX_MUSIC_DB,
+                    AUDIO_MIX_SFX_DB, AUDIO_MIX_DUCK_DB, AUDIO_MIX_DUCK_ATTACK, AUDIO_MIX_DUCK_RELEASE,
+                    AUDIO_MIX_DUCK_THRESHOLD_DB)
+from core import tracing
+from utils.ffmpeg_utils import probe, run_ffmpeg, channel_layout, write_concat_list
+from utils.audio_mixer import Cue, mix_audio
+from utils.timeline import Timeline, TimelineClip
+from utils.segment_cache import SegmentCache, SEGMENT_DIR_NAME
 
 # Define the explicit schema class
 class VideoCompilerToolSchema(BaseModel):
     """Input schema for VideoCompilerTool."""
+    timeline_path: str = Field(..., description="Path to the episode's timeline.json (built from the production plan).")
     output_path: str = Field(..., description="Final output path for the episode.")
+    mode: str = Field(COMPILER_MODE, description="'stream' (ffmpeg concat, re-encodes only mismatched or edited clips) or 'moviepy' (full re-encode).")
+
+def timeline_cues(timeline: Timeline) -> list:
+    return [Cue(e.path, e.start, e.kind, e.gain_db) for e in timeline.events("dialogue", "sfx")]
 
 class VideoCompilerTool(BaseTool):
     name: str = "Video Compiler Tool"
-    description: str = "Compiles all assets (lip-synced videos, backgrounds, music) into a final episode video."
+    description: str = "Compiles the episode timeline (video clips, dialogue, SFX, music) into the final episode video."
     args_schema: type[BaseModel] = VideoCompilerToolSchema
 
-    def _run(self, output_path: str) -> str:
-        print(f"🎬 Compiling final video to {output_path}...")
-        asset_dir = "temp_assets"
-        background_files = [os.path.join(asset_dir, f) for f in os.listdir(asset_dir) if f.startswith('background_')]
-        dialogue_videos = sorted([
-            os.path.join(asset_dir, f) for f in os.listdir(asset_dir) 
-            if f.startswith('scene') and any(f.endswith(ext) for ext in ['.mp4', '.avi', '.mov'])
-        ])
-        music_files = [os.path.join(asset_dir, f) for f in os.listdir(asset_dir) if f.startswith('music_')]
-
-        if not dialogue_videos:
-            print("Warning: No real lip-sync videos found. Creating a dummy 5-second black clip to prevent errors.")
-            dummy_path = os.path.join(asset_dir, "dummy_video.mp4")
+    def _run(self, timeline_path: str, output_path: str, mode: str = COMPILER_MODE) -> str:
+        print(f"🎬 Compiling final video to {output_path} ({mode} mode)...")
+        try:
+            timeline = Timeline.load(timeline_path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            return f"Error: Could not load the timeline at {timeline_path}: {e}"
+
+        if not timeline.clips:
+            print("Warning: The timeline has no video clips. Using a dummy 5-second black clip to prevent errors.")
+            dummy_path = os.path.join(os.path.dirname(timeline_path) or ".", "dummy_video.mp4")
             # Create a dummy video only if it doesn't exist
             if not os.path.exists(dummy_path):
                 dummy_clip = ColorClip(size=(1024,576), color=(0,0,0), duration=5)
                 dummy_clip.write_videofile(dummy_path, fps=24)
-            dialogue_videos.append(dummy_path)
-            
-        if not background_files:
-            return "Error: Missing background assets to compile."
-        
-        dialogue_clips = [VideoFileClip(f) for f in dialogue_videos]
-        total_duration = sum(c.duration for c in dialogue_clips)
-        background_clip = ImageClip(background_files[0], duration=total_duration)
-        
-        final_video = CompositeVideoClip([background_clip] + dialogue_clips)
-
-        if music_files:
-            music_clip = AudioFileClip(music_files[0]).set_duration(total_duration)
-            final_audio = CompositeAudioClip([final_video.audio, music_clip.volumex(0.2)])
-            final_video.audio = final_audio
-
-        final_video.write_videofile(output_path, codec="libx264", audio_codec="aac", bitrate="5000k")
-        return f"Successfully compiled and saved final video to {output_path}."
\ No newline at end of file
+            media = probe(dummy_path)
+            timeline.clips.append(TimelineClip("dummy", dummy_path, 0.0, 0.0, media["duration"], media))
+
+        music = timeline.events("music")
+        music_path = music[0].path if music else None
+        if mode == "stream":
+            try:
+                segment_dir = os.path.join(os.path.dirname(os.path.abspath(timeline_path)), SEGMENT_DIR_NAME)
+                self._compile_stream(timeline, music_path, output_path, segment_dir)
+            except Exception as e:
+                return f"Error during stream compilation: {e}"
+            return f"Successfully compiled and saved final video to {output_path}."
+
+        clips = [VideoFileClip(c.path).subclip(c.in_point, c.out_point) for c in timeline.clips]
+        final_video = concatenate_videoclips(clips, method="compose")
+        work_dir = tempfile.mkdtemp(prefix="compile_", dir=os.path.dirname(output_path) or ".")
+        try:
+            bed_input = None
+            if final_video.audio is not None:
+                # The composited clip audio lines up with the picture whatever the clips' codecs, and clips without
+                # audio are silent in it (the concat demuxer would need identical streams in every file).
+                bed_path = os.path.join(work_dir, "bed.wav")
+                final_video.audio.write_audiofile(bed_path, fps=AUDIO_MIX_SAMPLE_RATE, codec="pcm_s16le", logger=None)
+                bed_input = ["-i", bed_path]
+            mix_path = os.path.join(work_dir, "mix.m4a")
+            mix_audio(mix_path, timeline.duration, timeline_cues(timeline), bed_input=bed_input, music_path=music_path)
+            final_video.audio = AudioFileClip(mix_path)
+            final_video.write_videofile(output_path, codec="libx264", audio_codec="aac", bitrate="5000k")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return f"Successfully compiled and saved final video to {output_path}."
+
+    # --- Stream (ffmpeg) compilation ---
+    @staticmethod
+    def _video_signature(info: dict) -> tuple:
+        v = info["video"]
+        return (v["codec"], v["width"], v["height"], v["pix_fmt"], v["fps"])
+
+    @staticmethod
+    def _audio_signature(info: dict):
+        a = info["audio"]
+        return (a["codec"], a["sample_rate"], a["channels"]) if a else None
+
+    def _choose_target(self, infos: list) -> dict:
+        """Picks the most common clip format as the concat target, so the fewest clips need work."""
+        video_sig = Counter(self._video_signature(i) for i in infos).most_common(1)[0][0]
+        if video_sig[0] != "h264" or video_sig[3] != "yuv420p":
+            video_sig = ("h264", video_sig[1], video_sig[2], "yuv420p", video_sig[4] or 24.0)
+        audio_sig = None
+        audio_sigs = [self._audio_signature(i) for i in infos if i["audio"]]
+        if audio_sigs:
+            audio_sig = Counter(audio_sigs).most_common(1)[0][0]
+            if audio_sig[0] != "aac":
+                audio_sig = ("aac", audio_sig[1], audio_sig[2])
+        timescales = [i["video"].get("timescale") for i in infos if self._video_signature(i) == video_sig]
+        timescale = Counter(t for t in timescales if t).most_common(1)
+        return {"video": video_sig, "audio": audio_sig, "timescale": timescale[0][0] if timescale else 12288}
+
+    def _matches_target(self, clip: TimelineClip, target: dict) -> bool:
+        info = clip.media
+        return (self._video_signature(info) == target["video"] and not clip.trimmed
+                and self._audio_signature(info) == target["audio"]
+                and info["video"].get("timescale") in (None, 0, target["timescale"]))
+
+    def _normalize_clip(self, clip: TimelineClip, target: dict, out_path: str) -> str:
+        """Writes a copy of the clip whose streams match the target, re-encoding only the streams that differ.
+
+        Trimmed clips are always cut here (stream copy can only cut on keyframes), so the concat list never
+        needs in/out points.
+        """
+        info = clip.media
+        video_ok = self._video_signature(info) == target["video"] and not clip.trimmed
+        audio_ok = self._audio_signature(info) == target["audio"]
+        args = ["-ss", f"{clip.in_point:.3f}", "-i", clip.path] if clip.in_point else ["-i", clip.path]
+        needs_silence = target["audio"] is not None and info["audio"] is None
+        if needs_silence:
+            _, rate, channels = target["audio"]
+            args += ["-f", "lavfi", "-t", f"{clip.duration:.3f}", "-i", f"anullsrc=r={rate}:cl={channel_layout(channels)}"]
+        args += ["-map", "0:v:0"]
+        if video_ok:
+            args += ["-c:v", "copy"]
+        else:
+            _, width, height, pix_fmt, fps = target["video"]
+            print(f"   ↻ Transcoding {os.path.basename(clip.path)} to {width}x{height}@{fps}")
+            args += ["-vf", f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps},format={pix_fmt}",
+                     "-c:v", "libx264", "-preset", "veryfast", "-crf", "18"]
+        if target["audio"] is not None:
+            _, rate, channels = target["audio"]
+            args += ["-map", "1:a:0" if needs_silence else "0:a:0"]
+            if audio_ok:
+                args += ["-c:a", "copy"]
+            else:
+                args += ["-c:a", "aac", "-b:a", "192k", "-ar", rate, "-ac", channels]
+        args += ["-video_track_timescale", target["timescale"], "-t", f"{clip.duration:.3f}", out_path]
+        run_ffmpeg(args)
+        return out_path
+
+    def _mix_inputs(self, timeline: Timeline, music_path, target: dict, cache: SegmentCache) -> dict:
+        """Everything the soundtrack depends on, as the key of the cached mix."""
+        return {
+            "duration": round(timeline.duration, 3),
+            "bed": [(cache.file_digest(c.path), c.in_point, c.out_point) for c in timeline.clips]
+                   if target["audio"] is not None else None,
+            "cues": [(cache.file_digest(e.path), e.start, e.kind, e.gain_db) for e in timeline.events("dialogue", "sfx")],
+            "music": cache.file_digest(music_path) if music_path else None,
+            "settings": [AUDIO_MIX_SAMPLE_RATE, AUDIO_MIX_TARGET_LUFS, AUDIO_MIX_PEAK_DBFS, AUDIO_MIX_MUSIC_DB,
+                         AUDIO_MIX_SFX_DB, AUDIO_MIX_DUCK_DB, AUDIO_MIX_DUCK_ATTACK, AUDIO_MIX_DUCK_RELEASE,
+                         AUDIO_MIX_DUCK_THRESHOLD_DB],
+        }
+
+    def _compile_stream(self, timeline: Timeline, music_path, output_path: str, segment_dir: str):
+        """Joins cached per-clip segments and the cached soundtrack with the concat demuxer (stream copy).
+
+        Clips already in the episode format are used as they are. The others are normalized into segments keyed
+        by their inputs, as is the mixed soundtrack, so after an edit only the changed clips (or just the mix)
+        are encoded again.
+        """
+        # Stream formats and durations come from the timeline, which probed every asset once.
+        target = self._choose_target([c.media for c in timeline.clips])
+        total_duration = timeline.duration
+        cache = SegmentCache(segment_dir)
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        work_dir = tempfile.mkdtemp(prefix="compile_", dir=os.path.dirname(output_path) or ".")
+        try:
+            parts = []
+            for clip in timeline.clips:
+                if self._matches_target(clip, target):
+                    parts.append(clip.path)
+                    continue
+                inputs = {"source": cache.file_digest(clip.path), "in": clip.in_point, "out": clip.out_point,
+                          "target": target}
+                parts.append(cache.get_or_build("clip", inputs, ".mp4",
+                                                lambda out, clip=clip: self._normalize_clip(clip, target, out)))
+            list_path = os.path.join(work_dir, "concat.txt")
+            write_concat_list(parts, list_path)
+
+            args = ["-f", "concat", "-safe", "0", "-i", list_path]
+            cues = timeline_cues(timeline)
+            if cues or music_path:
+                # Clip audio, dialogue, SFX and music are mixed in NumPy and encoded once.
+                bed = ["-f", "concat", "-safe", "0", "-i", list_path] if target["audio"] is not None else None
+                mix_path = cache.get_or_build(
+                    "mix", self._mix_inputs(timeline, music_path, target, cache), ".m4a",
+                    lambda out: mix_audio(out, total_duration, cues, bed_input=bed, music_path=music_path))
+                args += ["-i", mix_path, "-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy", "-c:a", "copy"]
+            elif target["audio"] is not None:
+                args += ["-map", "0:v:0", "-map", "0:a:0", "-c:v", "copy", "-c:a", "copy"]
+            else:
+                args += ["-map", "0:v:0", "-c:v", "copy"]
+            args += ["-t", f"{total_duration:.3f}", "-movflags", "+faststart", output_path]
+            run_ffmpeg(args)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        cache.prune()
+        if cache.hits:
+            print(f"♻️ Reused {cache.hits} of {cache.hits + cache.misses} cached segments.")
+        tracing.annotate(segments_reused=cache.hits, segments_encoded=cache.misses)
@@ -1,10 +1,10 @@
 # tools/huggingface_tools.py
 import os
-import requests
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field, PrivateAttr
-from huggingface_hub.inference_api import InferenceApi
 from typing import Any
+from utils.asset_cache import get_asset_cache, write_atomic
+from utils.http_client import get_inference_client
 
 class HuggingFaceImageGeneratorToolSchema(BaseModel):
     prompt: str = Field(..., description="A detailed descriptive prompt for the image.")
@@ -13,17 +13,22 @@ class HuggingFaceImageGeneratorTool(BaseTool):
     name: str = "Image Generator"
     description: str = "Generates a still image from a prompt using a Hugging Face model."
     args_schema: type[BaseModel] = HuggingFaceImageGeneratorToolSchema
-    _inference_api: Any = PrivateAttr()
-    def __init__(self, **kwargs):
+    _inference_client: Any = PrivateAttr()
+    _model_id: str = PrivateAttr()
+    def __init__(self, inference_client=None, **kwargs):
         super().__init__(**kwargs)
-        model_id = "digiplay/AbsoluteReality_v1.8.1"
-        self._inference_api = InferenceApi(repo_id=model_id, token=os.getenv("HUGGING_FACE_API_TOKEN"))
+        self._model_id = "digiplay/AbsoluteReality_v1.8.1"
+        self._inference_client = inference_client or get_inference_client()
     def _run(self, prompt: str, output_path: str) -> str:
+        cache = get_asset_cache()
+        cache_key = cache.make_key(self.name, self._model_id, prompt)
+        if cache.fetch(cache_key, output_path):
+            return f"Successfully generated image and saved to {output_path} (reused cached asset)"
         print(f"🎨 Generating image via Hugging Face: '{prompt}'")
         try:
-            image_bytes = self._inference_api.text_to_image(prompt)
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            with open(output_path, "wb") as f: f.write(image_bytes)
+            image_bytes = self._inference_client.post(self._model_id, json={"inputs": prompt})
+            write_atomic(output_path, image_bytes)
+            cache.store(cache_key, output_path)
             return f"Successfully generated image and saved to {output_path}"
         except Exception as e: return f"Error during Hugging Face image generation: {e}"
 
@@ -34,17 +39,23 @@ class HuggingFaceVideoGeneratorTool(BaseTool):
     name: str = "Video Generator (from Image)"
     description: str = "Generates a short video clip from a starting image using Stable Video Diffusion on Hugging Face."
     args_schema: type[BaseModel] = HuggingFaceVideoGeneratorToolSchema
-    _inference_api: Any = PrivateAttr()
-    def __init__(self, **kwargs):
+    _inference_client: Any = PrivateAttr()
+    _model_id: str = PrivateAttr()
+    def __init__(self, inference_client=None, **kwargs):
         super().__init__(**kwargs)
-        model_id = "stabilityai/stable-video-diffusion-img2vid-xt"
-        self._inference_api = InferenceApi(repo_id=model_id, token=os.getenv("HUGGING_FACE_API_TOKEN"))
+        self._model_id = "stabilityai/stable-video-diffusion-img2vid-xt"
+        self._inference_client = inference_client or get_inference_client()
     def _run(self, source_image_path: str, output_path: str) -> str:
-        print(f"🎬 Generating video via Hugging Face from: '{source_image_path}'")
         if not os.path.exists(source_image_path): return f"Error: Source image not found at {source_image_path}"
+        with open(source_image_path, "rb") as f: image_bytes = f.read()
+        cache = get_asset_cache()
+        cache_key = cache.make_key(self.name, self._model_id, image_bytes)
+        if cache.fetch(cache_key, output_path):
+            return f"Successfully generated video and saved to {output_path} (reused cached asset)"
+        print(f"🎬 Generating video via Hugging Face from: '{source_image_path}'")
         try:
-            with open(source_image_path, "rb") as f: video_bytes = self._inference_api.image_to_video(f.read())
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            with open(output_path, "wb") as f: f.write(video_bytes)
+            video_bytes = self._inference_client.post(self._model_id, content=image_bytes)
+            write_atomic(output_path, video_bytes)
+            cache.store(cache_key, output_path)
             return f"Successfully generated video and saved to {output_path}"
-        except Exception as e: return f"Error during Hugging Face video generation: {e}. The model might be loading; try again."
\ No newline at end of file
+        except Exception as e: return f"Error during Hugging Face video generation: {e}"
\ No newline at end of file
@@ -1,51 +1,173 @@
 # tools/local_image_tool.py
 import os
+from collections import OrderedDict
 import torch
-from diffusers import DiffusionPipeline
+from PIL import Image
+from diffusers import DiffusionPipeline, DPMSolverMultistepScheduler, LCMScheduler
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field, PrivateAttr
-from typing import Any # Import Any
+from typing import Any, List, Optional, Tuple # Import Any
+from config import (LOCAL_IMAGE_MODEL_ID, LOCAL_IMAGE_DTYPE, LOCAL_IMAGE_SPEED, LOCAL_IMAGE_LCM_LORA_ID,
+                    LOCAL_IMAGE_MAX_BATCH, LOCAL_IMAGE_BYTES_PER_IMAGE, LOCAL_IMAGE_RAM_FRACTION,
+                    LOCAL_IMAGE_IP_ADAPTER_ID, LOCAL_IMAGE_IP_ADAPTER_WEIGHTS, LOCAL_IMAGE_IP_ADAPTER_SCALE)
+from models.runtime import pick_device, resolve_dtype, configure_cpu_threads, available_memory_bytes
+from models.pool import get_model_pool
+
+# Speed profile -> (inference steps, guidance scale). Guidance 1.0 disables the unconditional pass.
+SPEED_PROFILES = {"default": (20, 7.5), "dpm": (12, 7.0), "lcm": (4, 1.0)}
+_EMBED_CACHE_SIZE = 128
+# Approximate parameter count of an SD 1.5 checkpoint, used to make room in the pool before the first load.
+_SD_PARAMS = 1.07e9
 
 class LocalImageGeneratorToolSchema(BaseModel):
     prompt: str = Field(..., description="A detailed, descriptive prompt for the image.")
     file_path: str = Field(..., description="The local path to save the generated image.")
+    reference_image_path: Optional[str] = Field(None, description="Optional character reference portrait to condition the image on.")
 
 class LocalImageGeneratorTool(BaseTool):
     name: str = "Local Image Generator"
     description: str = "Generates a still image using a local Stable Diffusion model."
     args_schema: type[BaseModel] = LocalImageGeneratorToolSchema
-    
+
     # 1. Define the attributes at the class level
-    _pipeline: Any = PrivateAttr()
+    _speed: str = PrivateAttr()
+    _pool_key: str = PrivateAttr()
     _device: str = PrivateAttr()
+    _dtype: Any = PrivateAttr()
+    _steps: int = PrivateAttr()
+    _guidance: float = PrivateAttr()
+    _embed_cache: Any = PrivateAttr(default_factory=OrderedDict)
+    _negative_embeds: Any = PrivateAttr(default=None)
+    _ip_adapter_scale: float = PrivateAttr()
 
-    def __init__(self, **kwargs):
+    def __init__(self, speed: str = LOCAL_IMAGE_SPEED, ip_adapter_scale: float = LOCAL_IMAGE_IP_ADAPTER_SCALE, **kwargs):
         super().__init__(**kwargs)
-        if not torch.backends.mps.is_available():
-            print("Warning: MPS not available. This tool is optimized for Apple Silicon. It will run on CPU, but may be very slow.")
-            self._device = "cpu"
-        else:
-            self._device = "mps"
-        
+        if speed not in SPEED_PROFILES:
+            raise ValueError(f"Unknown speed profile '{speed}'. Use one of {sorted(SPEED_PROFILES)}.")
+        self._device = pick_device()
+        self._dtype = resolve_dtype(self._device, LOCAL_IMAGE_DTYPE)
+        if self._device == "cpu":
+            threads = configure_cpu_threads()
+            print(f"Warning: No GPU available. The local image model will run on CPU ({threads} threads, {self._dtype}).")
+
+        self._speed = speed
+        self._steps, self._guidance = SPEED_PROFILES[speed]
+        # 0 disables reference conditioning (and skips loading the IP-Adapter).
+        self._ip_adapter_scale = ip_adapter_scale
+        # 2. The pipeline itself is loaded on first use and kept resident by the shared model pool.
+        self._pool_key = f"local_image:{speed}"
+        get_model_pool().register(self._pool_key, self._load_pipeline,
+                                  size_hint=int(_SD_PARAMS * torch.finfo(self._dtype).bits // 8))
+
+    def _load_pipeline(self):
         print("🚀 Initializing local Stable Diffusion pipeline...")
-        model_id = "digiplay/AbsoluteReality_v1.8.1"
-        # 2. Assign to the private attribute
-        self._pipeline = DiffusionPipeline.from_pretrained(
-            model_id, 
-            torch_dtype=torch.float16,
+        pipeline = DiffusionPipeline.from_pretrained(
+            LOCAL_IMAGE_MODEL_ID,
+            torch_dtype=self._dtype,
             use_safetensors=True
         ).to(self._device)
-        print("✅ Local Stable Diffusion pipeline loaded.")
+        if self._speed == "dpm":
+            pipeline.scheduler = DPMSolverMultistepScheduler.from_config(
+                pipeline.scheduler.config, algorithm_type="dpmsolver++", use_karras_sigmas=True)
+        elif self._speed == "lcm":
+            pipeline.scheduler = LCMScheduler.from_config(pipeline.scheduler.config)
+            pipeline.load_lora_weights(LOCAL_IMAGE_LCM_LORA_ID)
+            pipeline.fuse_lora()
+        if self._ip_adapter_scale > 0:
+            pipeline.load_ip_adapter(LOCAL_IMAGE_IP_ADAPTER_ID, subfolder="models", weight_name=LOCAL_IMAGE_IP_ADAPTER_WEIGHTS)
+        if self._device == "cpu":
+            pipeline.unet.to(memory_format=torch.channels_last)
+        pipeline.set_progress_bar_config(disable=True)
+        print(f"✅ Local Stable Diffusion pipeline loaded ('{self._speed}': {self._steps} steps).")
+        return pipeline
+
+    # --- Batching ---
+    def batch_size(self) -> int:
+        """Images per pipeline call, sized to the memory available on the device."""
+        if self._device == "cuda":
+            available = torch.cuda.mem_get_info()[0]
+        elif self._device == "cpu":
+            available = available_memory_bytes()
+        else:
+            return 2
+        if available is None:
+            return 1
+        per_image = LOCAL_IMAGE_BYTES_PER_IMAGE * (1.0 if self._dtype == torch.float32 else 0.5)
+        if self._guidance <= 1.0:
+            per_image /= 2
+        return int(max(1, min(LOCAL_IMAGE_MAX_BATCH, available * LOCAL_IMAGE_RAM_FRACTION // per_image)))
+
+    def _prompt_embeds(self, pipeline, prompts: List[str]):
+        """Text-encoder outputs for `prompts`, computed once per distinct token sequence.
+
+        Only exact repeats (after truncation to CLIP's 77 tokens) are served from the cache: retried frames,
+        reused prompts and prompts whose shared opening fills all 77 tokens. Prompts that merely share a
+        character description still encode in full, since CLIPTextModel has no cache to resume a prefix from.
+        """
+        tokenizer = pipeline.tokenizer
+        ids = tokenizer(prompts, padding="max_length", max_length=tokenizer.model_max_length,
+                        truncation=True).input_ids
+        keys = [tuple(i) for i in ids]
+        missing = list(OrderedDict((k, p) for k, p in zip(keys, prompts) if k not in self._embed_cache).items())
+        if missing:
+            embeds, _ = pipeline.encode_prompt([p for _, p in missing], self._device, 1, False)
+            for (key, _), embed in zip(missing, embeds):
+                self._embed_cache[key] = embed
+        for key in keys:
+            self._embed_cache.move_to_end(key)
+        while len(self._embed_cache) > _EMBED_CACHE_SIZE:
+            self._embed_cache.popitem(last=False)
+        print(f"   Text encoder: {len(set(keys))} distinct prompt encodings for {len(prompts)} prompts ({len(missing)} new).")
+        return torch.stack([self._embed_cache[k] for k in keys])
+
+    def _negative(self, pipeline, count: int):
+        if self._negative_embeds is None:
+            self._negative_embeds, _ = pipeline.encode_prompt([""], self._device, 1, False)
+        return self._negative_embeds.expand(count, -1, -1)
+
+    def _reference_kwargs(self, pipeline, reference_path: Optional[str]) -> dict:
+        """IP-Adapter arguments for one pipeline call. Once the adapter is loaded every call needs an image, so
+        calls without a reference pass a blank one at scale 0."""
+        if self._ip_adapter_scale <= 0:
+            return {}
+        if reference_path:
+            pipeline.set_ip_adapter_scale(self._ip_adapter_scale)
+            return {"ip_adapter_image": Image.open(reference_path).convert("RGB")}
+        pipeline.set_ip_adapter_scale(0.0)
+        return {"ip_adapter_image": Image.new("RGB", (224, 224))}
+
+    def generate_batch(self, items: List[Tuple]) -> List[str]:
+        """Generates one image per (prompt, file_path[, reference_image_path]) item and returns one result
+        message per item, in order.
+
+        A pipeline call takes a single IP-Adapter image, so items are batched per reference portrait.
+        """
+        results = [None] * len(items)
+        groups = OrderedDict()
+        for index, item in enumerate(items):
+            reference = item[2] if len(item) > 2 and self._ip_adapter_scale > 0 else None
+            groups.setdefault(reference, []).append((index, item[0], item[1]))
+        size = self.batch_size()
+        print(f"🎨 Generating {len(items)} local images in batches of {size} ({len(groups)} reference groups)...")
+        for reference, group in groups.items():
+            for start in range(0, len(group), size):
+                chunk = group[start:start + size]
+                try:
+                    with get_model_pool().use(self._pool_key) as pipeline, torch.inference_mode():
+                        prompt_embeds = self._prompt_embeds(pipeline, [prompt for _, prompt, _ in chunk])
+                        negative = self._negative(pipeline, len(chunk)) if self._guidance > 1.0 else None
+                        images = pipeline(prompt_embeds=prompt_embeds, negative_prompt_embeds=negative,
+                                          num_inference_steps=self._steps, guidance_scale=self._guidance,
+                                          **self._reference_kwargs(pipeline, reference)).images
+                    for (index, _, file_path), image in zip(chunk, images):
+                        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+                        image.save(file_path)
+                        results[index] = f"Successfully saved local image to {file_path}"
+                except Exception as e:
+                    for index, _, _ in chunk:
+                        results[index] = f"Error during local image generation: {e}"
+        return results
 
-    def _run(self, prompt: str, file_path: str) -> str:
+    def _run(self, prompt: str, file_path: str, reference_image_path: Optional[str] = None) -> str:
         print(f"🎨 Generating local image with prompt: '{prompt}'")
-        try:
-            with torch.inference_mode():
-                # 3. Use the private attribute
-                image = self._pipeline(prompt, num_inference_steps=20).images[0]
-            
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            image.save(file_path)
-            return f"Successfully saved local image to {file_path}"
-        except Exception as e:
-            return f"Error during local image generation: {e}"
\ No newline at end of file
+        return self.generate_batch([(prompt, file_path, reference_image_path)])[0]
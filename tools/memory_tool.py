@@ -1,6 +1,7 @@
 # tools/memory_tool.py
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
+from typing import Optional
 from utils.memory_manager import MemoryManager
 
 
@@ -24,6 +25,7 @@ class MemoryTool(BaseTool):
 class MemoryReaderToolSchema(BaseModel):
     """Input schema for MemoryReaderTool."""
     query: str = Field(..., description="The question to ask the long-term memory about past episodes.")
+    character: Optional[str] = Field(None, description="Optional character name to list the latest episodes featuring them.")
 
 class MemoryReaderTool(BaseTool):
     name: str = "Series Memory Reader"
@@ -32,8 +34,14 @@ class MemoryReaderTool(BaseTool):
     # Define memory_manager as a class attribute. Pydantic will handle it.
     memory_manager: MemoryManager
 
-    def _run(self, query: str) -> str:
-        return self.memory_manager.get_relevant_context(query)
+    def _run(self, query: str, character: Optional[str] = None) -> str:
+        context = self.memory_manager.get_relevant_context(query)
+        if character:
+            appearances = self.memory_manager.get_character_context(character)
+            if appearances:
+                context += f"\n\nRecent episodes featuring {character}:\n" + "\n".join(
+                    f"Episode {episode_id}: {summary}" for episode_id, summary in appearances)
+        return context
 
 
 # --- CORRECT SCHEMA AND TOOL FOR WRITING MEMORY ---
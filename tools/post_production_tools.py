@@ -1,11 +1,8 @@
 # tools/post_production_tools.py
 import os
-import cv2
-import numpy as np
-from PIL import Image
-from moviepy.editor import ImageSequenceClip
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
+from utils.face_animation import render_talking_head, render_talking_heads
 
 
 
@@ -27,38 +24,30 @@ class FaceAnimationTool(BaseTool):
         print(f"👄 Generating REAL animation for {os.path.basename(base_character_image_path)}...")
         
         try:
-            # Get the duration from the audio file to sync the video length
-            audio_clip = AudioFileClip(dialogue_audio_path)
-            duration = audio_clip.duration
-            fps = 24
-
-            # Load images using PIL and convert to numpy arrays for OpenCV/moviepy
-            base_img = np.array(Image.open(base_character_image_path).convert("RGB"))
-            open_mouth_img = np.array(Image.open(open_mouth_image_path).convert("RGB"))
-
-            frames = []
-            num_frames = int(duration * fps)
-
-            # Create a sequence of frames alternating between open and closed mouth
-            # This creates a simple but effective talking illusion
-            for i in range(num_frames):
-                if (i // 4) % 2 == 0:  # Switch image every 4 frames
-                    frames.append(base_img)
-                else:
-                    frames.append(open_mouth_img)
-            
-            # Create a video clip from the image sequence
-            animation_clip = ImageSequenceClip(frames, fps=fps)
-            
-            # Set the audio of the animation clip to the dialogue
-            final_clip = animation_clip.set_audio(audio_clip)
-
-            # Write the final video file
-            final_clip.write_videofile(output_video_path, codec="libx264", audio_codec="aac", logger=None)
-            
+            # The mouth opens on frames where the dialogue is audibly voiced and rests during pauses.
+            stats = render_talking_head(base_character_image_path, open_mouth_image_path,
+                                        dialogue_audio_path, output_video_path)
+            print(f"...{stats['frames']} frames, mouth open {stats['open_ratio']:.0%}, rendered in {stats['seconds']:.1f}s.")
             return f"Successfully generated real animated video at {output_video_path}"
         except Exception as e:
             return f"Error during face animation generation: {e}"
+
+    def animate_lines(self, lines: list) -> list:
+        """Batch version of the tool: renders every dialogue line (dicts of the tool's arguments) in one
+        process, sharing decoded portraits. Returns one result message per line, in order."""
+        jobs = [{"base_image_path": line["base_character_image_path"],
+                 "open_mouth_image_path": line["open_mouth_image_path"],
+                 "audio_path": line["dialogue_audio_path"],
+                 "output_path": line["output_video_path"]} for line in lines]
+        print(f"👄 Batch-animating {len(jobs)} dialogue lines...")
+        results = []
+        for job, outcome in zip(jobs, render_talking_heads(jobs)):
+            if isinstance(outcome, Exception):
+                results.append(f"Error during face animation generation: {outcome}")
+            else:
+                results.append(f"Successfully generated real animated video at {job['output_path']}")
+        return results
+
 # Define the explicit schema class
 class LocalLipSyncToolSchema(BaseModel):
     """Input schema for LocalLipSyncTool."""
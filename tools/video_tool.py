@@ -2,10 +2,12 @@
 import os
 import requests
 from crewai.tools import BaseTool
-from pydantic import BaseModel, Field
-from moviepy.editor import ImageClip, AudioFileClip
-from moviepy.video.fx.all import crop, resize
+from typing import Any, Optional
+from pydantic import BaseModel, Field, PrivateAttr
 from gradio_client import Client
+from config import KEN_BURNS_PRESET
+from utils.ffmpeg_utils import probe
+from utils.ken_burns import PRESETS, render_ken_burns
 
 # --- CORRECT SCHEMA DEFINITION FOR StillImageGeneratorTool ---
 class StillImageGeneratorToolSchema(BaseModel):
@@ -17,11 +19,16 @@ class StillImageGeneratorTool(BaseTool):
     name: str = "Still Scene Image Generator"
     description: str = "Generates a single, high-quality still image for a scene using a Hugging Face Space."
     args_schema: type[BaseModel] = StillImageGeneratorToolSchema
+    _gradio_client: Any = PrivateAttr(default=None)
+
+    def __init__(self, gradio_client=None, **kwargs):
+        super().__init__(**kwargs)
+        self._gradio_client = gradio_client
 
     def _run(self, prompt: str, file_path: str) -> str:
         print(f"🎨 Generating Still Image via Gradio Client: '{prompt}'")
         try:
-            client = Client("KBlueLeaf/Kohaku-v2.1")
+            client = self._gradio_client or Client("KBlueLeaf/Kohaku-v2.1")
             result = client.predict(
                 prompt=f"masterpiece, best quality, cinematic anime art, {prompt}",
                 negative_prompt="lowres, bad anatomy, bad hands, text, error, missing fingers, extra digit, fewer digits, cropped, worst quality, low quality, normal quality, jpeg artifacts, signature, watermark, username, blurry",
@@ -44,32 +51,30 @@ class KenBurnsVideoToolSchema(BaseModel):
     image_path: str = Field(..., description="The path to the still image to animate.")
     audio_path: str = Field(..., description="The path to the dialogue audio file to layer over the video. This can be a path to a non-existent file for silent scenes.")
     output_path: str = Field(..., description="The path to save the final video clip.")
+    preset: Optional[str] = Field(None, description=f"Camera move, one of {sorted(PRESETS)}. Defaults to a slow zoom in.")
 
 class KenBurnsVideoTool(BaseTool):
     name: str = "Ken Burns Effect Video Creator"
     description: str = "Creates a short video clip from a still image by adding a slow zoom/pan effect and layering dialogue audio over it."
     args_schema: type[BaseModel] = KenBurnsVideoToolSchema
 
-    def _run(self, image_path: str, audio_path: str, output_path: str) -> str:
+    def _run(self, image_path: str, audio_path: str, output_path: str, preset: Optional[str] = None) -> str:
         print(f"📹 Creating Ken Burns video for {os.path.basename(image_path)}")
         has_audio = os.path.exists(audio_path)
         if not os.path.exists(image_path):
             return f"Error: Missing input image file: {image_path}"
         if not has_audio:
             print("...Detected silent scene. Creating video without dialogue.")
+        preset = preset or KEN_BURNS_PRESET
+        if preset not in PRESETS:
+            return f"Error: Unknown camera preset '{preset}'. Use one of {sorted(PRESETS)}."
         try:
             duration = 3.0
             if has_audio:
-                with AudioFileClip(audio_path) as audio_clip_handle:
-                    duration = audio_clip_handle.duration + 0.5
-            image_clip = ImageClip(image_path).set_duration(duration)
-            (w, h) = image_clip.size
-            zoomed_clip = image_clip.fx(resize.Resize, lambda t: 1 + 0.05 * (t / duration)).set_position(('center', 'center'))
-            final_clip = crop(zoomed_clip, width=w, height=h, x_center=zoomed_clip.w/2, y_center=zoomed_clip.h/2)
-            if has_audio:
-                audio_clip_to_set = AudioFileClip(audio_path)
-                final_clip = final_clip.set_audio(audio_clip_to_set)
-            final_clip.write_videofile(output_path, codec="libx264", audio_codec="aac", logger=None)
+                duration = probe(audio_path)["duration"] + 0.5
+            stats = render_ken_burns(image_path, output_path, duration,
+                                     audio_path=audio_path if has_audio else None, preset=preset)
+            print(f"...Rendered {stats['frames']} frames in {stats['seconds']:.1f}s ({stats['realtime_factor']:.0f}x real time).")
             return f"Successfully created video clip at {output_path}"
         except Exception as e:
-            return f"Error creating Ken Burns video: {e}"
\ No newline at end of file
+            return f"Error creating Ken Burns video: {e}"
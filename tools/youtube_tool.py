@@ -1,13 +1,55 @@
 # tools/youtube_tool.py
 from crewai.tools import BaseTool
+import http.client
 import os
 import json
+import random
+import time
+import httplib2
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Any
+from config import YOUTUBE_UPLOAD_CHUNK_MB, YOUTUBE_UPLOAD_MAX_RETRIES, HTTP_BACKOFF_BASE_SECONDS, HTTP_MAX_BACKOFF_SECONDS
+from core import tracing
+from utils.asset_cache import write_atomic
+
+# Resumable upload chunks must be multiples of 256 KiB (except the last one).
+CHUNK_GRANULARITY = 256 * 1024
+RETRYABLE_STATUS = {500, 502, 503, 504}
+RETRYABLE_EXCEPTIONS = (httplib2.HttpLib2Error, http.client.HTTPException, OSError)
+# Statuses for a saved session URI that the server no longer knows; the upload starts over.
+EXPIRED_SESSION_STATUS = {404, 410}
+
+
+def upload_session_path(file_path: str) -> str:
+    """Where the resumable session of an upload of `file_path` is saved while it is in progress."""
+    return file_path + ".upload.json"
+
+
+class _SessionStartHook:
+    """Wraps the http object of an upload request and reports the session URI as soon as the server creates it.
+
+    googleapiclient opens the session and sends the first chunk in the same next_chunk() call, so without this
+    a worker killed during the first chunk would leave no session to resume.
+    """
+
+    def __init__(self, http, on_session):
+        self._http = http
+        self._on_session = on_session
+
+    def request(self, uri, method="GET", *args, **kwargs):
+        resp, content = self._http.request(uri, method, *args, **kwargs)
+        if method == "POST" and resp.status == 200 and "location" in resp:
+            self._on_session(resp["location"])
+        return resp, content
+
+    def __getattr__(self, name):
+        return getattr(self._http, name)
 
 
 class YouTubeUploaderToolSchema(BaseModel):
@@ -20,8 +62,20 @@ class YouTubeUploaderToolSchema(BaseModel):
 class YouTubeUploaderTool(BaseTool):
     name: str = "YouTube Uploader Tool"
     description: str = "Uploads a video file to YouTube with a title and description."
-    args_schema: type[BaseModel] = YouTubeUploaderToolSchema # 2. 
-    
+    args_schema: type[BaseModel] = YouTubeUploaderToolSchema # 2.
+    _youtube_service: Any = PrivateAttr(default=None)
+    _chunk_size: int = PrivateAttr()
+    _max_retries: int = PrivateAttr()
+    _sleep: Any = PrivateAttr(default=time.sleep)
+
+    def __init__(self, youtube_service=None, chunk_mb: float = YOUTUBE_UPLOAD_CHUNK_MB,
+                 max_retries: int = YOUTUBE_UPLOAD_MAX_RETRIES, **kwargs):
+        super().__init__(**kwargs)
+        # A prebuilt API client (e.g. a local stand-in); by default one is built from the OAuth token on upload.
+        self._youtube_service = youtube_service
+        self._chunk_size = max(CHUNK_GRANULARITY, int(chunk_mb * 1024 * 1024) // CHUNK_GRANULARITY * CHUNK_GRANULARITY)
+        self._max_retries = max_retries
+
     def _get_credentials(self):
         creds = None
         if os.path.exists("token.json"):
@@ -36,18 +90,109 @@ class YouTubeUploaderTool(BaseTool):
                 token.write(creds.to_json())
         return creds
 
+    # --- Upload session ---
+    @staticmethod
+    def _file_state(file_path: str) -> dict:
+        stat = os.stat(file_path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _load_session(self, file_path: str):
+        """The saved session URI of an earlier, unfinished upload of this exact file, if any."""
+        try:
+            with open(upload_session_path(file_path), "r") as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if {k: session.get(k) for k in ("size", "mtime_ns")} != self._file_state(file_path):
+            # The episode was re-rendered since; its old session would splice two different files.
+            self._clear_session(file_path)
+            return None
+        return session.get("resumable_uri")
+
+    def _save_session(self, file_path: str, resumable_uri: str):
+        session = dict(self._file_state(file_path), resumable_uri=resumable_uri, saved_at=time.time())
+        write_atomic(upload_session_path(file_path), json.dumps(session).encode("utf-8"))
+
+    @staticmethod
+    def _clear_session(file_path: str):
+        try:
+            os.remove(upload_session_path(file_path))
+        except FileNotFoundError:
+            pass
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(HTTP_MAX_BACKOFF_SECONDS, HTTP_BACKOFF_BASE_SECONDS * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def _new_request(self, youtube, file_path: str, request_body: dict, resumable_uri: str = None):
+        media = MediaFileUpload(file_path, chunksize=self._chunk_size, resumable=True)
+        request = youtube.videos().insert(part=",".join(request_body.keys()), body=request_body, media_body=media)
+        if resumable_uri:
+            # Starting in the error state makes the first next_chunk() ask the server how much it already has.
+            # `_in_error_state` is private to googleapiclient (pinned in requirements.txt). If a release drops it,
+            # setting it would be a silent no-op and the upload would restart from byte 0 on a stale session.
+            if not hasattr(request, "_in_error_state"):
+                raise RuntimeError("This googleapiclient version can't resume uploads (HttpRequest has no "
+                                   "_in_error_state); pin the version from requirements.txt.")
+            request.resumable_uri = resumable_uri
+            request._in_error_state = True
+        return request
+
+    def _upload(self, youtube, file_path: str, request_body: dict) -> dict:
+        """Sends the file chunk by chunk, retrying transient failures, and returns the API response."""
+        size = os.path.getsize(file_path)
+        resumable_uri = self._load_session(file_path)
+        if resumable_uri:
+            print(f"⏯️ Resuming the interrupted upload of {file_path}...")
+        request = self._new_request(youtube, file_path, request_body, resumable_uri)
+        # Saved as soon as the session exists, so a crashed worker resumes this upload instead of starting over.
+        http = _SessionStartHook(request.http, lambda uri: self._save_session(file_path, uri))
+        restarted, retries, attempt = False, 0, 0
+        response = None
+        while response is None:
+            try:
+                status, response = request.next_chunk(http=http)
+                attempt = 0
+                if status:
+                    print(f"   ⬆️ Uploaded {status.progress():.0%} ({status.resumable_progress / 1e6:.1f} of {size / 1e6:.1f} MB)")
+            except HttpError as e:
+                if e.resp.status in EXPIRED_SESSION_STATUS and request.resumable_uri and not restarted:
+                    print("   The upload session has expired on the server; starting the upload over.")
+                    self._clear_session(file_path)
+                    restarted = True
+                    request = self._new_request(youtube, file_path, request_body)
+                    continue
+                if e.resp.status not in RETRYABLE_STATUS or attempt >= self._max_retries:
+                    raise
+                error = f"HTTP {e.resp.status}"
+            except RETRYABLE_EXCEPTIONS as e:
+                if attempt >= self._max_retries:
+                    raise
+                error = type(e).__name__
+            else:
+                error = None
+            if error:
+                delay = self._backoff(attempt)
+                attempt += 1
+                retries += 1
+                print(f"🔁 YouTube upload: {error}, retrying in {delay:.1f}s ({attempt}/{self._max_retries})")
+                self._sleep(delay)
+        self._clear_session(file_path)
+        tracing.annotate(upload_retries=retries, upload_resumed=bool(resumable_uri) and not restarted, upload_bytes=size)
+        return response
+
     def _run(self, file_path: str, title: str, description: str) -> str:
         if not os.path.exists(file_path):
             return f"Error: Video file not found at {file_path}"
-        
+
         try:
-            credentials = self._get_credentials()
-            youtube = build("youtube", "v3", credentials=credentials)
+            youtube = self._youtube_service or build("youtube", "v3", credentials=self._get_credentials())
             request_body = { "snippet": { "title": title, "description": description, "tags": ["AI", "Anime", "CrewAI"], "categoryId": "1" }, "status": { "privacyStatus": "public" } }
-            media = MediaFileUpload(file_path, chunksize=-1, resumable=True)
-            print("Uploading to YouTube...")
-            request = youtube.videos().insert(part=",".join(request_body.keys()), body=request_body, media_body=media)
-            response = request.execute()
+            print(f"Uploading to YouTube in {self._chunk_size / 1024 / 1024:g} MB chunks...")
+            response = self._upload(youtube, file_path, request_body)
             return f"Successfully uploaded video. Video ID: {response.get('id')}"
         except Exception as e:
-            return f"An error occurred during YouTube upload: {e}"
\ No newline at end of file
+            resumable = os.path.exists(upload_session_path(file_path))
+            return (f"Error: The YouTube upload of {file_path} failed and the video is NOT published: {e}. "
+                    + ("The upload session is saved; run this tool again with the same file to resume it."
+                       if resumable else "Run this tool again to retry the upload."))
@@ -0,0 +1,143 @@
+# utils/asset_cache.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from config import ASSET_CACHE_DIR, ASSET_CACHE_MAX_BYTES
+from core import tracing
+
+
+def write_atomic(path: str, data: bytes):
+    """Writes bytes to `path` via a temp file + rename, so readers never see a half-written file."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class AssetCache:
+    """Content-addressed on-disk store for generated assets, bounded by a byte budget with LRU eviction.
+
+    Entries live at `<root>/<key[:2]>/<key><ext>`. Recency is tracked through the file mtime, which is
+    bumped on every hit, so the cache needs no separate index and can be shared between processes.
+    """
+
+    def __init__(self, root: str = ASSET_CACHE_DIR, max_bytes: int = ASSET_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # Computed lazily on the first store.
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def make_key(tool: str, model_id: str, inputs, params: dict = None) -> str:
+        """Hashes (tool, model id, prompt/input bytes, generation params) into a cache key."""
+        h = hashlib.sha256()
+        h.update(tool.encode("utf-8") + b"\0")
+        h.update(model_id.encode("utf-8") + b"\0")
+        for item in inputs if isinstance(inputs, (list, tuple)) else [inputs]:
+            h.update(item if isinstance(item, bytes) else str(item).encode("utf-8"))
+            h.update(b"\0")
+        h.update(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8"))
+        return h.hexdigest()
+
+    def _entry_path(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, key[:2], key + ext)
+
+    def fetch(self, key: str, dest_path: str) -> bool:
+        """Copies a cached artifact to `dest_path`. Returns False on a miss.
+
+        The output is always a private copy: tools rewrite their output paths in place, which would corrupt a
+        hard-linked entry.
+        """
+        ext = os.path.splitext(dest_path)[1]
+        entry = self._entry_path(key, ext)
+        directory = os.path.dirname(dest_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+        os.close(fd)
+        try:
+            shutil.copyfile(entry, tmp_path)
+            os.replace(tmp_path, dest_path)
+        except FileNotFoundError:
+            # Not cached, or evicted by another process since; either way a miss.
+            os.remove(tmp_path)
+            return False
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        try:
+            os.utime(entry)  # Mark as most recently used.
+        except OSError:
+            pass
+        tracing.annotate(cache_hit=True)
+        print(f"♻️ Asset cache hit: {dest_path}")
+        return True
+
+    def store(self, key: str, src_path: str):
+        """Copies a freshly generated artifact into the cache and evicts old entries if over budget."""
+        if not os.path.exists(src_path):
+            return
+        ext = os.path.splitext(src_path)[1]
+        entry = self._entry_path(key, ext)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry), prefix=".tmp_")
+        os.close(fd)
+        shutil.copyfile(src_path, tmp_path)
+        existed = os.path.exists(entry)
+        os.replace(tmp_path, entry)
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, _, size in self._entries())
+            elif not existed:
+                self._total_bytes += os.path.getsize(entry)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.startswith(".tmp_"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_mtime, st.st_size
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def get_asset_cache() -> AssetCache:
+    """Returns the process-wide asset cache shared by all generation tools."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = AssetCache()
+        return _shared_cache
@@ -0,0 +1,231 @@
+# utils/audio_mixer.py
+# Block-based NumPy mixer for the episode soundtrack.
+#
+# Dialogue and SFX cues are decoded once into float32 arrays at the mix rate and placed on a timeline; the
+# long stems (the clips' own audio and the looped music bed) are streamed from ffmpeg a block at a time.
+# Music is ducked under dialogue by a gain envelope computed at a 10 ms control rate from the dialogue
+# itself. The mix is rendered twice: the first pass only measures loudness (ITU-R BS.1770 K-weighted,
+# gated) and peak, the second applies the normalizing gain and streams the result into the encoder.
+# Memory is the cues plus a couple of blocks, however long the episode is.
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from config import (AUDIO_MIX_SAMPLE_RATE, AUDIO_MIX_BLOCK_SECONDS, AUDIO_MIX_TARGET_LUFS, AUDIO_MIX_PEAK_DBFS,
+                    AUDIO_MIX_MUSIC_DB, AUDIO_MIX_SFX_DB, AUDIO_MIX_DUCK_DB, AUDIO_MIX_DUCK_ATTACK,
+                    AUDIO_MIX_DUCK_RELEASE, AUDIO_MIX_DUCK_THRESHOLD_DB)
+from utils.ffmpeg_utils import decode_audio, stream_audio, encode_raw_audio
+
+CHANNELS = 2
+CONTROL_HOP = 0.01  # seconds per ducking-envelope step
+SEGMENT = 0.1  # seconds per loudness segment; four of them make one 400 ms gating block
+
+
+class Cue(NamedTuple):
+    """A one-shot sound placed on the timeline."""
+    path: str
+    start: float
+    kind: str = "dialogue"  # "dialogue" or "sfx"
+    gain_db: float = 0.0
+
+
+def db_to_gain(db: float) -> float:
+    return 10 ** (db / 20)
+
+
+# --- Loudness (ITU-R BS.1770) ---
+def _biquad_power(b, a, w: np.ndarray) -> np.ndarray:
+    z = np.exp(-1j * w)
+    return np.abs((b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)) ** 2
+
+
+def k_weighting_power(n_fft: int, sample_rate: int) -> np.ndarray:
+    """|H(f)|^2 of the BS.1770 K-weighting (high shelf + high-pass) at the rfft bins of an n_fft transform.
+
+    The filters are designed for `sample_rate` the way libebur128 does; at 48 kHz they match the coefficients
+    published in the standard.
+    """
+    w = 2 * np.pi * np.fft.rfftfreq(n_fft, 1.0 / sample_rate) / sample_rate
+    # Stage 1: +4 dB high shelf around 1.7 kHz (head acoustics).
+    k, q = np.tan(np.pi * 1681.974450955533 / sample_rate), 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf_b = ((vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0)
+    shelf_a = (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0)
+    # Stage 2: high-pass at 38 Hz (RLB weighting).
+    k, q = np.tan(np.pi * 38.13547087602444 / sample_rate), 0.5003270373238773
+    a0 = 1 + k / q + k * k
+    hp_a = (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0)
+    return _biquad_power(shelf_b, shelf_a, w) * _biquad_power((1.0, -2.0, 1.0), hp_a, w)
+
+
+def segment_power(block: np.ndarray, segment: int, weights: np.ndarray) -> np.ndarray:
+    """K-weighted mean square per channel of each `segment`-sample slice: shape (segments, channels).
+
+    The filter is applied in the frequency domain (Parseval), so no sample-by-sample IIR loop is needed.
+    """
+    count = len(block) // segment
+    spectrum = np.fft.rfft(block[:count * segment].reshape(count, segment, -1), axis=1)
+    power = np.abs(spectrum) ** 2 * weights[None, :, None]
+    # One-sided spectrum: every bin except DC (and Nyquist for even sizes) stands for two.
+    power[:, 1:(segment + 1) // 2] *= 2
+    return power.sum(axis=1) / (segment * segment)
+
+
+def integrated_loudness(segment_powers: np.ndarray) -> float:
+    """Gated integrated loudness (LUFS) from per-segment channel powers, with 400 ms blocks at 75% overlap."""
+    if len(segment_powers) < 4:
+        return -np.inf
+    summed = segment_powers.sum(axis=1)
+    blocks = np.convolve(summed, np.ones(4) / 4, mode="valid")
+    loudness = -0.691 + 10 * np.log10(blocks + 1e-20)
+    blocks = blocks[loudness > -70.0]  # absolute gate
+    if not len(blocks):
+        return -np.inf
+    relative_gate = -0.691 + 10 * np.log10(blocks.mean()) - 10.0
+    blocks = blocks[-0.691 + 10 * np.log10(blocks) > relative_gate]
+    return float(-0.691 + 10 * np.log10(blocks.mean()))
+
+
+# --- Ducking ---
+def duck_envelope(dialogue: list, duration: float, duck_db: float = AUDIO_MIX_DUCK_DB,
+                  attack: float = AUDIO_MIX_DUCK_ATTACK, release: float = AUDIO_MIX_DUCK_RELEASE,
+                  threshold_db: float = AUDIO_MIX_DUCK_THRESHOLD_DB, sample_rate: int = AUDIO_MIX_SAMPLE_RATE) -> np.ndarray:
+    """Music gain per CONTROL_HOP step: 1.0 in the clear, `duck_db` down wherever dialogue is audible.
+
+    `dialogue` is a list of (start_seconds, samples). The duck starts `attack` seconds ahead of speech, so the
+    music is already down on the first syllable, and recovers over `release` seconds.
+    """
+    steps = int(np.ceil(duration / CONTROL_HOP)) + 1
+    hop = int(round(CONTROL_HOP * sample_rate))
+    active = np.zeros(steps, dtype=bool)
+    for start, samples in dialogue:
+        mono = samples.mean(axis=1)
+        count = len(mono) // hop
+        if not count:
+            continue
+        rms = np.sqrt((mono[:count * hop].reshape(count, hop) ** 2).mean(axis=1))
+        first = int(round(start / CONTROL_HOP))
+        voiced = 20 * np.log10(rms + 1e-10) > threshold_db
+        end = min(steps, first + count)
+        if end > first:
+            active[first:end] |= voiced[:end - first]
+    lookahead = int(round(attack / CONTROL_HOP))
+    if lookahead:
+        # Lookahead: anything speaking within `attack` from now already counts as speaking.
+        padded = np.concatenate([active, np.zeros(lookahead, dtype=bool)])
+        active = np.lib.stride_tricks.sliding_window_view(padded, lookahead + 1).any(axis=1)
+
+    target = np.where(active, db_to_gain(duck_db), 1.0)
+    fall = 1 - np.exp(-CONTROL_HOP / max(attack, 1e-3))
+    rise = 1 - np.exp(-CONTROL_HOP / max(release, 1e-3))
+    envelope = np.empty(steps)
+    gain = 1.0
+    for i, t in enumerate(target):
+        gain += (t - gain) * (fall if t < gain else rise)
+        envelope[i] = gain
+    return envelope
+
+
+# --- Mixing ---
+class _Timeline:
+    """Everything needed to render any block of the mix."""
+
+    def __init__(self, duration: float, cues: list, bed_input: list, music_path: str, music_db: float,
+                 sfx_db: float, sample_rate: int, block: int):
+        self.sample_rate = sample_rate
+        self.total = int(round(duration * sample_rate))
+        self.block = block
+        self.bed_input = bed_input
+        self.music_path = music_path
+        self.music_gain = db_to_gain(music_db)
+        self.placed = []
+        for cue in cues:
+            samples = decode_audio(cue.path, sample_rate, CHANNELS)
+            gain = db_to_gain(cue.gain_db + (sfx_db if cue.kind == "sfx" else 0.0))
+            start = int(round(cue.start * sample_rate))
+            if len(samples) and start < self.total:
+                self.placed.append((start, samples, gain, cue.kind))
+        dialogue = [(s / sample_rate, x) for s, x, _, kind in self.placed if kind == "dialogue"]
+        self.envelope = duck_envelope(dialogue, duration, sample_rate=sample_rate) if music_path else None
+
+    def _stems(self):
+        blocks = {}
+        if self.bed_input:
+            blocks["bed"] = stream_audio(self.bed_input, self.sample_rate, CHANNELS, self.block)
+        if self.music_path:
+            blocks["music"] = stream_audio(["-stream_loop", "-1", "-i", self.music_path], self.sample_rate,
+                                           CHANNELS, self.block)
+        return blocks
+
+    def render(self):
+        """Yields the unnormalized mix block by block."""
+        stems = self._stems()
+        try:
+            for start in range(0, self.total, self.block):
+                length = min(self.block, self.total - start)
+                out = np.zeros((length, CHANNELS), dtype=np.float32)
+                bed = next(stems["bed"], None) if "bed" in stems else None
+                if bed is not None:
+                    out[:min(length, len(bed))] += bed[:length]
+                music = next(stems["music"], None) if "music" in stems else None
+                if music is not None:
+                    times = (start + np.arange(min(length, len(music)))) / self.sample_rate
+                    gain = np.interp(times / CONTROL_HOP, np.arange(len(self.envelope)), self.envelope)
+                    out[:len(times)] += music[:len(times)] * (gain * self.music_gain).astype(np.float32)[:, None]
+                for cue_start, samples, gain, _ in self.placed:
+                    lo, hi = max(start, cue_start), min(start + length, cue_start + len(samples))
+                    if lo < hi:
+                        out[lo - start:hi - start] += samples[lo - cue_start:hi - cue_start] * gain
+                yield out
+        finally:
+            for stem in stems.values():
+                stem.close()
+
+
+def mix_audio(output_path: str, duration: float, cues: list = (), bed_input: list = None, music_path: str = None,
+              target_lufs: float = AUDIO_MIX_TARGET_LUFS, peak_dbfs: float = AUDIO_MIX_PEAK_DBFS,
+              music_db: float = AUDIO_MIX_MUSIC_DB, sfx_db: float = AUDIO_MIX_SFX_DB,
+              sample_rate: int = AUDIO_MIX_SAMPLE_RATE, codec_args: list = None) -> dict:
+    """Mixes the episode soundtrack into `output_path` and returns mix statistics.
+
+    `cues` are Cue one-shots (dialogue, SFX); `bed_input` is ffmpeg input args for audio that already runs the
+    length of the episode (e.g. the concatenated clips); `music_path` is looped under everything and ducked
+    under dialogue. The result is normalized to `target_lufs`, limited by `peak_dbfs` sample peak.
+    """
+    started = time.perf_counter()
+    segment = int(round(SEGMENT * sample_rate))
+    block = max(1, int(AUDIO_MIX_BLOCK_SECONDS / SEGMENT)) * segment
+    timeline = _Timeline(duration, list(cues), bed_input, music_path, music_db, sfx_db, sample_rate, block)
+
+    # Pass 1: measure.
+    weights = k_weighting_power(segment, sample_rate)
+    powers, peak = [], 0.0
+    for out in timeline.render():
+        powers.append(segment_power(out, segment, weights))
+        peak = max(peak, float(np.abs(out).max(initial=0.0)))
+    loudness = integrated_loudness(np.concatenate(powers)) if powers else -np.inf
+
+    gain_db = 0.0 if not np.isfinite(loudness) else target_lufs - loudness
+    if peak > 0:
+        # Never push a sample past the ceiling: quieter than target beats clipped.
+        gain_db = min(gain_db, peak_dbfs - 20 * np.log10(peak))
+    gain = np.float32(db_to_gain(gain_db))
+
+    # Pass 2: render again with the gain applied and encode.
+    encode_raw_audio((np.clip(out * gain, -1.0, 1.0) for out in timeline.render()), sample_rate, CHANNELS,
+                     output_path, codec_args)
+    stats = {
+        "seconds": duration,
+        "dialogue_cues": sum(1 for p in timeline.placed if p[3] == "dialogue"),
+        "sfx_cues": sum(1 for p in timeline.placed if p[3] == "sfx"),
+        "loudness_lufs": round(float(loudness + gain_db), 2) if np.isfinite(loudness) else None,
+        "gain_db": round(float(gain_db), 2),
+        "peak_dbfs": round(float(20 * np.log10(peak) + gain_db), 2) if peak > 0 else None,
+        "elapsed": time.perf_counter() - started,
+    }
+    print(f"🎚️ Mixed {duration:.1f}s of audio ({stats['dialogue_cues']} dialogue, {stats['sfx_cues']} sfx cues) "
+          f"at {stats['loudness_lufs']} LUFS in {stats['elapsed']:.1f}s.")
+    return stats
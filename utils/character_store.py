@@ -0,0 +1,166 @@
+# utils/character_store.py
+# Canonical reference portraits for the characters in config.CHARACTERS.
+#
+# Each character's portrait is generated once from its description and kept under CHARACTER_STORE_DIR with
+# a manifest recording the prompt, a version (hash of prompt + image model) and the description's embedding.
+# Changing a character's description bumps the version and regenerates only that portrait.
+#
+# Shot prompts then name characters instead of re-describing them. Before a frame is generated, the
+# characters a prompt refers to are resolved, by name or else by embedding similarity ("his mother"). The
+# frame is conditioned on the portrait where the image tool supports references (the local pipeline's
+# IP-Adapter). A frame takes one reference, so the other characters in the shot get their full description
+# appended instead. Portraits are only generated for image tools that take references: for any other tool
+# (the remote default) they would be paid generations that no frame could use, and the planner keeps
+# describing the characters in the prompts itself.
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from config import CHARACTERS, CHARACTER_MATCH_SIMILARITY
+from utils.asset_cache import write_atomic
+from utils.memory_manager import find_characters
+
+MANIFEST_NAME = "manifest.json"
+PORTRAIT_PROMPT = ("character reference portrait of {name}, {description} Front view, upper body, neutral "
+                   "expression, plain light background, consistent character design, cinematic anime style")
+
+
+class CharacterPortrait(NamedTuple):
+    name: str
+    version: str
+    path: str
+
+
+class CharacterStore:
+    def __init__(self, root: str, image_tool=None, embedding_function=None, model_id: str = "",
+                 characters: dict = None, match_similarity: float = CHARACTER_MATCH_SIMILARITY):
+        self.root = root
+        self.image_tool = image_tool
+        self.embedding_function = embedding_function
+        self.model_id = model_id or getattr(image_tool, "_model_id", "") or type(image_tool).__name__
+        self.characters = characters if characters is not None else CHARACTERS
+        self.match_similarity = match_similarity
+        self._lock = threading.Lock()
+        self._manifest_path = os.path.join(root, MANIFEST_NAME)
+        self._manifest = self._load_manifest()
+        self._description_vectors = None
+
+    # --- Manifest ---
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self._manifest_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        write_atomic(self._manifest_path, json.dumps(self._manifest, indent=2).encode("utf-8"))
+
+    @staticmethod
+    def slug(name: str) -> str:
+        return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+    def _prompt(self, name: str) -> str:
+        description = self.characters[name].strip()
+        if not description.endswith("."):
+            description += "."
+        return PORTRAIT_PROMPT.format(name=name, description=description)
+
+    def _version(self, name: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\0{self._prompt(name)}".encode("utf-8")).hexdigest()[:12]
+
+    def portrait(self, name: str):
+        """The current portrait of `name`, or None if it hasn't been generated (or is out of date)."""
+        entry = self._manifest.get(name)
+        if entry is None or entry["version"] != self._version(name) or not os.path.exists(entry["path"]):
+            return None
+        return CharacterPortrait(name, entry["version"], entry["path"])
+
+    # --- Generation ---
+    @property
+    def generates_portraits(self) -> bool:
+        """Whether the image tool can condition frames on a portrait (only then is one worth generating)."""
+        return hasattr(self.image_tool, "generate_batch")
+
+    def _generate(self, names: list) -> dict:
+        """Generates the given portraits with the image tool. Returns {name: error message} for failures."""
+        jobs = [(name, self._prompt(name), os.path.join(self.root, self.slug(name), f"v_{self._version(name)}.png"))
+                for name in names]
+        print(f"🧑‍🎨 Generating {len(jobs)} character reference portraits: {', '.join(names)}")
+        results = self.image_tool.generate_batch([(prompt, path) for _, prompt, path in jobs])
+        vectors = self._embed([f"{name}: {self.characters[name]}" for name, _, _ in jobs])
+        failed = {}
+        for (name, prompt, path), result, vector in zip(jobs, results, vectors):
+            if not isinstance(result, str) or result.startswith("Error") or not os.path.exists(path):
+                failed[name] = result
+                continue
+            self._manifest[name] = {"version": self._version(name), "prompt": prompt, "path": path,
+                                    "model_id": self.model_id, "embedding": vector, "created_at": time.time()}
+        self._save_manifest()
+        return failed
+
+    def ensure(self, names=None) -> dict:
+        """Makes sure the named characters (default: all) have a current portrait. Returns {name: portrait}.
+
+        Nothing is generated unless the image tool takes references; existing portraits are still returned.
+        """
+        names = [n for n in (names if names is not None else self.characters) if n in self.characters]
+        with self._lock:
+            missing = [n for n in names if self.portrait(n) is None]
+            if missing and self.generates_portraits:
+                for name, error in self._generate(missing).items():
+                    print(f"⚠️ Could not generate the portrait of {name}: {error}")
+        return {n: p for n in names if (p := self.portrait(n)) is not None}
+
+    # --- Matching ---
+    def _embed(self, texts: list) -> list:
+        if self.embedding_function is None or not texts:
+            return [None] * len(texts)
+        return [[float(x) for x in v] for v in self.embedding_function(texts)]
+
+    def characters_in(self, prompt: str) -> list:
+        """Characters a shot prompt refers to: by name, or else the single closest description by embedding."""
+        names = find_characters(prompt)
+        if names or self.embedding_function is None:
+            return names
+        known = self._known_descriptions()
+        if not known:
+            return []
+        vectors = np.asarray([v for _, v in known], dtype=np.float32)
+        query = np.asarray(self._embed([prompt])[0], dtype=np.float32)
+        similarities = vectors @ query / np.maximum(np.linalg.norm(vectors, axis=1) * np.linalg.norm(query), 1e-12)
+        best = int(np.argmax(similarities))
+        return [known[best][0]] if similarities[best] >= self.match_similarity else []
+
+    def _known_descriptions(self) -> list:
+        """(name, description embedding) for every character, embedded once whether or not it has a portrait."""
+        with self._lock:
+            if self._description_vectors is None:
+                names = list(self.characters)
+                vectors = self._embed([f"{name}: {self.characters[name]}" for name in names])
+                self._description_vectors = [(n, v) for n, v in zip(names, vectors) if v is not None]
+            return self._description_vectors
+
+    def condition(self, prompt: str):
+        """Returns (prompt, reference portrait path or None) for a shot.
+
+        The first character in the shot with a portrait is the reference. Where the image tool takes references
+        the prompt only names the characters, so every other character in the shot (a frame takes one reference,
+        and a portrait can be missing) gets its description appended. For any other tool the prompt is left as
+        the planner wrote it, descriptions included.
+        """
+        if not self.generates_portraits:
+            return prompt, None
+        names = [n for n in self.characters_in(prompt) if n in self.characters]
+        portraits = list(self.ensure(names).values())
+        reference = portraits[0] if portraits else None
+        described = [n for n in names if reference is None or n != reference.name]
+        if described:
+            prompt = f"{prompt}. Characters: {'; '.join(f'{n}: {self.characters[n].strip()}' for n in described)}"
+        return prompt, reference.path if reference else None
@@ -0,0 +1,144 @@
+# utils/checkpoints.py
+import hashlib
+import json
+import os
+import time
+
+from utils.asset_cache import write_atomic
+from utils.plan_executor import parse_production_plan
+
+
+class EpisodeCheckpointer:
+    """Persists each crew task's output (plus the assets it produced) to `<episode>/checkpoints/`.
+
+    A stage's input hash covers its own description and the outputs of its context tasks, so on resume a
+    stage is skipped only if nothing upstream changed and every asset it is responsible for still exists.
+    """
+
+    def __init__(self, episode_path: str, final_video_path: str, stage_assets: dict = None, repairers: dict = None):
+        self.episode_path = episode_path
+        self.final_video_path = final_video_path
+        # Stage name -> asset kinds it produces ('video', 'audio', 'episode').
+        self.stage_assets = stage_assets or {}
+        # Stage name -> callable(task_output) that regenerates missing assets from the saved output
+        # without re-running the stage's LLM call.
+        self.repairers = repairers or {}
+        self.checkpoint_dir = os.path.join(episode_path, "checkpoints")
+        self.manifest_path = os.path.join(episode_path, "asset_manifest.json")
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+    # --- Hashing & storage ---
+    @staticmethod
+    def _context_tasks(task) -> list:
+        return task.context if isinstance(task.context, list) else []
+
+    def input_hash(self, task) -> str:
+        h = hashlib.sha256()
+        h.update(task.description.encode("utf-8") + b"\0")
+        h.update((task.expected_output or "").encode("utf-8") + b"\0")
+        for upstream in self._context_tasks(task):
+            h.update(hashlib.sha256(upstream.output.raw.encode("utf-8")).digest())
+        return h.hexdigest()
+
+    def _checkpoint_path(self, task) -> str:
+        return os.path.join(self.checkpoint_dir, f"{task.name}.json")
+
+    def load(self, task):
+        path = self._checkpoint_path(task)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _plan_output(self, tasks):
+        for task in tasks:
+            if task.name == "production_plan" and task.output is not None:
+                return task.output.raw
+        return None
+
+    def asset_paths(self, task, tasks) -> list:
+        kinds = self.stage_assets.get(task.name, ())
+        paths = []
+        if "episode" in kinds:
+            paths.append(self.final_video_path)
+        if {"video", "audio"} & set(kinds):
+            plan_text = self._plan_output(tasks)
+            if plan_text is not None:
+                try:
+                    plan = parse_production_plan(plan_text)
+                except ValueError:
+                    plan = {"video_plan": [], "audio_plan": []}
+                if "video" in kinds:
+                    for clip in plan["video_plan"]:
+                        paths += [clip.get("image_path"), clip.get("video_path")]
+                if "audio" in kinds:
+                    paths += [item.get("output_path") for item in plan["audio_plan"]]
+        return [p for p in paths if p]
+
+    def save(self, task, tasks):
+        # Expected assets that failed to materialize are recorded as None so a resume regenerates them.
+        assets = {p: (os.path.getsize(p) if os.path.exists(p) else None) for p in self.asset_paths(task, tasks)}
+        record = {
+            "stage": task.name,
+            "input_hash": self.input_hash(task),
+            "output": task.output.raw,
+            "assets": assets,
+            "completed_at": time.time(),
+        }
+        write_atomic(self._checkpoint_path(task), json.dumps(record, indent=2).encode("utf-8"))
+
+        manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+        manifest.update({path: {"size": size, "stage": task.name} for path, size in assets.items() if size is not None})
+        write_atomic(self.manifest_path, json.dumps(manifest, indent=2).encode("utf-8"))
+        print(f"💾 Checkpoint saved for stage '{task.name}' ({sum(v is not None for v in assets.values())}/{len(assets)} assets).")
+
+    def missing_assets(self, task, tasks) -> list:
+        """Assets the stage is responsible for that don't exist on disk yet."""
+        return [p for p in self.asset_paths(task, tasks) if not os.path.exists(p)]
+
+    # --- Crew integration ---
+    def attach(self, tasks: list):
+        """Chains a checkpoint write after each task's existing callback."""
+        for task in tasks:
+            original = task.callback
+
+            def _callback(output, task=task, original=original):
+                result = original(output) if original else None
+                # crewai assigns task.output before running callbacks; set it anyway for older versions.
+                task.output = output
+                self.save(task, tasks)
+                return result
+
+            task.callback = _callback
+        return tasks
+
+    def pending(self, tasks: list) -> list:
+        """Restores completed stages whose inputs are unchanged and returns the tasks that still need to run."""
+        from crewai.tasks.task_output import TaskOutput
+
+        remaining = []
+        for task in tasks:
+            record = self.load(task)
+            upstream_ready = all(t.output is not None for t in self._context_tasks(task))
+            if record and upstream_ready and not remaining and record["input_hash"] == self.input_hash(task):
+                missing = [p for p, size in record["assets"].items()
+                           if size is None or not os.path.exists(p) or os.path.getsize(p) != size]
+                restored = TaskOutput(description=task.description, name=task.name,
+                                      expected_output=task.expected_output, raw=record["output"],
+                                      agent=task.agent.role if task.agent else "")
+                if not missing:
+                    task.output = restored
+                    print(f"⏭️ Resuming: stage '{task.name}' restored from checkpoint.")
+                    continue
+                if task.name in self.repairers:
+                    print(f"🔧 Stage '{task.name}' has {len(missing)} missing or changed assets; regenerating them.")
+                    task.output = restored
+                    self.repairers[task.name](restored)
+                    self.save(task, tasks)
+                    continue
+                print(f"🔁 Stage '{task.name}' has {len(missing)} missing or changed assets; re-running.")
+            remaining.append(task)
+        return remaining
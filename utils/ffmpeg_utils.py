@@ -0,0 +1,269 @@
+# utils/ffmpeg_utils.py
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from functools import lru_cache
+
+from config import FFMPEG_BINARY, FFPROBE_BINARY
+
+
+@lru_cache(maxsize=None)
+def ffmpeg_binary() -> str:
+    """Resolves the ffmpeg executable: $FFMPEG_BINARY, then PATH, then the copy bundled with moviepy's imageio-ffmpeg."""
+    if FFMPEG_BINARY:
+        return FFMPEG_BINARY
+    found = shutil.which("ffmpeg")
+    if found:
+        return found
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+@lru_cache(maxsize=None)
+def ffprobe_binary():
+    """Resolves ffprobe, or None when only ffmpeg is installed (probe() then parses `ffmpeg -i`)."""
+    return FFPROBE_BINARY or shutil.which("ffprobe")
+
+
+def run_ffmpeg(args: list, input_bytes: bytes = None):
+    """Runs ffmpeg with the given arguments, raising RuntimeError with the tail of stderr on failure."""
+    command = [ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y"] + [str(a) for a in args]
+    result = subprocess.run(command, input=input_bytes, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({result.returncode}): {result.stderr.decode(errors='replace')[-1500:]}")
+    return result
+
+
+def _parse_rate(rate: str) -> float:
+    if not rate or rate == "0/0":
+        return 0.0
+    if "/" in rate:
+        num, den = rate.split("/")
+        return float(num) / float(den) if float(den) else 0.0
+    return float(rate)
+
+
+def _probe_with_ffprobe(path: str) -> dict:
+    result = subprocess.run(
+        [ffprobe_binary(), "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+        capture_output=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed for {path}: {result.stderr.decode(errors='replace')[-500:]}")
+    data = json.loads(result.stdout)
+    info = {"duration": float(data.get("format", {}).get("duration", 0.0)), "video": None, "audio": None}
+    for stream in data.get("streams", []):
+        if stream.get("codec_type") == "video" and info["video"] is None:
+            info["video"] = {
+                "codec": stream.get("codec_name"),
+                "width": int(stream.get("width", 0)),
+                "height": int(stream.get("height", 0)),
+                "pix_fmt": stream.get("pix_fmt"),
+                "fps": round(_parse_rate(stream.get("avg_frame_rate") or stream.get("r_frame_rate")), 3),
+                "timescale": int(stream.get("time_base", "1/0").split("/")[1] or 0),
+            }
+        elif stream.get("codec_type") == "audio" and info["audio"] is None:
+            info["audio"] = {
+                "codec": stream.get("codec_name"),
+                "sample_rate": int(stream.get("sample_rate", 0)),
+                "channels": int(stream.get("channels", 0)),
+            }
+    return info
+
+
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_DECODED_TIME_RE = re.compile(r"time=(\d+):(\d+):(\d+(?:\.\d+)?)")
+_VIDEO_RE = re.compile(r"Stream #\S+.*?: Video: (\w+)[^,]*, (\w+)[^,]*, (\d+)x(\d+)")
+_FPS_RE = re.compile(r"([\d.]+) fps")
+_TBN_RE = re.compile(r"(\d+(?:\.\d+)?)(k?) tbn")
+_AUDIO_RE = re.compile(r"Stream #\S+.*?: Audio: (\w+)[^,]*, (\d+) Hz, ([^,]+)")
+
+
+def _probe_with_ffmpeg(path: str) -> dict:
+    # Without ffprobe, `ffmpeg -i` prints the same stream summary to stderr (and exits non-zero).
+    result = subprocess.run([ffmpeg_binary(), "-hide_banner", "-i", path], capture_output=True)
+    text = result.stderr.decode(errors="replace")
+    duration = _DURATION_RE.search(text)
+    if duration is None:
+        if "Duration: N/A" not in text:
+            raise RuntimeError(f"Could not probe {path}: {text[-500:]}")
+        # Streamed files (e.g. FLAC written from a pipe) carry no duration header; decode to measure it.
+        decoded = subprocess.run([ffmpeg_binary(), "-hide_banner", "-i", path, "-f", "null", "-"], capture_output=True)
+        times = _DECODED_TIME_RE.findall(decoded.stderr.decode(errors="replace"))
+        if not times:
+            raise RuntimeError(f"Could not probe {path}: {text[-500:]}")
+        duration = times[-1]
+    else:
+        duration = duration.groups()
+    h, m, s = duration
+    info = {"duration": int(h) * 3600 + int(m) * 60 + float(s), "video": None, "audio": None}
+    for line in text.splitlines():
+        video = _VIDEO_RE.search(line)
+        if video and info["video"] is None:
+            fps, tbn = _FPS_RE.search(line), _TBN_RE.search(line)
+            timescale = 0
+            if tbn:
+                timescale = int(float(tbn.group(1)) * (1000 if tbn.group(2) else 1))
+            info["video"] = {
+                "codec": video.group(1),
+                "width": int(video.group(3)),
+                "height": int(video.group(4)),
+                "pix_fmt": video.group(2),
+                "fps": round(float(fps.group(1)), 3) if fps else 0.0,
+                "timescale": timescale,
+            }
+        audio = _AUDIO_RE.search(line)
+        if audio and info["audio"] is None:
+            layout = audio.group(3).strip()
+            channels = {"mono": 1, "stereo": 2}.get(layout)
+            if channels is None:
+                match = re.match(r"(\d+)", layout)
+                channels = int(match.group(1)) if match else 2
+            info["audio"] = {"codec": audio.group(1), "sample_rate": int(audio.group(2)), "channels": channels}
+    return info
+
+
+def probe(path: str) -> dict:
+    """Returns {'duration', 'video': {codec, width, height, pix_fmt, fps, timescale}|None, 'audio': {codec, sample_rate, channels}|None}."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    if ffprobe_binary():
+        return _probe_with_ffprobe(path)
+    return _probe_with_ffmpeg(path)
+
+
+def channel_layout(channels: int) -> str:
+    return "mono" if channels == 1 else "stereo"
+
+
+def write_concat_list(paths: list, list_path: str, points: list = None):
+    """Writes an ffmpeg concat-demuxer list file for the given media paths, optionally with (in, out) points."""
+    with open(list_path, "w") as f:
+        for n, path in enumerate(paths):
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+            if points and points[n] is not None:
+                in_point, out_point = points[n]
+                f.write(f"inpoint {in_point:.3f}\noutpoint {out_point:.3f}\n")
+
+
+def decode_audio(path: str, sample_rate: int = 16000, channels: int = 1):
+    """Decodes any audio file to a float32 NumPy array of shape (samples,) or (samples, channels)."""
+    import numpy as np
+    result = run_ffmpeg(["-i", path, "-vn", "-f", "f32le", "-ac", channels, "-ar", sample_rate, "pipe:1"])
+    samples = np.frombuffer(result.stdout, dtype=np.float32)
+    return samples if channels == 1 else samples.reshape(-1, channels)
+
+
+def _partial_path(output_path: str) -> str:
+    """A fresh hidden file next to `output_path` to encode into, so a failed run never leaves a file there."""
+    directory, name = os.path.split(output_path)
+    os.makedirs(directory or ".", exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix=f".partial_{os.path.splitext(name)[0]}_", suffix=os.path.splitext(name)[1],
+                                dir=directory or ".")
+    os.close(fd)
+    return path
+
+
+def _encode_from_stdin(command: list, chunks, partial_path: str, output_path: str) -> int:
+    """Runs ffmpeg `command` (which writes `partial_path`), feeding it the byte-like `chunks` on stdin.
+
+    The result is moved to `output_path` only if every chunk was written and ffmpeg succeeded. If producing a
+    chunk raises, ffmpeg is killed (closing stdin would let it finish a truncated file) and the partial file is
+    removed before the error propagates. Returns the number of chunks written.
+    """
+    written = 0
+    # stderr goes to a file so a chatty ffmpeg can never block on a full pipe while data is written.
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=stderr)
+        try:
+            try:
+                for chunk in chunks:
+                    process.stdin.write(chunk)
+                    written += 1
+            except BrokenPipeError:
+                pass  # ffmpeg exited early; its error is reported below
+            except BaseException:
+                process.kill()
+                raise
+            finally:
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+                returncode = process.wait()
+            if returncode != 0:
+                stderr.seek(0)
+                raise RuntimeError(f"ffmpeg failed ({returncode}): {stderr.read().decode(errors='replace')[-1500:]}")
+            os.replace(partial_path, output_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+    return written
+
+
+def encode_raw_frames(frames, size: tuple, fps: float, output_path: str, audio_path: str = None,
+                      pix_fmt: str = "bgr24", x264_preset: str = "veryfast", crf: int = 20) -> int:
+    """Streams an iterable of uint8 frames (H x W x 3, `pix_fmt` order) into an H.264 mp4, muxing `audio_path`.
+
+    Frames are written to ffmpeg's stdin as they are produced, so memory use doesn't grow with clip length.
+    The file appears at `output_path` only once encoding succeeded; if `frames` raises part-way, nothing is
+    written there. Returns the number of frames written.
+    """
+    width, height = size
+    partial_path = _partial_path(output_path)
+    command = [ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y",
+               "-f", "rawvideo", "-pix_fmt", pix_fmt, "-s", f"{width}x{height}", "-r", str(fps), "-i", "pipe:0"]
+    if audio_path:
+        command += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0", "-c:a", "aac", "-b:a", "192k"]
+    command += ["-c:v", "libx264", "-preset", x264_preset, "-crf", str(crf),
+                "-pix_fmt", "yuv420p", "-movflags", "+faststart", "-f", "mp4", partial_path]
+    return _encode_from_stdin(command, (memoryview(frame).cast("B") for frame in frames), partial_path, output_path)
+
+
+def stream_audio(input_args: list, sample_rate: int, channels: int, block_samples: int):
+    """Decodes the input given by ffmpeg `input_args` and yields float32 blocks of shape (block_samples, channels).
+
+    Only one block is held at a time, so arbitrarily long (or endlessly looped) inputs stay bounded in memory.
+    The last block may be shorter. Closing the generator stops ffmpeg.
+    """
+    import numpy as np
+    command = ([ffmpeg_binary(), "-hide_banner", "-loglevel", "error"] + [str(a) for a in input_args] +
+               ["-vn", "-f", "f32le", "-ac", str(channels), "-ar", str(sample_rate), "pipe:1"])
+    block_bytes = block_samples * channels * 4
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) - len(data) % (channels * 4)], dtype=np.float32).reshape(-1, channels)
+    finally:
+        process.kill()
+        process.stdout.close()
+        process.wait()
+
+
+def encode_raw_audio(blocks, sample_rate: int, channels: int, output_path: str, codec_args: list = None) -> int:
+    """Streams float32 (samples, channels) blocks into an encoded audio file (AAC by default).
+
+    Like encode_raw_frames, the file only appears at `output_path` once encoding succeeded. Returns the samples written.
+    """
+    import numpy as np
+    partial_path = _partial_path(output_path)
+    codec_args = codec_args or ["-c:a", "aac", "-b:a", "192k"]
+    command = ([ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y",
+                "-f", "f32le", "-ar", str(sample_rate), "-ac", str(channels), "-i", "pipe:0"] +
+               [str(a) for a in codec_args] + [partial_path])
+    samples = [0]
+
+    def chunks():
+        for block in blocks:
+            samples[0] += len(block)
+            yield memoryview(np.ascontiguousarray(block, dtype="<f4")).cast("B")
+
+    _encode_from_stdin(command, chunks(), partial_path, output_path)
+    return samples[0]
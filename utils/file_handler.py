@@ -1,10 +1,19 @@
 # utils/file_handler.py
+import glob
 import os
 from datetime import datetime
 
-def setup_episode_directory(episode_id: int):
-    """Creates a directory for the current episode's assets."""
+def setup_episode_directory(episode_id: int, reuse_existing: bool = False):
+    """Creates a directory for the current episode's assets.
+
+    With `reuse_existing`, the most recent directory already created for this episode is returned instead,
+    so a resumed run finds the checkpoints of an earlier (possibly previous-day) attempt.
+    """
+    if reuse_existing:
+        existing = sorted(glob.glob(f"episodes/episode_{episode_id}_*"), key=os.path.getmtime)
+        if existing:
+            return existing[-1]
     today = datetime.now().strftime("%Y-%m-%d")
     path = f"episodes/episode_{episode_id}_{today}"
     os.makedirs(path, exist_ok=True)
-    return path
\ No newline at end of file
+    return path
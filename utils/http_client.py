@@ -0,0 +1,183 @@
+# utils/http_client.py
+import asyncio
+import os
+import random
+import threading
+
+import httpx
+
+from core import tracing
+from config import (HF_INFERENCE_URL, HTTP_TIMEOUT_SECONDS, HTTP_CONNECT_TIMEOUT_SECONDS,
+                    HTTP_MAX_CONNECTIONS, HTTP_MAX_RETRIES, HTTP_BACKOFF_BASE_SECONDS,
+                    HTTP_MAX_BACKOFF_SECONDS, HF_MAX_LOADING_WAIT_SECONDS)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class InferenceError(Exception):
+    """Raised when a remote model call fails permanently or runs out of retries."""
+
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class InferenceClient:
+    """Shared async HTTP client for remote model endpoints (Hugging Face Inference API by default).
+
+    One keep-alive `httpx.AsyncClient` lives on a background event loop, so synchronous tools running on
+    many threads all share a single connection pool, and async callers can fan out with `asyncio.gather`.
+    Transient failures are retried with exponential backoff and jitter; a 503 "model is loading" answer
+    waits for the `estimated_time` the server reports instead of counting as a hard failure.
+    """
+
+    def __init__(self, base_url: str = HF_INFERENCE_URL, token: str = None,
+                 timeout: float = HTTP_TIMEOUT_SECONDS, connect_timeout: float = HTTP_CONNECT_TIMEOUT_SECONDS,
+                 max_connections: int = HTTP_MAX_CONNECTIONS, max_retries: int = HTTP_MAX_RETRIES,
+                 backoff_base: float = HTTP_BACKOFF_BASE_SECONDS, max_backoff: float = HTTP_MAX_BACKOFF_SECONDS,
+                 max_loading_wait: float = HF_MAX_LOADING_WAIT_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self.token = token if token is not None else os.getenv("HUGGING_FACE_API_TOKEN")
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.max_loading_wait = max_loading_wait
+        self._loop = None
+        self._client = None
+        self._start_lock = threading.Lock()
+
+    # --- Event loop management ---
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _serve():
+                asyncio.set_event_loop(loop)
+                self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, headers=self._headers())
+                ready.set()
+                loop.run_forever()
+
+            threading.Thread(target=_serve, name="inference-client", daemon=True).start()
+            ready.wait()
+            self._loop = loop
+
+    def _headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+    def close(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop, self._client = None, None
+
+    # --- Requests ---
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    @staticmethod
+    def _loading_wait(response: httpx.Response):
+        """Returns the server's estimated warm-up time for a 503 "model is loading" response, else None."""
+        if response.status_code != 503:
+            return None
+        try:
+            body = response.json()
+        except ValueError:
+            return None
+        if isinstance(body, dict) and "loading" in str(body.get("error", "")).lower():
+            return float(body.get("estimated_time") or 20.0)
+        return None
+
+    async def apost(self, model_id: str, json: dict = None, content: bytes = None, headers: dict = None,
+                    stats: dict = None) -> bytes:
+        """POSTs to `<base_url>/<model_id>` and returns the raw response body, retrying transient failures.
+
+        If given, `stats` is filled with the number of `retries` and the seconds spent in `loading_wait`.
+        """
+        stats = stats if stats is not None else {}
+        stats.setdefault("retries", 0)
+        stats.setdefault("loading_wait", 0.0)
+        if self._client is None:
+            raise RuntimeError("InferenceClient.apost must run on the client's loop; use post() from other threads.")
+        url = f"{self.base_url}/{model_id}"
+        attempt, waited_for_loading = 0, 0.0
+        while True:
+            try:
+                response = await self._client.post(url, json=json, content=content, headers=headers)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise InferenceError(f"{model_id}: connection failed after {attempt + 1} attempts: {e}")
+                delay = self._backoff(attempt)
+                attempt += 1
+                stats["retries"] += 1
+                print(f"🔁 {model_id}: {type(e).__name__}, retrying in {delay:.1f}s ({attempt}/{self.max_retries})")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code < 400:
+                return response.content
+
+            loading_wait = self._loading_wait(response)
+            if loading_wait is not None and waited_for_loading < self.max_loading_wait:
+                # Cold starts are expected, so they get their own time budget instead of consuming retries.
+                delay = min(max(loading_wait, 1.0), self.max_loading_wait - waited_for_loading)
+                waited_for_loading += delay
+                stats["loading_wait"] += delay
+                print(f"⏳ {model_id} is loading, waiting {delay:.0f}s...")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                retry_after = response.headers.get("Retry-After")
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else self._backoff(attempt)
+                attempt += 1
+                stats["retries"] += 1
+                print(f"🔁 {model_id}: HTTP {response.status_code}, retrying in {delay:.1f}s ({attempt}/{self.max_retries})")
+                await asyncio.sleep(delay)
+                continue
+
+            raise InferenceError(f"{model_id}: HTTP {response.status_code}: {response.text[:500]}", response.status_code)
+
+    def post(self, model_id: str, json: dict = None, content: bytes = None, headers: dict = None) -> bytes:
+        """Blocking wrapper around `apost`, safe to call from any number of worker threads."""
+        self._ensure_loop()
+        # The request runs on the client's loop thread, so its retry counts are reported back to this thread's span.
+        stats = {}
+        with tracing.span(model_id, "http", provider="huggingface") as span_args:
+            span_args["bytes_in"] = len(content) if content is not None else len(str(json or "").encode("utf-8"))
+            try:
+                future = asyncio.run_coroutine_threadsafe(
+                    self.apost(model_id, json=json, content=content, headers=headers, stats=stats), self._loop)
+                body = future.result()
+            finally:
+                span_args.update(stats)
+            span_args["bytes_out"] = len(body)
+        return body
+
+    def post_many(self, requests: list) -> list:
+        """Runs many `(model_id, kwargs)` requests concurrently; returns bodies or exceptions in input order."""
+        self._ensure_loop()
+
+        async def _gather():
+            return await asyncio.gather(*(self.apost(model_id, **kwargs) for model_id, kwargs in requests),
+                                        return_exceptions=True)
+
+        return asyncio.run_coroutine_threadsafe(_gather(), self._loop).result()
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+def get_inference_client() -> InferenceClient:
+    """Returns the process-wide Hugging Face inference client."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = InferenceClient()
+        return _shared_client
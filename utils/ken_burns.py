@@ -0,0 +1,102 @@
+# utils/ken_burns.py
+# Ken Burns (slow zoom/pan) renderer.
+#
+# The whole camera trajectory is computed up front as one affine matrix per frame, each frame is a single
+# cv2.warpAffine of the still image, and the raw frames are piped straight into ffmpeg, which muxes the
+# dialogue audio in the same pass. No intermediate files and no per-frame Python image resampling.
+import os
+import time
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from config import KEN_BURNS_FPS, KEN_BURNS_X264_PRESET, KEN_BURNS_CRF
+from utils.ffmpeg_utils import encode_raw_frames
+
+
+class CameraMove(NamedTuple):
+    """Zoom (1.0 = image just covers the frame) and view center (fractions of the image) at start and end."""
+    zoom_start: float
+    zoom_end: float
+    center_start: tuple
+    center_end: tuple
+    ease: bool = False
+
+
+PRESETS = {
+    "zoom_in": CameraMove(1.0, 1.05, (0.5, 0.5), (0.5, 0.5)),
+    "zoom_out": CameraMove(1.05, 1.0, (0.5, 0.5), (0.5, 0.5)),
+    "slow_push": CameraMove(1.0, 1.15, (0.5, 0.5), (0.5, 0.45), ease=True),
+    "pan_left": CameraMove(1.12, 1.12, (0.56, 0.5), (0.44, 0.5), ease=True),
+    "pan_right": CameraMove(1.12, 1.12, (0.44, 0.5), (0.56, 0.5), ease=True),
+    "pan_up": CameraMove(1.12, 1.12, (0.5, 0.56), (0.5, 0.44), ease=True),
+    "pan_down": CameraMove(1.12, 1.12, (0.5, 0.44), (0.5, 0.56), ease=True),
+}
+
+
+def trajectory_matrices(src_size: tuple, out_size: tuple, frame_count: int, move: CameraMove) -> np.ndarray:
+    """Returns a (frame_count, 2, 3) array of affine matrices mapping source pixels to output pixels."""
+    src_w, src_h = src_size
+    out_w, out_h = out_size
+    t = np.linspace(0.0, 1.0, frame_count) if frame_count > 1 else np.zeros(1)
+    if move.ease:
+        t = t * t * (3.0 - 2.0 * t)
+
+    scale = max(out_w / src_w, out_h / src_h) * (move.zoom_start + (move.zoom_end - move.zoom_start) * t)
+    cx = (move.center_start[0] + (move.center_end[0] - move.center_start[0]) * t) * src_w
+    cy = (move.center_start[1] + (move.center_end[1] - move.center_start[1]) * t) * src_h
+    # Keep the visible window inside the image so no border ever shows.
+    half_w, half_h = out_w / (2 * scale), out_h / (2 * scale)
+    cx = np.clip(cx, half_w, src_w - half_w)
+    cy = np.clip(cy, half_h, src_h - half_h)
+
+    matrices = np.zeros((len(t), 2, 3), dtype=np.float64)
+    matrices[:, 0, 0] = scale
+    matrices[:, 1, 1] = scale
+    # Pixel-center convention: (dst + 0.5) = scale * (src + 0.5 - c) + out / 2.
+    matrices[:, 0, 2] = out_w / 2 - scale * cx + 0.5 * scale - 0.5
+    matrices[:, 1, 2] = out_h / 2 - scale * cy + 0.5 * scale - 0.5
+    return matrices
+
+
+def render_ken_burns(image_path: str, output_path: str, duration: float, audio_path: str = None,
+                     preset: str = "zoom_in", fps: int = KEN_BURNS_FPS, size: tuple = None) -> dict:
+    """Renders `image_path` with the named camera move into an H.264/AAC mp4 and returns render stats.
+
+    `size` is the output (width, height); by default the image's own size (rounded down to even numbers).
+    """
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown Ken Burns preset '{preset}'. Available: {sorted(PRESETS)}")
+    move = PRESETS[preset]
+    image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Could not read image: {image_path}")
+
+    src_h, src_w = image.shape[:2]
+    out_w, out_h = size or (src_w, src_h)
+    out_w, out_h = out_w & ~1, out_h & ~1  # yuv420p needs even dimensions
+    # Downscale a large source once (with area filtering) to the most it is ever magnified, so every
+    # per-frame warp is a cheap bilinear resample close to 1:1 instead of a heavily aliased shrink.
+    peak = max(out_w / src_w, out_h / src_h) * max(move.zoom_start, move.zoom_end)
+    if peak < 1.0:
+        image = cv2.resize(image, None, fx=peak, fy=peak, interpolation=cv2.INTER_AREA)
+        src_h, src_w = image.shape[:2]
+
+    frame_count = max(1, round(duration * fps))
+    matrices = trajectory_matrices((src_w, src_h), (out_w, out_h), frame_count, move)
+
+    has_audio = bool(audio_path) and os.path.exists(audio_path)
+
+    def frames():
+        frame = np.empty((out_h, out_w, 3), dtype=np.uint8)
+        for matrix in matrices:
+            cv2.warpAffine(image, matrix, (out_w, out_h), dst=frame, flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+            yield frame
+
+    started = time.perf_counter()
+    encode_raw_frames(frames(), (out_w, out_h), fps, output_path, audio_path=audio_path if has_audio else None,
+                      x264_preset=KEN_BURNS_X264_PRESET, crf=KEN_BURNS_CRF)
+    elapsed = time.perf_counter() - started
+    return {"frames": frame_count, "seconds": elapsed,
+            "realtime_factor": (frame_count / fps) / elapsed if elapsed else float("inf")}
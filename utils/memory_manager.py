@@ -1,31 +1,283 @@
 # utils/memory_manager.py
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+
 import chromadb
+import numpy as np
 from chromadb.utils import embedding_functions
+from chromadb.api.types import EmbeddingFunction
+
+from config import (CHARACTERS, MEMORY_PERSIST_DIR, MEMORY_BATCH_SIZE, MEMORY_ARC_LENGTH,
+                    MEMORY_SEASON_LENGTH, MEMORY_TOKEN_BUDGET, MEMORY_ROLLUP_MAX_CHARS)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for prompt budgeting."""
+    return len(text) // 4 + 1
+
+
+def character_key(name: str) -> str:
+    return "char_" + re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def find_characters(text: str) -> list:
+    """Returns the `config.CHARACTERS` entries mentioned in `text`. Group entries such as
+    "Henry and Ernest" match on any of their member names."""
+    found = []
+    for name in CHARACTERS:
+        aliases = [name] + [part.strip() for part in name.split(" and ") if part.strip()]
+        if any(re.search(rf"\b{re.escape(alias)}\b", text, re.IGNORECASE) for alias in aliases):
+            found.append(name)
+    return found
+
+
+def extractive_rollup(entries: list, max_chars: int = MEMORY_ROLLUP_MAX_CHARS) -> str:
+    """Default summarizer for arc/season rollups: the leading sentence of each child summary,
+    labelled and trimmed to `max_chars`. Entries are (label, text) pairs in story order."""
+    if not entries:
+        return ""
+    per_entry = max(80, max_chars // len(entries))
+    lines = []
+    for label, text in entries:
+        first = re.split(r"(?<=[.!?])\s+", text.strip(), maxsplit=1)[0]
+        if len(first) > per_entry:
+            first = first[:per_entry - 3].rstrip() + "..."
+        lines.append(f"{label}: {first}")
+    return "\n".join(lines)[:max_chars]
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """Wraps a Chroma embedding function with a content-hash cache so identical texts are embedded once.
+
+    With a `cache_path` the cache is an SQLite file and survives restarts; otherwise it is in-memory.
+    """
+
+    def __init__(self, inner, cache_path: str = None, namespace: str = "default"):
+        self.inner = inner
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._memory = {}
+        self._db = None
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._db.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: list) -> dict:
+        if self._db is None:
+            return {k: self._memory[k] for k in keys if k in self._memory}
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            found.update({k: np.frombuffer(v, dtype=np.float32).tolist() for k, v in rows})
+        return found
+
+    def _save(self, entries: dict):
+        if self._db is None:
+            self._memory.update(entries)
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            [(k, np.asarray(v, dtype=np.float32).tobytes()) for k, v in entries.items()]
+        )
+        self._db.commit()
+
+    def __call__(self, input):
+        keys = [self._key(text) for text in input]
+        with self._lock:
+            cached = self._lookup(list(set(keys)))
+            missing = {k: text for k, text in zip(keys, input) if k not in cached}
+            if missing:
+                vectors = self.inner(list(missing.values()))
+                fresh = {k: [float(x) for x in v] for k, v in zip(missing.keys(), vectors)}
+                self._save(fresh)
+                cached.update(fresh)
+        return [cached[k] for k in keys]
+
 
 class MemoryManager:
-    def __init__(self, collection_name="anime_series_memory"):
-        self.client = chromadb.Client()
-        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+    """Series memory with three levels: episode summaries, arc rollups (every MEMORY_ARC_LENGTH episodes)
+    and season rollups (every MEMORY_SEASON_LENGTH episodes). Rollups are refreshed whenever an episode is
+    written, and retrieval assembles context from the right level under a token budget."""
+
+    def __init__(self, collection_name="anime_series_memory", persist_dir: str = MEMORY_PERSIST_DIR,
+                 summarizer=extractive_rollup, embedding_function=None):
+        # With a persist_dir the series memory lives on disk and survives restarts; None keeps it in-memory.
+        if persist_dir:
+            self.client = chromadb.PersistentClient(path=persist_dir)
+            cache_path = os.path.join(persist_dir, "embedding_cache.sqlite")
+        else:
+            self.client = chromadb.Client()
+            cache_path = None
+        # Defaults to Chroma's bundled all-MiniLM-L6-v2; any callable list[str] -> list[vector] works.
+        inner = embedding_function or embedding_functions.DefaultEmbeddingFunction()
+        namespace = "all-MiniLM-L6-v2" if embedding_function is None else type(embedding_function).__name__
+        self.embedding_function = CachedEmbeddingFunction(inner, cache_path=cache_path, namespace=namespace)
         self.collection = self.client.get_or_create_collection(
             name=collection_name,
             embedding_function=self.embedding_function
         )
+        # Any callable (label/text pairs, max_chars) -> str, e.g. an LLM-backed summarizer.
+        self.summarizer = summarizer
+
+    # --- Levels ---
+    @staticmethod
+    def arc_of(episode_id: int) -> int:
+        return (episode_id - 1) // MEMORY_ARC_LENGTH + 1
+
+    @staticmethod
+    def season_of(episode_id: int) -> int:
+        return (episode_id - 1) // MEMORY_SEASON_LENGTH + 1
+
+    def _episode_metadata(self, episode_id: int, summary: str) -> dict:
+        metadata = {"episode": episode_id, "level": "episode",
+                    "arc": self.arc_of(episode_id), "season": self.season_of(episode_id)}
+        for name in find_characters(summary):
+            metadata[character_key(name)] = True
+        return metadata
+
+    @staticmethod
+    def _where(**conditions) -> dict:
+        clauses = [{k: v} for k, v in conditions.items()]
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def _get_level(self, **conditions) -> list:
+        """Returns (metadata, document) pairs matching the conditions, in story order."""
+        found = self.collection.get(where=self._where(**conditions), include=["documents", "metadatas"])
+        pairs = list(zip(found["metadatas"], found["documents"]))
+        return sorted(pairs, key=lambda p: (p[0].get("episode") or p[0].get("arc") or p[0].get("season") or 0))
+
+    def _refresh_rollups(self, episode_ids: list):
+        """Rebuilds the arc and season summaries touched by the given episodes."""
+        arcs = sorted({self.arc_of(e) for e in episode_ids})
+        for arc in arcs:
+            episodes = self._get_level(level="episode", arc=arc)
+            text = self.summarizer([(f"Episode {m['episode']}", doc) for m, doc in episodes], MEMORY_ROLLUP_MAX_CHARS)
+            metadata = {"level": "arc", "arc": arc, "season": self.season_of(episodes[0][0]["episode"])}
+            for m, _ in episodes:
+                metadata.update({k: True for k in m if k.startswith("char_")})
+            self.collection.upsert(documents=[text], metadatas=[metadata], ids=[f"arc_{arc}"])
+
+        for season in sorted({self.season_of(e) for e in episode_ids}):
+            arc_docs = self._get_level(level="arc", season=season)
+            text = self.summarizer([(f"Arc {m['arc']}", doc) for m, doc in arc_docs], MEMORY_ROLLUP_MAX_CHARS)
+            self.collection.upsert(documents=[text], metadatas=[{"level": "season", "season": season}],
+                                   ids=[f"season_{season}"])
+
+    def latest_episode(self) -> int:
+        found = self.collection.get(where={"level": "episode"}, include=["metadatas"])
+        return max((m["episode"] for m in found["metadatas"]), default=0)
 
     def add_episode_summary(self, episode_id: int, summary: str):
-        self.collection.add(
-            documents=[summary],
-            metadatas=[{"episode": episode_id}],
-            ids=[f"ep_{episode_id}"]
-        )
+        self.add_episode_summaries([(episode_id, summary)])
         print(f"Memory: Added summary for Episode {episode_id}.")
 
-    def get_relevant_context(self, query: str, n_results: int = 3) -> str:
+    def add_episode_summaries(self, episodes, batch_size: int = MEMORY_BATCH_SIZE) -> int:
+        """Upserts (episode_id, summary) pairs in batches. Rewriting an episode id replaces it; unchanged
+        summaries are skipped entirely. Returns the number of summaries written."""
+        latest = {}
+        for episode_id, summary in episodes:
+            latest[f"ep_{int(episode_id)}"] = (int(episode_id), summary)
+        if not latest:
+            return 0
+
+        ids = list(latest)
+        existing = {}
+        for start in range(0, len(ids), batch_size):
+            found = self.collection.get(ids=ids[start:start + batch_size], include=["documents"])
+            existing.update(zip(found["ids"], found["documents"]))
+        changed = [i for i in ids if existing.get(i) != latest[i][1]]
+
+        for start in range(0, len(changed), batch_size):
+            batch = changed[start:start + batch_size]
+            self.collection.upsert(
+                documents=[latest[i][1] for i in batch],
+                metadatas=[self._episode_metadata(*latest[i]) for i in batch],
+                ids=batch
+            )
+        if changed:
+            self._refresh_rollups([latest[i][0] for i in changed])
+        return len(changed)
+
+    def import_episodes(self, source) -> int:
+        """Bulk-imports past episodes from a JSON file ({id: summary} or a list of {"episode", "summary"}),
+        a JSONL file of such objects, a dict, or an iterable of (episode_id, summary) pairs."""
+        if isinstance(source, str):
+            with open(source, "r") as f:
+                if source.endswith(".jsonl"):
+                    source = [json.loads(line) for line in f if line.strip()]
+                else:
+                    source = json.load(f)
+        if isinstance(source, dict):
+            pairs = source.items()
+        else:
+            pairs = [(item["episode"], item["summary"]) if isinstance(item, dict) else item for item in source]
+        written = self.add_episode_summaries(pairs)
+        print(f"Memory: Imported {written} episode summaries.")
+        return written
+
+    def get_character_context(self, character: str, n_results: int = 5) -> list:
+        """Returns the most recent (episode_id, summary) pairs in which a `config.CHARACTERS` entry appears."""
+        episodes = self._get_level(level="episode", **{character_key(character): True})
+        return [(m["episode"], doc) for m, doc in episodes[-n_results:]]
+
+    def get_relevant_context(self, query: str, n_results: int = 3, token_budget: int = MEMORY_TOKEN_BUDGET) -> str:
         if self.collection.count() == 0:
             return "This is the first episode. There is no prior context."
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=min(n_results, self.collection.count())
-        )
-        context = "\n".join(results['documents'][0])
-        print(f"Memory: Retrieved context - {context}")
-        return context
\ No newline at end of file
+        latest = self.latest_episode()
+        if latest == 0:
+            return "This is the first episode. There is no prior context."
+        current_arc, current_season = self.arc_of(latest), self.season_of(latest)
+
+        # Candidates in priority order: the current arc verbatim (newest first), older episodes relevant to the
+        # query (restricted to any characters it names), finished arcs of this season, then finished seasons.
+        recent = [(f"Episode {m['episode']}", doc, m["episode"]) for m, doc in
+                  reversed(self._get_level(level="episode", arc=current_arc))]
+
+        relevant = []
+        older_count = latest - len(recent)
+        if older_count > 0 and n_results > 0:
+            conditions = [{"level": "episode"}, {"arc": {"$lt": current_arc}}]
+            characters = find_characters(query)
+            if len(characters) == 1:
+                conditions.append({character_key(characters[0]): True})
+            elif characters:
+                conditions.append({"$or": [{character_key(c): True} for c in characters]})
+            try:
+                results = self.collection.query(query_texts=[query], n_results=min(n_results, older_count),
+                                                where={"$and": conditions})
+                relevant = [(f"Episode {m['episode']}", doc, m["episode"])
+                            for m, doc in zip(results["metadatas"][0], results["documents"][0])]
+            except Exception as e:
+                print(f"Memory: Relevance search skipped - {e}")
+
+        arcs = [(f"Arc {m['arc']} summary", doc, (m["arc"] - 1) * MEMORY_ARC_LENGTH + 1) for m, doc in
+                reversed(self._get_level(level="arc", season=current_season)) if m["arc"] < current_arc]
+        seasons = [(f"Season {m['season']} summary", doc, (m["season"] - 1) * MEMORY_SEASON_LENGTH + 1) for m, doc in
+                   reversed(self._get_level(level="season")) if m["season"] < current_season]
+
+        selected, used, seen = [], 0, set()
+        for label, doc, order in recent + relevant + arcs + seasons:
+            cost = estimate_tokens(label) + estimate_tokens(doc)
+            if label in seen or used + cost > token_budget:
+                continue
+            selected.append((order, label, doc))
+            seen.add(label)
+            used += cost
+
+        # Present the selection chronologically; rollups sort before the episodes they cover.
+        selected.sort(key=lambda s: (s[0], not s[1].endswith("summary")))
+        context = "\n".join(f"{label}: {doc}" for _, label, doc in selected)
+        print(f"Memory: Retrieved {len(selected)} entries (~{used} tokens) - {context}")
+        return context
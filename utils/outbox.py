@@ -0,0 +1,194 @@
+# utils/outbox.py
+# Durable queue of compiled episodes waiting to be distributed.
+#
+# Uploading is not a crew task anymore. Once an episode is compiled, it is enqueued here with its upload
+# metadata, and production moves on to the next episode. An UploadWorker (core/distribution.py) drains the
+# outbox on its own threads with its own retry policy, so rendering never waits on upstream bandwidth.
+#
+# The outbox is a SQLite file, so queued uploads survive crashes and restarts. A claimed entry carries a
+# lease and its owner (host:pid). If the owning process dies, the entry is released by the next worker on
+# the same host, or by any worker once the lease runs out.
+import json
+import os
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import NamedTuple
+
+PENDING, UPLOADING, DONE, FAILED = "pending", "uploading", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    episode_id      INTEGER PRIMARY KEY,
+    video_path      TEXT NOT NULL,
+    title           TEXT NOT NULL,
+    description     TEXT NOT NULL,
+    metadata        TEXT NOT NULL DEFAULT '{}',
+    status          TEXT NOT NULL DEFAULT 'pending',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    owner           TEXT,
+    lease_until     REAL,
+    video_id        TEXT,
+    last_error      TEXT,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL
+)
+"""
+
+
+class OutboxEntry(NamedTuple):
+    episode_id: int
+    video_path: str
+    title: str
+    description: str
+    metadata: dict
+    status: str
+    attempts: int
+    video_id: str = None
+    last_error: str = None
+
+
+def process_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_alive(owner: str) -> bool:
+    """False only when `owner` is a process on this host that no longer exists."""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class DistributionOutbox:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation, so the outbox can be shared by threads and processes.
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            # IMMEDIATE takes the write lock up front, so two workers can never claim the same entry.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    @staticmethod
+    def _entry(row) -> OutboxEntry:
+        return OutboxEntry(row["episode_id"], row["video_path"], row["title"], row["description"],
+                           json.loads(row["metadata"]), row["status"], row["attempts"], row["video_id"],
+                           row["last_error"])
+
+    # --- Producer side ---
+    def enqueue(self, episode_id: int, video_path: str, title: str, description: str, metadata: dict = None) -> bool:
+        """Queues an episode for upload. Re-enqueuing an episode that is not uploaded yet refreshes its metadata
+        and retries it from scratch; an episode that is already uploaded is left alone. Returns True if queued."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT status FROM outbox WHERE episode_id = ?", (episode_id,)).fetchone()
+            if row is not None and row["status"] == DONE:
+                return False
+            if row is not None and row["status"] == UPLOADING:
+                # Its upload is in flight; the new metadata must not change what that worker completes.
+                return True
+            conn.execute(
+                "INSERT INTO outbox (episode_id, video_path, title, description, metadata, status, attempts,"
+                " next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 0, 0, ?, ?)"
+                " ON CONFLICT(episode_id) DO UPDATE SET video_path = excluded.video_path, title = excluded.title,"
+                " description = excluded.description, metadata = excluded.metadata, status = excluded.status,"
+                " attempts = 0, next_attempt_at = 0, last_error = NULL, updated_at = excluded.updated_at",
+                (episode_id, video_path, title, description, json.dumps(metadata or {}), PENDING, now, now))
+        return True
+
+    # --- Consumer side ---
+    def claim(self, lease_seconds: float, owner: str = None):
+        """Takes the oldest entry that is due for an upload attempt, or None. The entry is leased to `owner`
+        until it is completed or failed, or the lease expires."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM outbox WHERE (status = ? AND next_attempt_at <= ?) OR (status = ? AND lease_until < ?)"
+                " ORDER BY episode_id LIMIT 1", (PENDING, now, UPLOADING, now)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE outbox SET status = ?, owner = ?, lease_until = ?, updated_at = ? WHERE episode_id = ?",
+                         (UPLOADING, owner or process_owner(), now + lease_seconds, now, row["episode_id"]))
+        return self._entry(row)._replace(status=UPLOADING)
+
+    def renew(self, episode_id: int, owner: str, lease_seconds: float) -> bool:
+        """Extends `owner`'s lease on an entry it is uploading. Returns False if the entry is no longer its own
+        (the lease ran out and another worker claimed it, or it was completed or failed)."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute("UPDATE outbox SET lease_until = ?, updated_at = ? WHERE episode_id = ? AND status = ?"
+                                  " AND owner = ?", (now + lease_seconds, now, episode_id, UPLOADING, owner))
+        return cursor.rowcount > 0
+
+    def complete(self, episode_id: int, video_id: str = None):
+        with self._transaction() as conn:
+            conn.execute("UPDATE outbox SET status = ?, video_id = ?, owner = NULL, lease_until = NULL, last_error = NULL,"
+                         " updated_at = ? WHERE episode_id = ?", (DONE, video_id, time.time(), episode_id))
+
+    def fail(self, episode_id: int, error: str, retry_in: float = None):
+        """Records a failed attempt. With `retry_in` the entry is due again after that many seconds, otherwise
+        it is parked as failed until it is enqueued again."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("UPDATE outbox SET status = ?, attempts = attempts + 1, next_attempt_at = ?, last_error = ?,"
+                         " owner = NULL, lease_until = NULL, updated_at = ? WHERE episode_id = ?",
+                         (PENDING if retry_in is not None else FAILED, now + (retry_in or 0), error[:2000], now,
+                          episode_id))
+
+    def release_orphans(self) -> int:
+        """Returns entries claimed by dead processes on this host to the queue, without waiting for their lease."""
+        with self._transaction() as conn:
+            orphans = [row["episode_id"] for row in conn.execute(
+                "SELECT episode_id, owner FROM outbox WHERE status = ?", (UPLOADING,)) if not _owner_alive(row["owner"])]
+            for episode_id in orphans:
+                conn.execute("UPDATE outbox SET status = ?, owner = NULL, lease_until = NULL, updated_at = ?"
+                             " WHERE episode_id = ?", (PENDING, time.time(), episode_id))
+        return len(orphans)
+
+    # --- Inspection ---
+    def counts(self) -> dict:
+        with self._connect() as conn:
+            return {row["status"]: row["n"] for row in
+                    conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status")}
+
+    def entries(self, status: str = None) -> list:
+        with self._connect() as conn:
+            if status is None:
+                rows = conn.execute("SELECT * FROM outbox ORDER BY episode_id").fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM outbox WHERE status = ? ORDER BY episode_id", (status,)).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def outstanding(self) -> int:
+        """Entries not yet uploaded that will still be attempted (pending or in flight)."""
+        counts = self.counts()
+        return counts.get(PENDING, 0) + counts.get(UPLOADING, 0)
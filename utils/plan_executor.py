@@ -0,0 +1,214 @@
+# utils/plan_executor.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import PLAN_EXECUTOR_MAX_WORKERS, PROVIDER_CONCURRENCY
+from core.tracing import in_context
+from utils.production_plan import load_production_plan
+from utils.shot_index import reuse_shot
+
+# Which remote provider each asset kind is billed against. Used to apply per-provider concurrency limits.
+PROVIDER_FOR_KIND = {
+    "image": "huggingface",
+    "video": "huggingface",
+    "music": "huggingface",
+    "dialogue": "google_tts",
+    "sfx": "elevenlabs",
+}
+
+
+def parse_production_plan(plan) -> dict:
+    """Validates a production plan (LLM answer, dict or ProductionPlan) and returns it as a plain dict."""
+    return load_production_plan(plan).model_dump()
+
+
+def _is_error(result) -> bool:
+    return not isinstance(result, str) or result.startswith("Error")
+
+
+class PlanExecutor:
+    """Runs a production plan's video_plan and audio_plan directly against the generation tools.
+
+    Every image->video chain and every audio item is one unit of work on a bounded thread pool, so audio
+    runs concurrently with video. Calls to the same provider are additionally capped by a semaphore.
+    Results are always reported in plan order, independent of completion order.
+    """
+
+    def __init__(self, tools: dict, max_workers: int = PLAN_EXECUTOR_MAX_WORKERS, provider_limits: dict = None,
+                 shot_index=None, character_store=None):
+        self.tools = tools
+        self.max_workers = max_workers
+        limits = provider_limits or PROVIDER_CONCURRENCY
+        self._provider_slots = {provider: threading.Semaphore(limit) for provider, limit in limits.items()}
+        # Optional utils.shot_index.ShotIndex: near-duplicate clips reuse an existing shot instead of generating.
+        self.shot_index = shot_index
+        # Optional utils.character_store.CharacterStore: frames are conditioned on the characters' portraits.
+        self.character_store = character_store
+
+    def _call(self, kind: str, **kwargs) -> str:
+        tool = self.tools.get(kind)
+        if tool is None:
+            return f"Error: No tool registered for '{kind}' assets."
+        slot = self._provider_slots.get(PROVIDER_FOR_KIND.get(kind))
+        if slot is None:
+            return tool.run(**kwargs)
+        with slot:
+            return tool.run(**kwargs)
+
+    def _run_video_chain(self, clip: dict, image_result: str = None) -> dict:
+        result = {"id": clip.get("clip_id"), "path": clip.get("video_path"), "ok": False}
+        try:
+            if image_result is None:
+                image_result = self._call("image", prompt=clip["image_prompt"], output_path=clip["image_path"])
+            if _is_error(image_result):
+                result["message"] = image_result
+                return result
+            video_result = self._call("video", source_image_path=clip["image_path"], output_path=clip["video_path"])
+        except Exception as e:
+            # Reported like a failed tool call, so one bad item never discards the rest of the plan.
+            result["message"] = f"Error: {type(e).__name__}: {e}"
+            return result
+        result.update(ok=not _is_error(video_result), message=video_result)
+        return result
+
+    def _run_audio_item(self, item: dict) -> dict:
+        kind = item.get("type", "").lower()
+        text, path = item.get("text_or_prompt", ""), item.get("output_path")
+        try:
+            if kind == "dialogue":
+                message = self._call(kind, dialogue=text, file_path=path)
+            elif kind in ("sfx", "music"):
+                message = self._call(kind, prompt=text, file_path=path)
+            else:
+                message = f"Error: Unknown audio type '{kind}'."
+        except Exception as e:
+            message = f"Error: {type(e).__name__}: {e}"
+        return {"id": item.get("audio_id"), "path": path, "ok": not _is_error(message), "message": message}
+
+    def run(self, plan, episode_id: int = None) -> dict:
+        plan = parse_production_plan(plan)
+        video_plan, audio_plan = plan["video_plan"], plan["audio_plan"]
+        total = len(video_plan) + len(audio_plan)
+        matches = self._match_shots(video_plan)
+        generated = [clip for clip, match in zip(video_plan, matches) if match is None]
+        reused = len(video_plan) - len(generated)
+        print(f"⚙️ Executing production plan: {len(video_plan)} clips ({reused} reused), {len(audio_plan)} audio assets "
+              f"on {self.max_workers} workers...")
+        image_tool = self.tools.get("image")
+        generated = self._condition_clips(generated)
+        if hasattr(image_tool, "generate_batch"):
+            report = self._run_batched(generated, audio_plan, image_tool)
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="plan") as pool:
+                # Submitted through in_context so the tool spans land in the calling episode's trace.
+                # Interleave video chains and audio items in plan order: audio never queues behind every clip,
+                # and scheduling (and therefore provider usage) is reproducible run to run.
+                video_futures, audio_futures = [], []
+                for i in range(max(len(generated), len(audio_plan))):
+                    if i < len(generated):
+                        video_futures.append(pool.submit(in_context(self._run_video_chain), generated[i]))
+                    if i < len(audio_plan):
+                        audio_futures.append(pool.submit(in_context(self._run_audio_item), audio_plan[i]))
+                report = {
+                    "video": [f.result() for f in video_futures],
+                    "audio": [f.result() for f in audio_futures],
+                }
+        if reused:
+            report["video"] = self._reuse_shots(video_plan, matches, report["video"])
+        self._index_shots(video_plan, matches, report["video"], episode_id)
+        return self._report(report, total)
+
+    # --- Character references ---
+    def _condition_clips(self, video_plan: list) -> list:
+        """Copies of the clips with their character references resolved (see CharacterStore.condition).
+
+        Missing portraits are generated here, in one go, before any frame needs them. Image tools that can't take
+        a reference get the clips unchanged.
+        """
+        if self.character_store is None or not self.character_store.generates_portraits or not video_plan:
+            return video_plan
+        try:
+            self.character_store.ensure(sorted({name for clip in video_plan
+                                                for name in self.character_store.characters_in(clip["image_prompt"])}))
+            conditioned = []
+            for clip in video_plan:
+                prompt, reference = self.character_store.condition(clip["image_prompt"])
+                conditioned.append(dict(clip, image_prompt=prompt, reference_path=reference))
+        except Exception as e:
+            print(f"⚠️ Character references unavailable, using the plain prompts: {e}")
+            return video_plan
+        referenced = sum(1 for clip in conditioned if clip["reference_path"])
+        print(f"🧑‍🎨 {referenced} of {len(conditioned)} clips reference a character portrait.")
+        return conditioned
+
+    # --- Shot reuse ---
+    def _match_shots(self, video_plan: list) -> list:
+        if self.shot_index is None:
+            return [None] * len(video_plan)
+        try:
+            return self.shot_index.plan(video_plan)
+        except Exception as e:
+            print(f"⚠️ Shot matching failed, generating every clip: {e}")
+            return [None] * len(video_plan)
+
+    def _reuse_shots(self, video_plan: list, matches: list, generated_results: list) -> list:
+        """Fills in the matched clips from their source shots and returns the video results in plan order."""
+        generated = iter(generated_results)
+        sources, results = {}, []
+        for n, (clip, match) in enumerate(zip(video_plan, matches)):
+            if match is None:
+                result = next(generated)
+                sources[clip["clip_id"]] = (clip, result["ok"])
+                results.append(result)
+                continue
+            frame_path, clip_path = match.frame_path, match.clip_path
+            try:
+                if frame_path is None:
+                    source, ok = sources[match.source]
+                    if not ok:
+                        raise RuntimeError(f"{match.source} was not generated")
+                    frame_path, clip_path = source["image_path"], source["video_path"]
+                message = reuse_shot(frame_path, clip_path, clip, match.action, variant=n)
+            except Exception as e:
+                # The source shot is unusable, so this clip is generated after all.
+                print(f"⚠️ Could not reuse {match.source} for {clip['clip_id']} ({e}); generating it.")
+                results.append(self._run_video_chain(self._condition_clips([clip])[0]))
+                continue
+            print(f"♻️ {clip['clip_id']}: {match.action} {match.source} (similarity {match.similarity:.2f})")
+            results.append({"id": clip.get("clip_id"), "path": clip.get("video_path"), "ok": True, "message": message})
+        return results
+
+    def _index_shots(self, video_plan: list, matches: list, video_results: list, episode_id: int = None):
+        if self.shot_index is None:
+            return
+        for clip, match, result in zip(video_plan, matches, video_results):
+            if match is None and result["ok"]:
+                try:
+                    self.shot_index.add(clip, episode_id)
+                except Exception as e:
+                    print(f"⚠️ Could not add {clip['clip_id']} to the shot library: {e}")
+
+    def _run_batched(self, video_plan: list, audio_plan: list, image_tool) -> dict:
+        # Local image models are fastest fed many prompts per call, so every frame is generated in one batch
+        # (while audio runs on the pool) and the video steps follow once the frames exist.
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="plan") as pool:
+            audio_futures = [pool.submit(in_context(self._run_audio_item), item) for item in audio_plan]
+            try:
+                image_results = image_tool.generate_batch([(clip["image_prompt"], clip["image_path"],
+                                                            clip.get("reference_path")) for clip in video_plan])
+            except Exception as e:
+                image_results = [f"Error: {type(e).__name__}: {e}"] * len(video_plan)
+            video_futures = [pool.submit(in_context(self._run_video_chain), clip, image_result)
+                             for clip, image_result in zip(video_plan, image_results)]
+            return {
+                "video": [f.result() for f in video_futures],
+                "audio": [f.result() for f in audio_futures],
+            }
+
+    def _report(self, report: dict, total: int) -> dict:
+        failed = [r for r in report["video"] + report["audio"] if not r["ok"]]
+        print(f"✅ Production plan executed: {total - len(failed)} succeeded, {len(failed)} failed.")
+        for r in failed:
+            print(f"   ❌ {r['id']}: {r['message']}")
+        return report
+
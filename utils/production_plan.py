@@ -0,0 +1,175 @@
+# utils/production_plan.py
+# Typed production plan shared by the planner, the plan executor, the timeline and the checkpoints.
+#
+# The planner task requests ProductionPlan through the model's schema-constrained JSON output (see
+# CrewLLMAdapter). Whatever comes back is validated once here. Small defects are repaired locally, so they
+# never cost another LLM round: markdown fences, trailing commas, a truncated tail, type spellings, and
+# missing ids or paths. Later stages work with the parsed plan.
+import json
+import os
+import re
+from typing import List, Literal
+
+from pydantic import BaseModel, Field, model_validator
+
+PLAN_ASSET_DIR = "temp_assets"
+
+# Spellings of the audio types that models produce instead of the canonical ones.
+_AUDIO_TYPE_ALIASES = {
+    "dialog": "dialogue", "voice": "dialogue", "speech": "dialogue", "line": "dialogue", "narration": "dialogue",
+    "sound_effect": "sfx", "sound effect": "sfx", "sound": "sfx", "effect": "sfx", "fx": "sfx",
+    "score": "music", "bgm": "music", "soundtrack": "music", "theme": "music",
+}
+_AUDIO_EXTENSIONS = {"dialogue": ".mp3", "sfx": ".mp3", "music": ".flac"}
+
+
+class ClipPlan(BaseModel):
+    clip_id: str = Field(description="Unique ID, e.g. 'clip_01'.")
+    image_prompt: str = Field(description="Detailed cinematic anime-style prompt for the clip's first frame.")
+    image_path: str = Field(description=f"Path of the first frame, e.g. '{PLAN_ASSET_DIR}/frame_01.png'.")
+    video_path: str = Field(description=f"Path of the video clip, e.g. '{PLAN_ASSET_DIR}/clip_01.mp4'.")
+
+
+class AudioPlanItem(BaseModel):
+    audio_id: str = Field(description="Unique ID, e.g. 'dialogue_01'.")
+    type: Literal["dialogue", "sfx", "music"]
+    text_or_prompt: str = Field(description="The spoken line for dialogue, a descriptive prompt for sfx and music.")
+    output_path: str = Field(description=f"Path of the audio file, e.g. '{PLAN_ASSET_DIR}/dialogue_01.mp3'.")
+
+
+class ProductionPlan(BaseModel):
+    video_plan: List[ClipPlan] = Field(default_factory=list, description="The scene clips, in episode order.")
+    audio_plan: List[AudioPlanItem] = Field(default_factory=list, description="Every dialogue line, sfx and music asset.")
+
+    @model_validator(mode="before")
+    @classmethod
+    def _repair(cls, data):
+        if not isinstance(data, dict):
+            return data
+        return {"video_plan": _repair_clips(data.get("video_plan") or []),
+                "audio_plan": _repair_audio(data.get("audio_plan") or [])}
+
+
+def _text(item: dict, *keys) -> str:
+    for key in keys:
+        value = item.get(key)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return ""
+
+
+def _unique(value: str, seen: set, fallback: str) -> str:
+    """`value` if it is set and unused, else `fallback`, numbered (clip_02_2.mp4, ...) until it is unused too."""
+    if not value or value in seen:
+        root, ext = os.path.splitext(fallback)
+        value, suffix = fallback, 2
+        while value in seen:
+            value = f"{root}_{suffix}{ext}"
+            suffix += 1
+    seen.add(value)
+    return value
+
+
+def _as_dict(item):
+    """Plan entries as dicts; already-parsed ClipPlan/AudioPlanItem instances are dumped rather than dropped."""
+    return item.model_dump() if isinstance(item, BaseModel) else item
+
+
+def _repair_clips(items: list) -> list:
+    clips, ids, paths, dropped = [], set(), set(), 0
+    for item in map(_as_dict, items):
+        if not isinstance(item, dict) or not _text(item, "image_prompt", "prompt", "description"):
+            dropped += 1
+            continue
+        n = len(clips) + 1
+        clips.append({
+            "clip_id": _unique(_text(item, "clip_id", "id"), ids, f"clip_{n:02d}"),
+            "image_prompt": _text(item, "image_prompt", "prompt", "description"),
+            "image_path": _unique(_text(item, "image_path"), paths, f"{PLAN_ASSET_DIR}/frame_{n:02d}.png"),
+            "video_path": _unique(_text(item, "video_path"), paths, f"{PLAN_ASSET_DIR}/clip_{n:02d}.mp4"),
+        })
+    if dropped:
+        print(f"⚠️ Production plan: dropped {dropped} video_plan entries without an image prompt.")
+    return clips
+
+
+def _repair_audio(items: list) -> list:
+    audio, ids, paths, counts, dropped = [], set(), set(), {}, 0
+    for item in map(_as_dict, items):
+        kind = _text(item, "type", "kind").lower() if isinstance(item, dict) else ""
+        kind = _AUDIO_TYPE_ALIASES.get(kind, kind)
+        text = _text(item, "text_or_prompt", "text", "dialogue", "prompt") if kind in _AUDIO_EXTENSIONS else ""
+        if not text:
+            dropped += 1
+            continue
+        counts[kind] = counts.get(kind, 0) + 1
+        audio_id = _unique(_text(item, "audio_id", "id"), ids, f"{kind}_{counts[kind]:02d}")
+        audio.append({
+            "audio_id": audio_id,
+            "type": kind,
+            "text_or_prompt": text,
+            "output_path": _unique(_text(item, "output_path", "file_path", "path"), paths,
+                                   f"{PLAN_ASSET_DIR}/{audio_id}{_AUDIO_EXTENSIONS[kind]}"),
+        })
+    if dropped:
+        print(f"⚠️ Production plan: dropped {dropped} audio_plan entries with an unknown type or no text.")
+    return audio
+
+
+def repair_json(text: str) -> str:
+    """Extracts the first JSON object from an LLM answer and fixes what can be fixed without the model.
+
+    Handles surrounding prose and markdown fences, trailing commas, and output cut off mid-way. A truncated
+    answer is cut back to its last complete element, and the open brackets are closed.
+    """
+    cleaned = re.sub(r"```(?:json)?", "", text)
+    start = cleaned.find("{")
+    if start == -1:
+        raise ValueError("No JSON object found in the LLM answer.")
+    out, stack = [], []
+    in_string = escaped = False
+    last_complete = None  # (length of `out`, open brackets) after the last complete element
+    for ch in cleaned[start:]:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            while out and out[-1] in " \t\r\n":
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if not stack or stack[-1] != ch:
+                break
+            stack.pop()
+            out.append(ch)
+            if not stack:
+                return "".join(out)
+            last_complete = (len(out), list(stack))
+            continue
+        elif ch == ",":
+            last_complete = (len(out), list(stack))
+        out.append(ch)
+    if last_complete is None:
+        raise ValueError("The JSON object in the LLM answer is empty or unreadable.")
+    length, stack = last_complete
+    print("⚠️ The JSON answer was cut off; keeping its last complete element.")
+    return "".join(out[:length]).rstrip().rstrip(",") + "".join(reversed(stack))
+
+
+def load_production_plan(data) -> ProductionPlan:
+    """Returns a validated ProductionPlan from a ProductionPlan, a dict or an LLM answer, repairing it locally."""
+    if isinstance(data, ProductionPlan):
+        return data
+    if isinstance(data, str):
+        data = json.loads(repair_json(data))
+    return ProductionPlan.model_validate(data)
@@ -0,0 +1,69 @@
+# utils/segment_cache.py
+# Per-episode cache of the compiler's intermediate encodes.
+#
+# The stream compiler builds an episode from per-clip video segments (clips normalized to the episode's
+# format) and one mixed soundtrack, then joins them with stream copy. Each of those encodes is stored under
+# `<episode>/segments/` named by a hash of everything that went into it, so recompiling after an edit only
+# re-encodes the segments whose inputs changed; the rest are reused as they are.
+import hashlib
+import json
+import os
+
+SEGMENT_DIR_NAME = "segments"
+SEGMENT_CACHE_VERSION = 1
+
+
+class SegmentCache:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._used = set()
+        self._digests = {}  # (path, size, mtime_ns) -> content hash
+        os.makedirs(directory, exist_ok=True)
+
+    def file_digest(self, path: str) -> str:
+        """Hashes a file's content, so a regenerated asset invalidates its segment even at the same path."""
+        stat = os.stat(path)
+        state = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if state not in self._digests:
+            h = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            self._digests[state] = h.hexdigest()
+        return self._digests[state]
+
+    @staticmethod
+    def make_key(kind: str, inputs: dict) -> str:
+        payload = json.dumps({"kind": kind, "version": SEGMENT_CACHE_VERSION, "inputs": inputs},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_or_build(self, kind: str, inputs: dict, ext: str, build) -> str:
+        """Returns the cached segment for these inputs, calling `build(path)` to encode it on a miss."""
+        key = self.make_key(kind, inputs)
+        path = os.path.join(self.directory, f"{kind}_{key[:24]}{ext}")
+        self._used.add(path)
+        if os.path.exists(path):
+            self.hits += 1
+            return path
+        self.misses += 1
+        partial_path = os.path.join(self.directory, f".partial_{os.path.basename(path)}")
+        try:
+            build(partial_path)
+            os.replace(partial_path, path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        return path
+
+    def prune(self) -> int:
+        """Deletes segments that the last compile didn't use, so the directory only holds the current cut."""
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if path not in self._used and os.path.isfile(path):
+                os.remove(path)
+                removed += 1
+        return removed
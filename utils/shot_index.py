@@ -0,0 +1,178 @@
+# utils/shot_index.py
+# Prompt-similarity index of generated shots, used to skip generating near-duplicate shots.
+#
+# Scripts keep returning to the same settings, and every video_plan entry would otherwise cost an image
+# generation plus an image-to-video generation. Each clip's image_prompt is embedded with the series
+# memory's (cached) embedding function. Near-duplicates are matched against shots generated earlier in
+# the episode and against the series' shot library, a Chroma collection next to the memory:
+#
+#   similarity >= SHOT_REUSE_SIMILARITY   the existing clip (and frame) is copied as is
+#   similarity >= SHOT_VARY_SIMILARITY    the existing frame is re-animated locally with a different
+#                                         Ken Burns move, so the shot doesn't repeat verbatim
+#
+# Anything below that is generated as usual. Two prompts that share a long setting description embed close
+# together even when the action differs ("running" vs "crying"), so a match also requires the words that
+# differ between them to mean the same (SHOT_CHANGED_WORDS_SIMILARITY). Newly generated shots are copied into
+# the library afterwards; library files are never linked, since episodes rewrite their asset paths in place.
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from typing import NamedTuple
+
+import numpy as np
+
+from config import SHOT_REUSE_SIMILARITY, SHOT_VARY_SIMILARITY, SHOT_CHANGED_WORDS_SIMILARITY
+from utils.ffmpeg_utils import probe
+
+
+class ShotMatch(NamedTuple):
+    source: str  # clip_id of an earlier clip in the episode, or the library shot id
+    similarity: float
+    action: str  # 'reuse' or 'vary'
+    frame_path: str = None  # library files; None while the source is a clip of this episode
+    clip_path: str = None
+
+
+# Words that don't change what a shot shows. Bare numbers are usually labels ("scene 3").
+_STOPWORDS = frozenset("a an and as at by for from in into is of on or the their his her its to with".split())
+
+
+def _content_words(prompt: str) -> list:
+    words = re.findall(r"[a-z0-9']+", prompt.lower())
+    return [w for w in dict.fromkeys(words) if w not in _STOPWORDS and not w.isdigit()]
+
+
+def _copy(src: str, dest: str):
+    """Copies `src` to `dest` through a temp file, so `dest` is never a partial file or a link to `src`."""
+    if os.path.abspath(src) == os.path.abspath(dest):
+        return
+    directory = os.path.dirname(dest) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ShotIndex:
+    def __init__(self, client, embedding_function, library_dir: str, collection_name: str = "shot_library",
+                 reuse_similarity: float = SHOT_REUSE_SIMILARITY, vary_similarity: float = SHOT_VARY_SIMILARITY,
+                 changed_words_similarity: float = SHOT_CHANGED_WORDS_SIMILARITY):
+        self.embedding_function = embedding_function
+        self.library_dir = library_dir
+        self.reuse_similarity = reuse_similarity
+        self.vary_similarity = vary_similarity
+        self.changed_words_similarity = changed_words_similarity
+        self.collection = client.get_or_create_collection(
+            name=collection_name, embedding_function=embedding_function, metadata={"hnsw:space": "cosine"})
+
+    @staticmethod
+    def shot_id(prompt: str) -> str:
+        return "shot_" + hashlib.sha256(prompt.strip().lower().encode("utf-8")).hexdigest()[:16]
+
+    def _action(self, similarity: float):
+        if similarity >= self.reuse_similarity:
+            return "reuse"
+        if similarity >= self.vary_similarity:
+            return "vary"
+        return None
+
+    def same_content(self, a: str, b: str) -> bool:
+        """Whether two prompts show the same thing: the content words only one of them has are paraphrases of
+        the other's. A prompt that adds or drops content (e.g. an action) never matches."""
+        words_a, words_b = _content_words(a), _content_words(b)
+        only_a = [w for w in words_a if w not in set(words_b)]
+        only_b = [w for w in words_b if w not in set(words_a)]
+        if not only_a and not only_b:
+            return True
+        if not only_a or not only_b:
+            return False
+        u, v = np.asarray(self.embedding_function([" ".join(only_a), " ".join(only_b)]), dtype=np.float32)
+        similarity = float(u @ v / max(float(np.linalg.norm(u) * np.linalg.norm(v)), 1e-12))
+        return similarity >= self.changed_words_similarity
+
+    def _library_matches(self, video_plan: list, vectors: np.ndarray) -> list:
+        if len(vectors) == 0 or self.collection.count() == 0:
+            return [None] * len(vectors)
+        found = self.collection.query(query_embeddings=vectors.tolist(), n_results=1,
+                                      include=["documents", "metadatas", "distances"])
+        matches = []
+        for clip, ids, documents, metadatas, distances in zip(video_plan, found["ids"], found["documents"],
+                                                               found["metadatas"], found["distances"]):
+            similarity = 1.0 - distances[0] if distances else 0.0
+            action = self._action(similarity) if ids else None
+            if action and not self.same_content(clip["image_prompt"], documents[0] or ""):
+                action = None
+            meta = metadatas[0] if metadatas else {}
+            # Library files can be cleaned up by hand; a shot whose files are gone can't be reused.
+            if action and all(os.path.exists(meta.get(k, "")) for k in ("frame_path", "clip_path")):
+                matches.append(ShotMatch(ids[0], round(similarity, 4), action, meta["frame_path"], meta["clip_path"]))
+            else:
+                matches.append(None)
+        return matches
+
+    def plan(self, video_plan: list) -> list:
+        """Returns one ShotMatch (or None = generate) per clip, in plan order.
+
+        A clip matches the most similar earlier clip of the episode or the closest library shot, whichever is
+        closer. Matching an earlier clip that was itself matched resolves to that clip's source, so every
+        match points at a shot that is generated (or already in the library) before it is needed.
+        """
+        if not video_plan:
+            return []
+        vectors = np.asarray(self.embedding_function([clip["image_prompt"] for clip in video_plan]), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        library = self._library_matches(video_plan, vectors)
+        matches = []
+        for i, clip in enumerate(video_plan):
+            best = None
+            if i:
+                similarities = vectors[:i] @ vectors[i]
+                j = int(np.argmax(similarities))
+                similarity = round(float(similarities[j]), 4)
+                action = self._action(similarity)
+                if action and self.same_content(clip["image_prompt"], video_plan[j]["image_prompt"]):
+                    root = matches[j]
+                    if root is None:
+                        best = ShotMatch(video_plan[j]["clip_id"], similarity, action)
+                    else:
+                        best = root._replace(similarity=min(similarity, root.similarity),
+                                             action=self._action(min(similarity, root.similarity)))
+            if library[i] is not None and (best is None or library[i].similarity > best.similarity):
+                best = library[i]
+            matches.append(best)
+        return matches
+
+    def add(self, clip: dict, episode_id: int = None):
+        """Adds a generated shot to the series library (copies of its frame and clip)."""
+        shot_id = self.shot_id(clip["image_prompt"])
+        frame_path = os.path.join(self.library_dir, shot_id + os.path.splitext(clip["image_path"])[1])
+        clip_path = os.path.join(self.library_dir, shot_id + os.path.splitext(clip["video_path"])[1])
+        _copy(clip["image_path"], frame_path)
+        _copy(clip["video_path"], clip_path)
+        metadata = {"frame_path": os.path.abspath(frame_path), "clip_path": os.path.abspath(clip_path)}
+        if episode_id is not None:
+            metadata["episode"] = int(episode_id)
+        self.collection.upsert(ids=[shot_id], documents=[clip["image_prompt"]], metadatas=[metadata])
+
+
+def reuse_shot(frame_path: str, clip_path: str, clip: dict, action: str, variant: int = 0) -> str:
+    """Materializes a matched shot at the clip's image_path/video_path. Returns a tool-style message."""
+    from utils.ken_burns import PRESETS, render_ken_burns
+    _copy(frame_path, clip["image_path"])
+    if action == "reuse":
+        _copy(clip_path, clip["video_path"])
+        return f"Successfully reused the shot at {clip['video_path']}"
+    info = probe(clip_path)
+    size = (info["video"]["width"], info["video"]["height"]) if info["video"] else None
+    presets = sorted(PRESETS)
+    preset = presets[variant % len(presets)]
+    render_ken_burns(clip["image_path"], clip["video_path"], info["duration"] or 3.0, preset=preset, size=size)
+    return f"Successfully re-animated the shot ({preset}) at {clip['video_path']}"
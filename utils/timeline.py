@@ -0,0 +1,166 @@
+# utils/timeline.py
+# Edit decision list linking the production plan to the compiler.
+#
+# build_timeline() turns a plan's video_plan/audio_plan into the episode's cut: clips in plan order with
+# in/out points and their start on the episode clock, plus the dialogue, SFX and music lanes placed
+# against those clips. Every asset is probed exactly once here; the compiler reads durations and stream
+# formats from the timeline instead of scanning temp_assets or re-probing. The timeline is saved as
+# `timeline.json` in the episode directory and is the compiler's only input.
+import json
+import os
+from typing import NamedTuple
+
+from config import AUDIO_MIX_DIALOGUE_LEAD
+from utils.asset_cache import write_atomic
+from utils.ffmpeg_utils import probe
+
+TIMELINE_FILE_NAME = "timeline.json"
+TIMELINE_VERSION = 1
+DIALOGUE_GAP = 0.3  # seconds between consecutive dialogue lines that share a clip
+AUDIO_LANES = ("dialogue", "sfx", "music")
+
+
+class TimelineClip(NamedTuple):
+    clip_id: str
+    path: str
+    start: float  # on the episode clock
+    in_point: float  # within the source file
+    out_point: float
+    media: dict  # probe() result: duration plus video/audio stream formats
+    plan_index: int = None  # position in the plan's video_plan, which dialogue is placed by
+
+    @property
+    def duration(self) -> float:
+        return self.out_point - self.in_point
+
+    @property
+    def has_audio(self) -> bool:
+        return self.media.get("audio") is not None
+
+    @property
+    def trimmed(self) -> bool:
+        return self.in_point > 0 or self.out_point < self.media["duration"] - 1e-3
+
+
+class AudioEvent(NamedTuple):
+    audio_id: str
+    path: str
+    kind: str  # one of AUDIO_LANES
+    start: float
+    duration: float
+    gain_db: float = 0.0
+    loop: bool = False  # music beds repeat until the end of the episode
+
+
+class Timeline:
+    def __init__(self, clips: list, audio: dict = None, missing: list = None, episode_id: int = None):
+        self.clips = list(clips)
+        self.audio = {lane: list((audio or {}).get(lane, [])) for lane in AUDIO_LANES}
+        # Plan assets that didn't exist when the timeline was built.
+        self.missing = list(missing or [])
+        self.episode_id = episode_id
+
+    @property
+    def duration(self) -> float:
+        return sum(c.duration for c in self.clips)
+
+    def events(self, *lanes) -> list:
+        return [e for lane in (lanes or AUDIO_LANES) for e in self.audio[lane]]
+
+    # --- Serialization ---
+    def to_dict(self) -> dict:
+        return {
+            "version": TIMELINE_VERSION,
+            "episode_id": self.episode_id,
+            "duration": round(self.duration, 3),
+            "clips": [c._asdict() for c in self.clips],
+            "audio": {lane: [e._asdict() for e in events] for lane, events in self.audio.items()},
+            "missing": self.missing,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Timeline":
+        if data.get("version") != TIMELINE_VERSION:
+            raise ValueError(f"Unsupported timeline version {data.get('version')!r}.")
+        return cls(clips=[TimelineClip(**c) for c in data["clips"]],
+                   audio={lane: [AudioEvent(**e) for e in events] for lane, events in data["audio"].items()},
+                   missing=data.get("missing"), episode_id=data.get("episode_id"))
+
+    def save(self, path: str) -> str:
+        write_atomic(path, json.dumps(self.to_dict(), indent=2).encode("utf-8"))
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "Timeline":
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
+
+
+def timeline_path(episode_path: str) -> str:
+    return os.path.join(episode_path, TIMELINE_FILE_NAME)
+
+
+def _probe_existing(path: str, missing: list):
+    if not path or not os.path.exists(path):
+        missing.append(path)
+        return None
+    return probe(path)
+
+
+def build_timeline(plan: dict, episode_id: int = None) -> Timeline:
+    """Lays out the plan's clips back to back and places its audio against them.
+
+    Dialogue line i of the plan starts shortly after the plan's clip i begins (later if the previous line is
+    still running), so a plan with one line per clip lines up shot by shot; extra lines, and lines whose clip
+    is missing, follow the previous line. Positions are those in the plan, so a missing clip or line never
+    shifts the lines after it onto other shots. A clip that carries its own audio (e.g. a Ken Burns or
+    talking-head clip rendered from that line) already contains its dialogue, so that line is not added again.
+    SFX are spread evenly over the clip starts; music loops under the whole episode. Assets missing on disk are left out and listed in `missing`.
+    """
+    missing, clips, start = [], [], 0.0
+    for n, item in enumerate(plan.get("video_plan", [])):
+        media = _probe_existing(item.get("video_path"), missing)
+        if media is None or media["video"] is None:
+            continue
+        clips.append(TimelineClip(item.get("clip_id") or f"clip_{n + 1:02d}", item["video_path"], round(start, 3),
+                                  0.0, media["duration"], media, n))
+        start += media["duration"]
+
+    items = {lane: [] for lane in AUDIO_LANES}
+    positions = {lane: 0 for lane in AUDIO_LANES}
+    for item in plan.get("audio_plan", []):
+        kind = str(item.get("type", "")).lower()
+        if kind in items:
+            media = _probe_existing(item.get("output_path"), missing)
+            if media is not None and media["audio"] is not None:
+                items[kind].append((positions[kind], item, media["duration"]))
+            positions[kind] += 1
+
+    audio = {lane: [] for lane in AUDIO_LANES}
+    clip_at = {c.plan_index: c for c in clips}
+    line_end = 0.0
+    for i, item, duration in items["dialogue"]:
+        clip = clip_at.get(i)
+        if clip is not None and clip.has_audio:
+            line_end = clip.start + clip.duration
+            continue
+        clip_start = clip.start + AUDIO_MIX_DIALOGUE_LEAD if clip is not None else 0.0
+        line_start = max(clip_start, line_end + DIALOGUE_GAP if line_end else 0.0)
+        audio["dialogue"].append(AudioEvent(item.get("audio_id") or f"dialogue_{i + 1:02d}", item["output_path"],
+                                            "dialogue", round(line_start, 3), duration))
+        line_end = line_start + duration
+    for j, (_, item, duration) in enumerate(items["sfx"]):
+        at = clips[int(j * len(clips) / len(items["sfx"]))].start if clips else 0.0
+        audio["sfx"].append(AudioEvent(item.get("audio_id") or f"sfx_{j + 1:02d}", item["output_path"], "sfx",
+                                       at, duration))
+    for k, (_, item, duration) in enumerate(items["music"]):
+        audio["music"].append(AudioEvent(item.get("audio_id") or f"music_{k + 1:02d}", item["output_path"], "music",
+                                         0.0, duration, loop=True))
+
+    timeline = Timeline(clips, audio, missing, episode_id)
+    overflow = [e.audio_id for e in audio["dialogue"] if e.start + e.duration > timeline.duration + 1e-3]
+    if overflow:
+        print(f"⚠️ Timeline: dialogue runs past the last clip and will be cut: {', '.join(overflow)}")
+    if missing:
+        print(f"⚠️ Timeline: {len(missing)} planned assets are missing and were left out.")
+    return timeline